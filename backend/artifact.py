@@ -0,0 +1,113 @@
+"""
+Versioned, memory-mappable model artifact.
+
+A single file, so it can be replaced atomically with `os.replace`:
+
+    8 bytes   magic  b"AIDET\\0v1"
+    8 bytes   header length (little-endian u64)
+    N bytes   JSON header: format version, content hash, array table, metadata
+    padding   to a 64-byte boundary
+    arrays    raw little-endian arrays, each 64-byte aligned
+
+Arrays are opened with `np.memmap`, so every process that loads the same
+file shares the same page-cache pages instead of holding its own copy.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+MAGIC = b"AIDET\x00v1"
+FORMAT_VERSION = 1
+ALIGN = 64
+
+def _aligned(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+def content_hash(arrays: dict, model: dict) -> str:
+    """sha256 over the model settings and every array's name, dtype, shape and bytes."""
+    digest = hashlib.sha256(json.dumps(model, sort_keys=True).encode("utf-8"))
+    for name in sorted(arrays):
+        arr = np.ascontiguousarray(arrays[name])
+        digest.update(f"{name}|{arr.dtype.str}|{arr.shape}".encode("utf-8"))
+        digest.update(arr.tobytes())
+    return digest.hexdigest()
+
+def write_artifact(path: Path, arrays: dict, model: dict, metadata: dict = None) -> str:
+    """
+    Write arrays plus the `model` settings needed to score and free-form
+    `metadata` (training data hash, metrics, ...). Returns the content hash.
+    """
+    arrays = {name: np.ascontiguousarray(arr) for name, arr in arrays.items()}
+    table, offset = {}, 0
+    for name, arr in arrays.items():
+        offset = _aligned(offset)
+        table[name] = {"dtype": arr.dtype.newbyteorder("<").str, "shape": list(arr.shape), "offset": offset}
+        offset += arr.nbytes
+
+    digest = content_hash(arrays, model)
+    header = json.dumps({
+        "format": FORMAT_VERSION,
+        "content_hash": digest,
+        "model": model,
+        "metadata": metadata or {},
+        "arrays": table,
+    }).encode("utf-8")
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            for name, arr in arrays.items():
+                f.write(b"\0" * (data_start + table[name]["offset"] - f.tell()))
+                f.write(arr.astype(table[name]["dtype"], copy=False).tobytes())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return digest
+
+def read_header(path: Path) -> tuple[dict, int]:
+    """Return (header, offset of the array data)."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a model artifact")
+        (length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(length))
+    if header.get("format") != FORMAT_VERSION:
+        raise ValueError(f"{path} has unsupported format version {header.get('format')}")
+    return header, _aligned(len(MAGIC) + 8 + length)
+
+def read_artifact(path: Path, mmap: bool = True, verify: bool = False) -> tuple[dict, dict]:
+    """
+    Open an artifact and return (header, arrays). With `mmap` the arrays are
+    read-only views of the file; `verify` re-hashes them against the header.
+    """
+    header, data_start = read_header(path)
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        shape = tuple(entry["shape"])
+        count = int(np.prod(shape))
+        offset = data_start + entry["offset"]
+        if count == 0:
+            arrays[name] = np.empty(shape, dtype=dtype)
+        elif mmap:
+            arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape)
+        else:
+            arrays[name] = np.fromfile(path, dtype=dtype, count=count, offset=offset).reshape(shape)
+
+    if verify and content_hash(arrays, header["model"]) != header["content_hash"]:
+        raise ValueError(f"{path} failed its content hash check")
+    return header, arrays
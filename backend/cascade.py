@@ -0,0 +1,164 @@
+"""
+Cascaded inference: a fast primary model scores every sentence, and only
+sentences it is unsure about go to a heavier secondary model.
+
+A sentence is escalated when its primary probability lies inside the
+uncertainty band [low, high] around 0.5. Its secondary probability then
+replaces the primary one. The secondary model is char n-grams within word
+boundaries (`char_wb`), a larger feature set the compiled scorer handles
+too.
+
+`Cascade` wraps any two models with `predict_proba`: fitted sklearn
+pipelines (pickled as ai_detector.pkl) or compiled `LinearScorer`s. Both
+compiled models live in one artifact, with arrays prefixed "primary." and
+"secondary." and model settings {"kind": "cascade", "band", "primary",
+"secondary"}.
+"""
+
+import csv
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+
+from artifact import read_artifact
+from compiled_model import LinearScorer, compile_pipeline
+
+DEFAULT_BAND = (0.2, 0.8)
+# Half-widths around 0.5 evaluated by the report; 0.5 escalates everything
+REPORT_HALF_WIDTHS = (0.05, 0.1, 0.2, 0.3, 0.4, 0.5)
+
+class Cascade:
+    """Primary model everywhere, secondary model inside `band`."""
+
+    def __init__(self, primary, secondary, band=DEFAULT_BAND, header: dict = None):
+        low, high = band
+        if not 0.0 <= low <= high <= 1.0:
+            raise ValueError(f"Band must satisfy 0 <= low <= high <= 1, got {band}")
+        self.primary = primary
+        self.secondary = secondary
+        self.band = (float(low), float(high))
+        self.header = header or {}
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True):
+        """A cascade of two `LinearScorer`s from one compiled artifact."""
+        header, arrays = read_artifact(path, mmap=mmap)
+        scorers = part_scorers(arrays, header["model"])
+        return cls(scorers["primary"], scorers["secondary"], header["model"]["band"], header)
+
+    def escalate(self, primary_ai: np.ndarray) -> np.ndarray:
+        """Mask of the sentences whose primary probability is inside the band."""
+        low, high = self.band
+        return (primary_ai >= low) & (primary_ai <= high)
+
+    def predict_cascade(self, texts) -> tuple[np.ndarray, np.ndarray]:
+        """((n, 2) [Human, AI] probabilities, mask of the escalated sentences)."""
+        texts = list(texts)
+        proba = np.asarray(self.primary.predict_proba(texts), dtype=np.float64)
+        escalated = self.escalate(proba[:, 1])
+        if escalated.any():
+            proba[escalated] = self.secondary.predict_proba([t for t, e in zip(texts, escalated) if e])
+        return proba, escalated
+
+    def predict_proba(self, texts) -> np.ndarray:
+        return self.predict_cascade(texts)[0]
+
+    def touch(self) -> None:
+        for model in (self.primary, self.secondary):
+            touch = getattr(model, "touch", None)
+            if touch is not None:
+                touch()
+
+def part_scorers(arrays: dict, model: dict) -> dict:
+    """{"primary", "secondary"}: a `LinearScorer` each, from a cascade's arrays and settings."""
+    return {
+        part: LinearScorer(
+            {name.split(".", 1)[1]: arr for name, arr in arrays.items() if name.startswith(part + ".")},
+            model[part],
+        )
+        for part in ("primary", "secondary")
+    }
+
+def secondary_vectorizer(max_features: int = 200_000, ngram_max: int = 5) -> TfidfVectorizer:
+    """char_wb TF‑IDF for the secondary model; input is already normalized and lowercased."""
+    return TfidfVectorizer(analyzer="char_wb", ngram_range=(2, ngram_max), max_features=max_features, lowercase=False)
+
+def secondary_classifier(clf: LogisticRegression) -> LogisticRegression:
+    """A fresh classifier with the primary's settings."""
+    return LogisticRegression(**clf.get_params())
+
+def compile_cascade(cascade: Cascade, precision: str = "float32") -> dict:
+    """One artifact's arrays and settings for a cascade of two fitted pipelines."""
+    parts = {"primary": compile_pipeline(cascade.primary, precision),
+             "secondary": compile_pipeline(cascade.secondary, precision)}
+    return {
+        "arrays": {f"{part}.{name}": arr for part, compiled in parts.items() for name, arr in compiled["arrays"].items()},
+        "model": {"kind": "cascade", "band": list(cascade.band), **{part: c["model"] for part, c in parts.items()}},
+    }
+
+def _scores(labels, proba) -> dict:
+    return {
+        "accuracy": float(accuracy_score(labels, proba >= 0.5)),
+        "f1": float(f1_score(labels, proba >= 0.5)),
+        "roc_auc": float(roc_auc_score(labels, proba)),
+    }
+
+def _time_us(model, texts) -> float:
+    """µs per sentence of `model.predict_proba` over `texts`."""
+    model.predict_proba(texts[:10])  # warm up
+    start = time.perf_counter()
+    model.predict_proba(texts)
+    return (time.perf_counter() - start) / len(texts) * 1e6
+
+def write_report(cascade: Cascade, X_test, y_test, out_dir: Path, precision: str = "float32") -> list[dict]:
+    """
+    Compare the primary and secondary models alone with the cascade at the
+    chosen band and at each of REPORT_HALF_WIDTHS, on the test split. Cost
+    is µs per sentence through the compiled scorers. Writes
+    <out_dir>/cascade_report.csv and .json.
+    """
+    texts, labels = list(X_test), np.asarray(y_test)
+    compiled = compile_cascade(cascade, precision)
+    scorers = part_scorers(compiled["arrays"], compiled["model"])
+    primary_ai = scorers["primary"].predict_proba(texts)[:, 1]
+    secondary_ai = scorers["secondary"].predict_proba(texts)[:, 1]
+
+    rows = [
+        {"model": "primary", "band": "", "escalated": 0.0, **_scores(labels, primary_ai),
+         "us_per_sentence": _time_us(scorers["primary"], texts)},
+        {"model": "secondary", "band": "", "escalated": 1.0, **_scores(labels, secondary_ai),
+         "us_per_sentence": _time_us(scorers["secondary"], texts)},
+    ]
+    bands = [cascade.band] + [(0.5 - w, 0.5 + w) for w in REPORT_HALF_WIDTHS
+                              if not np.allclose((0.5 - w, 0.5 + w), cascade.band)]
+    for i, band in enumerate(bands):
+        level = Cascade(scorers["primary"], scorers["secondary"], band)
+        escalated = level.escalate(primary_ai)
+        rows.append({
+            "model": "cascade (selected)" if i == 0 else "cascade",
+            "band": f"{band[0]:.2f}-{band[1]:.2f}",
+            "escalated": float(escalated.mean()),
+            **_scores(labels, np.where(escalated, secondary_ai, primary_ai)),
+            "us_per_sentence": _time_us(level, texts),
+        })
+    for row in rows:
+        row["us_per_sentence"] = round(row["us_per_sentence"], 2)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with (out_dir / "cascade_report.csv").open("w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    (out_dir / "cascade_report.json").write_text(json.dumps(rows, indent=2))
+
+    print(f"\n{'model':<19} {'band':>9} {'escalated':>9} {'accuracy':>8} {'F1':>7} {'ROC‑AUC':>8} {'µs/sent':>8}")
+    for row in rows:
+        print(f"{row['model']:<19} {row['band']:>9} {row['escalated']:>9.1%} {row['accuracy']:>8.4f} "
+              f"{row['f1']:>7.4f} {row['roc_auc']:>8.4f} {row['us_per_sentence']:>8.2f}")
+    print(f"Report: {out_dir / 'cascade_report.csv'}, {out_dir / 'cascade_report.json'}")
+    return rows
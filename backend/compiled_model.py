@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+"""
+Compile the fitted TF-IDF → LogisticRegression pipeline into a lean scorer.
+
+Scoring a sentence with that pipeline is tokenization, a vocabulary lookup,
+idf weighting, L2 normalization and a dot product with `coef_`. The compiled
+artifact (see artifact.py) keeps just what that needs:
+- the vocabulary as a sorted, fixed-width UTF-8 array (binary-searched)
+- idf as float32, for the L2 norm
+- idf × coef as float32, for the dot product (or float16, or int8 with a
+  scale; see `precision`)
+- the intercept, the tokenizer settings and the input normalizer's name
+
+Word n-grams and character n-grams within word boundaries (`char_wb`) are
+supported.
+
+Training-only state such as the fitted vectorizer's `stop_words_` is dropped,
+and the arrays are memory-mapped so processes on one host share them.
+
+Usage:
+    python compiled_model.py   # compile models/ai_detector.pkl and check it
+"""
+
+import re
+from pathlib import Path
+
+import numpy as np
+
+from artifact import read_artifact, read_header, write_artifact
+from normalize import NORMALIZER, get_normalizer, normalize_batch
+
+ROOT_DIR      = Path(__file__).parent.parent
+MODEL_PATH    = ROOT_DIR / "models" / "ai_detector.pkl"
+COMPILED_PATH = ROOT_DIR / "models" / "ai_detector.model"
+
+PAGE_BYTES = 4096
+
+ANALYZERS = ("word", "char_wb")
+# What sklearn's char analyzers collapse before taking n-grams
+WHITE_SPACES = re.compile(r"\s\s+")
+
+# Storage for idf × coef; idf is float16 unless the weights are float32.
+# int8 weights are symmetric-quantized with one scale (max |w| / 127)
+# recorded in the model settings.
+PRECISIONS = ("float32", "float16", "int8")
+
+def quantize(weights: np.ndarray, precision: str) -> tuple[np.ndarray, float]:
+    """(stored weights, scale to multiply them by)."""
+    if precision == "float32":
+        return weights.astype(np.float32), 1.0
+    if precision == "float16":
+        return weights.astype(np.float16), 1.0
+    if precision == "int8":
+        peak = float(np.abs(weights).max()) if len(weights) else 0.0
+        scale = peak / 127 if peak > 0 else 1.0
+        return np.clip(np.rint(weights / scale), -127, 127).astype(np.int8), scale
+    raise ValueError(f"Unknown precision '{precision}' (choose {', '.join(PRECISIONS)})")
+
+def compile_pipeline(pipeline, precision: str = "float32") -> dict:
+    """Extract the arrays and settings of a fitted [normalize →] TfidfVectorizer + LogisticRegression."""
+    tfidf = pipeline.named_steps["tfidf"]
+    clf = pipeline.named_steps["clf"]
+    normalizer = pipeline.named_steps.get("normalize")
+
+    unsupported = {
+        "normalize": normalizer is not None and getattr(normalizer, "func", None) is not normalize_batch,
+        "analyzer": tfidf.analyzer not in ANALYZERS,
+        "tokenizer": tfidf.tokenizer is not None,
+        "preprocessor": tfidf.preprocessor is not None,
+        "strip_accents": tfidf.strip_accents is not None,
+        "binary": tfidf.binary,
+        "sublinear_tf": tfidf.sublinear_tf,
+        "norm": tfidf.norm != "l2",
+        "use_idf": not tfidf.use_idf,
+        "classes": list(clf.classes_) != [0, 1],
+    }
+    bad = [name for name, flag in unsupported.items() if flag]
+    if bad:
+        raise ValueError(f"Cannot compile pipeline, unsupported settings: {', '.join(bad)}")
+
+    # Reorder columns so that column i is the i-th term in byte order
+    encoded = {term.encode("utf-8"): col for term, col in tfidf.vocabulary_.items()}
+    terms = sorted(encoded)
+    order = np.array([encoded[t] for t in terms], dtype=np.int64)
+    idf = tfidf.idf_.astype(np.float64)[order]
+    coef = clf.coef_[0].astype(np.float64)[order]
+    weights, scale = quantize(idf * coef, precision)
+
+    return {
+        "arrays": {
+            "terms": np.array(terms, dtype=f"S{max(map(len, terms))}"),
+            "idf": idf.astype(np.float32 if precision == "float32" else np.float16),
+            "weights": weights,
+        },
+        "model": {
+            "kind": "tfidf-logreg",
+            "intercept": float(clf.intercept_[0]),
+            "precision": precision,
+            "weight_scale": scale,
+            "analyzer": tfidf.analyzer,
+            "token_pattern": tfidf.token_pattern,
+            "ngram_range": list(tfidf.ngram_range),
+            "lowercase": bool(tfidf.lowercase),
+            "stop_words": sorted(tfidf.get_stop_words() or []) if tfidf.analyzer == "word" else [],
+            "normalize": NORMALIZER if normalizer is not None else None,
+        },
+    }
+
+def save_compiled(compiled: dict, path: Path, metadata: dict = None) -> str:
+    """Write a compiled model as an artifact; returns its content hash."""
+    return write_artifact(path, compiled["arrays"], compiled["model"], metadata)
+
+class LinearScorer:
+    """
+    Vectorized NumPy scorer over a compiled artifact. `predict_proba`
+    matches `Pipeline.predict_proba` so it can be swapped in directly.
+    """
+
+    def __init__(self, arrays: dict, model: dict, header: dict = None):
+        self.terms = arrays["terms"]
+        self.idf = arrays["idf"]
+        self.weights = arrays["weights"]
+        self.intercept = float(model["intercept"])
+        self.weight_scale = float(model.get("weight_scale", 1.0))
+        self.analyzer = model.get("analyzer", "word")
+        self.token_re = re.compile(model["token_pattern"])
+        self.min_n, self.max_n = model["ngram_range"]
+        self.lowercase = model["lowercase"]
+        self.stop_words = frozenset(model["stop_words"])
+        self.normalize = get_normalizer(model.get("normalize"))
+        self.header = header or {}
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True):
+        header, arrays = read_artifact(path, mmap=mmap)
+        return cls(arrays, header["model"], header)
+
+    def touch(self) -> None:
+        """Read one byte per page of every array, so a memory-mapped model is resident."""
+        for arr in (self.terms, self.idf, self.weights):
+            np.asarray(arr).reshape(-1).view(np.uint8)[::PAGE_BYTES].sum()
+
+    def ngrams(self, text: str) -> list[str]:
+        """Every n-gram in `text`, with repeats, exactly as the fitted CountVectorizer."""
+        if self.lowercase:
+            text = text.lower()
+        if self.analyzer == "char_wb":
+            return self.char_wb_ngrams(text)
+        tokens = [t for t in self.token_re.findall(text) if t not in self.stop_words]
+        grams = tokens if self.min_n == 1 else []
+        for n in range(max(self.min_n, 2), self.max_n + 1):
+            grams = grams + [" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)]
+        return grams
+
+    def char_wb_ngrams(self, text: str) -> list[str]:
+        """Character n-grams of each space-padded word; a word no longer than n counts once."""
+        grams = []
+        for word in WHITE_SPACES.sub(" ", text).split():
+            word = f" {word} "
+            for n in range(self.min_n, self.max_n + 1):
+                if len(word) <= n:
+                    grams.append(word)
+                    break
+                grams.extend([word[i:i + n] for i in range(len(word) - n + 1)])
+        return grams
+
+    def lookup(self, grams: list[str]) -> np.ndarray:
+        """Column of each n-gram, or -1 when it is not in the vocabulary."""
+        if not grams or not len(self.terms):
+            return np.full(len(grams), -1, dtype=np.int64)
+        width = self.terms.dtype.itemsize
+        # Anything wider than the widest term cannot match; blank it so it is not truncated
+        encoded = [g.encode("utf-8") for g in grams]
+        probe = np.array([e if len(e) <= width else b"" for e in encoded], dtype=self.terms.dtype)
+        cols = np.searchsorted(self.terms, probe)
+        np.minimum(cols, len(self.terms) - 1, out=cols)
+        return np.where(self.terms[cols] == probe, cols, -1)
+
+    def decision_function(self, texts) -> np.ndarray:
+        if self.normalize is not None:
+            texts = self.normalize(texts)
+        n_docs = len(texts)
+        grams, doc_ids = [], []
+        for i, text in enumerate(texts):
+            found = self.ngrams(text)
+            grams.extend(found)
+            doc_ids.extend([i] * len(found))
+
+        z = np.full(n_docs, self.intercept)
+        cols = self.lookup(grams)
+        hit = cols >= 0
+        if not hit.any():
+            return z
+
+        # Collapse repeats into (doc, column) counts, then weight and normalize per doc
+        n_cols = len(self.idf)
+        keys, counts = np.unique(np.array(doc_ids, dtype=np.int64)[hit] * n_cols + cols[hit], return_counts=True)
+        docs, cols = np.divmod(keys, n_cols)
+        tfidf = counts * self.idf[cols].astype(np.float64)
+        norms = np.sqrt(np.bincount(docs, weights=tfidf * tfidf, minlength=n_docs))
+        dots = np.bincount(docs, weights=counts * self.weights[cols].astype(np.float64), minlength=n_docs)
+        if self.weight_scale != 1.0:
+            dots *= self.weight_scale
+        np.divide(dots, norms, out=dots, where=norms > 0)
+        return z + dots
+
+    def predict_proba(self, texts) -> np.ndarray:
+        """(n, 2) array of [Human, AI] probabilities, like the sklearn pipeline."""
+        ai = 1.0 / (1.0 + np.exp(-self.decision_function(texts)))
+        return np.column_stack([1.0 - ai, ai])
+
+def load_model(model_path: Path = MODEL_PATH, compiled_path: Path = COMPILED_PATH, kind: str = None):
+    """
+    Load a scorer with a `predict_proba` method. `kind` is "compiled" or
+    "sklearn"; by default the compiled artifact is used when it exists.
+    A cascade artifact loads as a `cascade.Cascade`.
+    Returns (model, path of the artifact that was loaded).
+    """
+    if kind is None:
+        kind = "compiled" if Path(compiled_path).exists() else "sklearn"
+    if kind == "compiled":
+        header, _ = read_header(compiled_path)
+        if header["model"].get("kind") == "cascade":
+            from cascade import Cascade
+            return Cascade.load(compiled_path), Path(compiled_path)
+        return LinearScorer.load(compiled_path), Path(compiled_path)
+    if kind == "sklearn":
+        import joblib
+        return joblib.load(model_path), Path(model_path)
+    raise ValueError(f"Unknown scorer '{kind}' (choose compiled or sklearn)")
+
+if __name__ == "__main__":
+    import joblib
+
+    pipeline = joblib.load(MODEL_PATH)
+    digest = save_compiled(compile_pipeline(pipeline), COMPILED_PATH)
+    scorer = LinearScorer.load(COMPILED_PATH)
+
+    probe = ["This is a quick consistency check.", "", "Another sentence, another check!"]
+    diff = np.abs(scorer.predict_proba(probe) - pipeline.predict_proba(probe)).max()
+    print(f"Compiled scorer saved to {COMPILED_PATH} ({digest[:12]}, max |Δp| = {diff:.2e})")
@@ -0,0 +1,148 @@
+"""
+Post-training compression for train.py (`--prune-top-k`, `--prune-threshold`,
+`--sparse-refit`, `--precision`, `--compression-report`).
+
+Most TF‑IDF features end up with coefficients near zero, but each one still
+costs a vocabulary entry, pickle bytes and lookup work. Compression:
+- prunes features by |coef|: a threshold, or the top k
+- optionally refits the classifier with an L1 or elastic-net penalty first,
+  which drives most coefficients to exactly zero
+- stores the compiled weights as float32, float16 or int8 + scale
+
+Pruning removes the terms from the fitted vectorizer itself, so the pickled
+pipeline and the compiled artifact both shrink and agree: the L2 norm is
+taken over the kept terms only. Every level in the report is measured
+through the compiled scorer as the server runs it.
+"""
+
+import copy
+import csv
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import f1_score, roc_auc_score
+
+from compiled_model import PRECISIONS, LinearScorer, compile_pipeline, save_compiled
+
+# Vocabulary sizes evaluated by the report (those below the model's own size)
+REPORT_TOP_K = (20000, 10000, 5000, 2000, 1000)
+
+def select_features(coef: np.ndarray, threshold: float = None, top_k: int = None) -> np.ndarray:
+    """Sorted columns to keep: |coef| >= threshold, then at most the `top_k` largest."""
+    magnitude = np.abs(coef)
+    keep = np.flatnonzero(magnitude >= threshold) if threshold is not None else np.arange(len(coef))
+    if top_k is not None and top_k < len(keep):
+        keep = keep[np.argsort(magnitude[keep], kind="stable")[::-1][:top_k]]
+    if not len(keep):
+        raise ValueError(f"No features left out of {len(coef)} (largest |coef| is {magnitude.max(initial=0.0):.4g}); "
+                         "lower --prune-threshold or raise --prune-top-k")
+    return np.sort(keep)
+
+def prune_pipeline(pipeline, keep: np.ndarray):
+    """Copy of a fitted normalize → TF‑IDF → LogisticRegression pipeline restricted to columns `keep`."""
+    pruned = copy.deepcopy(pipeline)
+    tfidf, clf = pruned.named_steps["tfidf"], pruned.named_steps["clf"]
+    new_col = {int(old): new for new, old in enumerate(keep)}
+    # A fresh vectorizer with the kept terms as its fixed vocabulary, so no fitted width is left over
+    vocabulary = {term: new_col[col] for term, col in tfidf.vocabulary_.items() if col in new_col}
+    vectorizer = TfidfVectorizer(**{**tfidf.get_params(), "vocabulary": vocabulary})
+    vectorizer.idf_ = tfidf.idf_[keep]
+    pruned.steps[[name for name, _ in pruned.steps].index("tfidf")] = ("tfidf", vectorizer)
+    clf.coef_ = clf.coef_[:, keep]
+    clf.n_features_in_ = len(keep)
+    return pruned
+
+# sklearn >= 1.8 selects the penalty through l1_ratio alone
+PENALTY_DEPRECATED = LogisticRegression().get_params()["penalty"] == "deprecated"
+
+def sparse_refit(clf, M_train, y_train, penalty: str, l1_ratio: float = 0.5):
+    """Refit `clf`'s settings with an L1 or elastic-net penalty (saga solver)."""
+    params = clf.get_params()
+    params.update(
+        penalty="deprecated" if PENALTY_DEPRECATED else "elasticnet",  # elastic net with l1_ratio=1 is L1
+        l1_ratio=1.0 if penalty == "l1" else l1_ratio,
+        solver="saga",
+    )
+    return LogisticRegression(**params).fit(M_train, y_train)
+
+def compress(pipeline, M_train=None, y_train=None, threshold=None, top_k=None, refit=None, l1_ratio=0.5):
+    """The pruned (and optionally sparse-refitted) pipeline."""
+    if refit:
+        pipeline = copy.deepcopy(pipeline)
+        clf = sparse_refit(pipeline.named_steps["clf"], M_train, y_train, refit, l1_ratio)
+        pipeline.steps[-1] = ("clf", clf)
+        threshold = max(threshold or 0.0, np.finfo(np.float64).tiny)  # drop the exact zeros
+    coef = pipeline.named_steps["clf"].coef_[0]
+    keep = select_features(coef, threshold, top_k)
+    return pipeline if len(keep) == len(coef) else prune_pipeline(pipeline, keep)
+
+def measure(pipeline, precision: str, texts: list[str], labels, work_dir: Path) -> dict:
+    """Sizes, load time, latency and test scores of one compression level, through LinearScorer."""
+    model_path, pickle_path = work_dir / "level.model", work_dir / "level.pkl"
+    save_compiled(compile_pipeline(pipeline, precision), model_path)
+    joblib.dump(pipeline, pickle_path)
+
+    start = time.perf_counter()
+    scorer = LinearScorer.load(model_path, mmap=False)
+    load_seconds = time.perf_counter() - start
+
+    scorer.predict_proba(texts[:10])  # warm up
+    start = time.perf_counter()
+    proba = scorer.predict_proba(texts)[:, 1]
+    us = (time.perf_counter() - start) / len(texts) * 1e6
+    return {
+        "features": len(pipeline.named_steps["tfidf"].vocabulary_),
+        "precision": precision,
+        "roc_auc": float(roc_auc_score(labels, proba)),
+        "f1": float(f1_score(labels, proba >= 0.5)),
+        "artifact_bytes": model_path.stat().st_size,
+        "pickle_bytes": pickle_path.stat().st_size,
+        "load_ms": round(load_seconds * 1e3, 3),
+        "us_per_sentence": round(us, 2),
+    }
+
+def write_report(pipeline, X_test, y_test, out_dir: Path, extra_levels=()) -> list[dict]:
+    """
+    Measure a ladder of compression levels on the test split and write
+    <out_dir>/compression_report.csv and .json. The levels are the
+    uncompressed model, its REPORT_TOP_K prunings and any (name, pipeline)
+    in `extra_levels`, each at every precision.
+    """
+    texts, labels = list(X_test), np.asarray(y_test)
+    n_features = len(pipeline.named_steps["tfidf"].vocabulary_)
+    levels = [("none", pipeline)]
+    levels += [(f"top-{k}", compress(pipeline, top_k=k)) for k in REPORT_TOP_K if k < n_features]
+    levels += list(extra_levels)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, level in levels:
+            for precision in PRECISIONS:
+                rows.append({"level": name, **measure(level, precision, texts, labels, Path(tmp))})
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with (out_dir / "compression_report.csv").open("w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    (out_dir / "compression_report.json").write_text(json.dumps(rows, indent=2))
+
+    base = rows[0]
+    print(f"\n{'level':<20} {'features':>8} {'precision':>9} {'ROC‑AUC':>8} {'F1':>7} "
+          f"{'artifact KB':>11} {'pickle KB':>10} {'load ms':>8} {'µs/sent':>8}")
+    for row in rows:
+        print(f"{row['level']:<20} {row['features']:>8,} {row['precision']:>9} {row['roc_auc']:>8.4f} "
+              f"{row['f1']:>7.4f} {row['artifact_bytes'] / 1024:>11,.1f} {row['pickle_bytes'] / 1024:>10,.1f} "
+              f"{row['load_ms']:>8.2f} {row['us_per_sentence']:>8.2f}")
+    smallest = min(rows, key=lambda r: r["artifact_bytes"])
+    print(f"Smallest: {smallest['level']} {smallest['precision']}, "
+          f"{smallest['artifact_bytes'] / base['artifact_bytes']:.1%} of the artifact, "
+          f"ROC‑AUC {smallest['roc_auc'] - base['roc_auc']:+.4f}")
+    print(f"Report: {out_dir / 'compression_report.csv'}, {out_dir / 'compression_report.json'}")
+    return rows
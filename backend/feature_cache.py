@@ -0,0 +1,125 @@
+"""
+On-disk cache of vectorized training data.
+
+An entry holds a fitted vectorizer and the CSR train/test matrices it
+produced. The key is a hash of the train and test texts, their
+labels, the vectorizer parameters, the normalizer and the sklearn version.
+A retrain that only changes classifier settings loads the matrices and
+skips normalization and vectorization entirely.
+
+Entries live in models/feature_cache/<key>/. Each lookup evicts entries
+that have not been used for `max_age_days`, then the least recently used
+ones until the cache fits in `max_bytes`.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import sklearn
+from scipy import sparse
+
+from normalize import NORMALIZER, normalize_batch
+
+CACHE_DIR = Path(__file__).parent.parent / "models" / "feature_cache"
+
+def cache_key(vectorizer, X_train, y_train, X_test, y_test) -> str:
+    """Hash of everything that determines the vectorized matrices."""
+    digest = hashlib.sha256()
+    params = sorted((name, repr(value)) for name, value in vectorizer.get_params(deep=False).items())
+    digest.update(json.dumps([type(vectorizer).__name__, params, NORMALIZER, sklearn.__version__]).encode("utf-8"))
+    for texts, labels in ((X_train, y_train), (X_test, y_test)):
+        digest.update("\x00".join(texts).encode("utf-8"))
+        digest.update(b"\x01")
+        digest.update(np.asarray(labels, dtype=np.int64).tobytes())
+        digest.update(b"\x02")
+    return digest.hexdigest()[:32]
+
+class FeatureCache:
+    def __init__(self, root: Path = CACHE_DIR, max_age_days: float = 14, max_bytes: int = 2 << 30):
+        self.root = Path(root)
+        self.max_age = max_age_days * 86400
+        self.max_bytes = max_bytes
+
+    def entries(self) -> list[tuple[float, int, Path]]:
+        """(last used, size in bytes, path) of every complete entry, oldest first."""
+        found = []
+        if self.root.exists():
+            for path in self.root.iterdir():
+                meta = path / "meta.json"
+                if meta.exists():
+                    size = sum(f.stat().st_size for f in path.iterdir())
+                    found.append((meta.stat().st_mtime, size, path))
+        return sorted(found)
+
+    def evict(self) -> list[Path]:
+        """Drop entries older than max_age, then the oldest until under max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = []
+        now = time.time()
+        for used, size, path in entries:
+            if now - used > self.max_age or total > self.max_bytes:
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+                removed.append(path)
+        return removed
+
+    def get(self, key: str):
+        """(vectorizer, X_train, X_test) for `key`, or None."""
+        path = self.root / key
+        if not (path / "meta.json").exists():
+            return None
+        vectorizer = joblib.load(path / "vectorizer.joblib")
+        X_train = sparse.load_npz(path / "X_train.npz")
+        X_test = sparse.load_npz(path / "X_test.npz")
+        os.utime(path / "meta.json")  # mark as recently used
+        return vectorizer, X_train, X_test
+
+    def put(self, key: str, vectorizer, X_train, X_test) -> None:
+        """Write an entry; it only becomes visible once complete."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f".{key}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+        joblib.dump(vectorizer, tmp / "vectorizer.joblib")
+        sparse.save_npz(tmp / "X_train.npz", X_train.tocsr(), compressed=False)
+        sparse.save_npz(tmp / "X_test.npz", X_test.tocsr(), compressed=False)
+        (tmp / "meta.json").write_text(json.dumps({
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "shape_train": list(X_train.shape),
+            "shape_test": list(X_test.shape),
+        }))
+        try:
+            os.replace(tmp, self.root / key)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)  # another run stored the same key first
+
+def featurize(vectorizer, X_train, y_train, X_test, y_test, cache: FeatureCache = None):
+    """
+    Fit `vectorizer` on the normalized training texts and transform both
+    splits, or load the result from `cache`. Returns
+    (fitted vectorizer, X_train matrix, X_test matrix, cache hit).
+    """
+    X_train, X_test = list(X_train), list(X_test)
+    key = None
+    if cache is not None:
+        cache.evict()
+        key = cache_key(vectorizer, X_train, y_train, X_test, y_test)
+        cached = cache.get(key)
+        if cached is not None:
+            return (*cached, True)
+
+    train_matrix = vectorizer.fit_transform(normalize_batch(X_train))
+    test_matrix = vectorizer.transform(normalize_batch(X_test))
+    # stop_words_ holds every n-gram cut by max_features; it is only for introspection
+    if hasattr(vectorizer, "stop_words_"):
+        del vectorizer.stop_words_
+    if cache is not None:
+        cache.put(key, vectorizer, train_matrix, test_matrix)
+    return vectorizer, train_matrix, test_matrix, False
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+"""
+MinHash / LSH index of near-duplicate sentences in the training corpus.
+
+Each sentence becomes a set of word shingles, summarized by a MinHash
+signature (`num_perm` multiply-shift hashes). Signatures are cut into
+`bands`; sentences that share a band are candidate duplicates, and a
+candidate pair is kept when the signatures agree on at least `threshold`
+of their positions (an estimate of Jaccard similarity). Clusters are the
+connected components of the kept pairs. Everything is vectorized, so the
+cost grows roughly linearly with the corpus.
+
+The index is saved with the content hash of every sentence it covers.
+Both the store and the text files are append-only, so the next run only
+computes signatures for sentences past the saved prefix.
+
+Usage:
+    python near_dup.py              # update the index and print cluster stats
+    python near_dup.py --rebuild    # recompute every signature
+"""
+
+import argparse
+import re
+import sys
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+ROOT_DIR   = Path(__file__).parent.parent
+INDEX_PATH = ROOT_DIR / "models" / "near_dup_index.npz"
+sys.path.append(str(ROOT_DIR / "data"))
+
+from datastore import STORE_DIR, DatasetStore, text_hash
+
+WORD_RE = re.compile(r"\w+")
+CHUNK_SHINGLES = 1 << 15  # shingles hashed per vectorized step
+BUCKET_WINDOW  = 64       # later members of its bucket each sentence is paired with
+# Bumped when signatures of the same text change; saved indexes of another version are rebuilt
+SIGNATURE_VERSION = 2     # 2: texts without words hash their characters
+
+def shingles(text: str, size: int) -> list[int]:
+    """
+    crc32 of each `size`-word shingle (the whole text when it is shorter).
+    A text with no words at all (punctuation, emoji) hashes its characters,
+    so such texts only match when they are identical.
+    """
+    words = WORD_RE.findall(text.lower())
+    if not words:
+        return [zlib.crc32(text.strip().encode("utf-8"))]
+    if len(words) <= size:
+        return [zlib.crc32(" ".join(words).encode("utf-8"))]
+    return [zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)]
+
+class MinHashIndex:
+    def __init__(self, num_perm=128, bands=32, shingle=3, threshold=0.6, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm, self.bands, self.shingle, self.threshold, self.seed = num_perm, bands, shingle, threshold, seed
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)  # odd multipliers
+        self.b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+        self.band_mix = rng.integers(1, 2 ** 63, num_perm // bands, dtype=np.uint64) | np.uint64(1)
+        self.signatures = np.empty((0, num_perm), dtype=np.uint32)
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.version = SIGNATURE_VERSION
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def params(self) -> np.ndarray:
+        return np.array([self.num_perm, self.bands, self.shingle, self.seed], dtype=np.int64)
+
+    def signature(self, texts) -> np.ndarray:
+        """MinHash signatures, shape (len(texts), num_perm)."""
+        out = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        start = 0
+        while start < len(texts):
+            # Take sentences until the chunk holds about CHUNK_SHINGLES shingles
+            hashes, lengths, end = [], [], start
+            while end < len(texts) and (not hashes or len(hashes) < CHUNK_SHINGLES):
+                found = shingles(texts[end], self.shingle)
+                hashes.extend(found)
+                lengths.append(len(found))
+                end += 1
+            x = np.array(hashes, dtype=np.uint64)[:, None]
+            # Multiply-shift hashing: the top 32 bits of a*x + b (mod 2**64)
+            h = ((x * self.a + self.b) >> np.uint64(32)).astype(np.uint32)
+            offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+            out[start:end] = np.minimum.reduceat(h, offsets, axis=0)
+            start = end
+        return out
+
+    def add(self, texts, keys) -> None:
+        """Append sentences; `keys` are their content hashes, used to detect a changed corpus."""
+        self.signatures = np.concatenate([self.signatures, self.signature(texts)])
+        self.keys = np.concatenate([self.keys, np.asarray(keys, dtype=np.uint64)])
+
+    def candidate_pairs(self):
+        """
+        (i, j) pairs that share at least one band: every pair within a bucket,
+        except that in buckets larger than BUCKET_WINDOW + 1 each member is
+        only paired with the next BUCKET_WINDOW.
+        """
+        rows = self.num_perm // self.bands
+        pairs_i, pairs_j = [], []
+        for band in range(self.bands):
+            block = self.signatures[:, band * rows:(band + 1) * rows].astype(np.uint64)
+            bucket = (block * self.band_mix).sum(axis=1)  # wraps mod 2**64
+            order = np.argsort(bucket, kind="stable")
+            sorted_bucket = bucket[order]
+            for step in range(1, min(BUCKET_WINDOW, len(order) - 1) + 1):
+                same = np.flatnonzero(sorted_bucket[step:] == sorted_bucket[:-step])
+                if not len(same):
+                    break  # no bucket has more than `step` members
+                pairs_i.append(order[same])
+                pairs_j.append(order[same + step])
+        if not pairs_i:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(pairs_i), np.concatenate(pairs_j)
+
+    def clusters(self) -> np.ndarray:
+        """Cluster id of every sentence; sentences with no near duplicate get their own id."""
+        n = len(self)
+        i, j = self.candidate_pairs()
+        if len(i):
+            pairs = np.unique(np.stack([i, j], axis=1), axis=0)
+            i, j = pairs[:, 0], pairs[:, 1]
+            agree = (self.signatures[i] == self.signatures[j]).mean(axis=1)
+            i, j = i[agree >= self.threshold], j[agree >= self.threshold]
+        graph = coo_matrix((np.ones(len(i), dtype=np.int8), (i, j)), shape=(n, n))
+        _, labels = connected_components(graph, directed=False)
+        return labels
+
+    def save(self, path: Path = INDEX_PATH) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez(tmp, params=self.params(), threshold=self.threshold, signatures=self.signatures, keys=self.keys,
+                 version=SIGNATURE_VERSION)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path = INDEX_PATH) -> "MinHashIndex":
+        with np.load(path) as data:
+            num_perm, bands, shingle, seed = data["params"].tolist()
+            index = cls(num_perm, bands, shingle, float(data["threshold"]), seed)
+            index.signatures = data["signatures"]
+            index.version = int(data["version"]) if "version" in data else 1
+            index.keys = data["keys"]
+        return index
+
+def update_index(texts, keys, path: Path = INDEX_PATH, rebuild=False, **params) -> MinHashIndex:
+    """
+    Load the index at `path` and add the sentences it has not seen yet. The
+    saved sentences must be a prefix of `keys`; otherwise (or on `rebuild`,
+    or different signature parameters) every signature is recomputed. A new
+    `threshold` alone keeps them.
+    """
+    keys = np.asarray(keys, dtype=np.uint64)
+    fresh = MinHashIndex(**params)
+    index = None
+    if path.exists() and not rebuild:
+        index = MinHashIndex.load(path)
+        same_signatures = np.array_equal(index.params(), fresh.params()) and index.version == SIGNATURE_VERSION
+        if not same_signatures or len(index) > len(keys) or not np.array_equal(index.keys, keys[:len(index)]):
+            index = None
+    if index is None:
+        index = fresh
+    changed = index.threshold != fresh.threshold or len(index) < len(keys)
+    index.threshold = fresh.threshold  # only used for clustering; the signatures do not depend on it
+    if len(index) < len(keys):
+        index.add(texts[len(index):], keys[len(index):])
+    if changed:
+        index.save(path)
+    return index
+
+def collapse(labels: np.ndarray, clusters: np.ndarray) -> np.ndarray:
+    """Positions of the first sentence of each (cluster, label) pair."""
+    _, first = np.unique(np.stack([clusters, labels], axis=1), axis=0, return_index=True)
+    return np.sort(first)
+
+def group_split(labels: np.ndarray, groups: np.ndarray, test_size=0.2, seed=42):
+    """
+    (train positions, test positions) with every group entirely on one side.
+    Groups are stratified by their majority label and shuffled; each group
+    goes to test if it still fits in `test_size` of its stratum's sentences.
+    A stratum of two or more groups always puts at least its smallest one
+    in test.
+    """
+    labels, groups = np.asarray(labels), np.asarray(groups)
+    ids, inverse = np.unique(groups, return_inverse=True)
+    sizes = np.bincount(inverse)
+    votes = np.zeros((len(ids), labels.max() + 1), dtype=np.int64)
+    np.add.at(votes, (inverse, labels), 1)
+    majority = votes.argmax(axis=1)
+
+    order = np.random.default_rng(seed).permutation(len(ids))
+    in_test = np.zeros(len(ids), dtype=bool)
+    for label in np.unique(majority):
+        stratum = order[majority[order] == label]
+        room = round(test_size * sizes[stratum].sum())
+        for group in stratum.tolist():
+            if sizes[group] <= room:
+                in_test[group] = True
+                room -= sizes[group]
+        if len(stratum) > 1 and not in_test[stratum].any():
+            in_test[stratum[np.argmin(sizes[stratum])]] = True
+    test = in_test[inverse]
+    return np.flatnonzero(~test), np.flatnonzero(test)
+
+def group_kfold(labels: np.ndarray, groups: np.ndarray, n_splits=5, seed=42):
+    """
+    [(train positions, validation positions)] for `n_splits` folds, with
+    every group in a single fold and folds stratified like group_split.
+    """
+    labels, groups = np.asarray(labels), np.asarray(groups)
+    ids, inverse = np.unique(groups, return_inverse=True)
+    sizes = np.bincount(inverse)
+    votes = np.zeros((len(ids), labels.max() + 1), dtype=np.int64)
+    np.add.at(votes, (inverse, labels), 1)
+    majority = votes.argmax(axis=1)
+
+    order = np.random.default_rng(seed).permutation(len(ids))
+    fold_of_group = np.zeros(len(ids), dtype=np.int64)
+    for label in np.unique(majority):
+        stratum = order[majority[order] == label]
+        before = np.cumsum(sizes[stratum]) - sizes[stratum]
+        fold_of_group[stratum] = before * n_splits // sizes[stratum].sum()
+    fold = fold_of_group[inverse]
+    return [(np.flatnonzero(fold != k), np.flatnonzero(fold == k)) for k in range(n_splits)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild", action="store_true", help="ignore the saved index")
+    parser.add_argument("--threshold", type=float, default=0.6, help="min estimated Jaccard similarity")
+    parser.add_argument("--examples", type=int, default=5, help="largest clusters to print")
+    args = parser.parse_args()
+
+    if (STORE_DIR / "manifest.json").exists():
+        rows = list(DatasetStore(STORE_DIR))
+    else:
+        rows = []
+        for name, label in (("humanData.txt", 0), ("aiData.txt", 1)):
+            with (ROOT_DIR / "data" / name).open(encoding="utf-8") as f:
+                rows.extend((line.strip(), label, name) for line in f if line.strip())
+    texts = [text for text, _, _ in rows]
+    labels = np.array([label for _, label, _ in rows])
+
+    start = time.perf_counter()
+    before = len(MinHashIndex.load(INDEX_PATH)) if INDEX_PATH.exists() and not args.rebuild else 0
+    index = update_index(texts, [text_hash(t) for t in texts], rebuild=args.rebuild, threshold=args.threshold)
+    clusters = index.clusters()
+    elapsed = time.perf_counter() - start
+
+    sizes = np.bincount(clusters)
+    print(f"{len(texts):,} sentences, {len(index) - min(before, len(index)):,} newly hashed, {elapsed:.2f}s")
+    print(f"{len(sizes):,} clusters; {int((sizes > 1).sum()):,} have near duplicates, "
+          f"covering {int(sizes[sizes > 1].sum()):,} sentences")
+    for label, name in ((0, "Human"), (1, "AI")):
+        mask = labels == label
+        print(f"  {name:<5}: {int(mask.sum()):,} sentences in {len(np.unique(clusters[mask])):,} clusters")
+    for cluster in np.argsort(sizes)[::-1][:args.examples]:
+        if sizes[cluster] < 2:
+            break
+        members = np.flatnonzero(clusters == cluster)
+        print(f"\n[{sizes[cluster]} sentences]")
+        for i in members[:3]:
+            print(f"  {texts[i][:100]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Text normalization shared by training and inference.
+
+Removes URLs and emails, strips ASCII punctuation and lowercases, exactly as
+train.py's old per-row `basic_clean` did, with the patterns and translation
+table built once. Trained pipelines start with a `normalize` step
+(`make_step()`), and compiled artifacts record NORMALIZER, so every scorer
+applies the same transform to its input.
+
+- `normalize(text)`         one string
+- `normalize_batch(texts)`  a list, Series or array; splits large inputs
+                            across processes when `processes` > 1
+- `normalize_series(s)`     a pandas Series, through pandas string methods
+"""
+
+import re
+import string
+from multiprocessing import get_context
+
+NORMALIZER = "basic-v1"  # bump when the transform changes; artifacts record it
+
+URL_RE   = re.compile(r"http\S+|www.\S+")
+EMAIL_RE = re.compile(r"\S+@\S+")
+PUNCT    = str.maketrans("", "", string.punctuation)
+
+CHUNK_SIZE = 50_000  # texts per worker task in normalize_batch
+
+def normalize(text: str) -> str:
+    # The substring checks are much cheaper than a regex scan, and most sentences have neither
+    if "http" in text or "www" in text:
+        text = URL_RE.sub("", text)
+    if "@" in text:
+        text = EMAIL_RE.sub("", text)
+    return text.translate(PUNCT).lower()
+
+def _normalize_chunk(texts: list[str]) -> list[str]:
+    return [normalize(t) for t in texts]
+
+def normalize_batch(texts, processes: int = 1) -> list[str]:
+    """Normalize many texts; with `processes` > 1, large inputs are split across a process pool."""
+    texts = list(texts)
+    if processes <= 1 or len(texts) <= CHUNK_SIZE:
+        return _normalize_chunk(texts)
+    chunks = [texts[i:i + CHUNK_SIZE] for i in range(0, len(texts), CHUNK_SIZE)]
+    with get_context("fork").Pool(processes) as pool:
+        return [t for chunk in pool.map(_normalize_chunk, chunks) for t in chunk]
+
+def normalize_series(series):
+    """The same transform on a pandas Series, with pandas string methods."""
+    return (
+        series.str.replace(URL_RE, "", regex=True)
+              .str.replace(EMAIL_RE, "", regex=True)
+              .str.translate(PUNCT)
+              .str.lower()
+    )
+
+NORMALIZERS = {NORMALIZER: normalize_batch}
+
+def get_normalizer(name):
+    """The batch function for a normalizer name recorded in an artifact (None: no normalization)."""
+    if name is None:
+        return None
+    if name not in NORMALIZERS:
+        raise ValueError(f"Unknown normalizer '{name}'; this build knows {sorted(NORMALIZERS)}")
+    return NORMALIZERS[name]
+
+def make_step():
+    """A pipeline step that normalizes its input, for Pipeline([("normalize", make_step()), ...])."""
+    from sklearn.preprocessing import FunctionTransformer
+    return FunctionTransformer(normalize_batch)
@@ -1,29 +1,184 @@
 #!/usr/bin/env python
 """
-Predict AI vs Human for a list of sentences.
+Predict AI vs Human for a list of sentences, or score whole documents in bulk.
 Usage:
     python predict.py "Your sentence here." "Another sentence."
+    python predict.py -i essays/ -i notes.txt         # files and directories
+    python predict.py -i corpus.jsonl --workers 8     # JSONL with id + text fields
+    cat pages.txt | python predict.py -i -            # stdin, one document per line
+
+Document mode segments each document, scores sentences in large vectorized
+batches across a pool of forked workers that share the loaded model, and
+streams one JSON line per document. JSONL records that are not objects
+with a string text field are reported on stderr and skipped. A throughput
+summary goes to stderr.
 """
 
+import argparse
+import json
+import os
 import sys
-import joblib
+import time
+from collections import deque
+from multiprocessing import get_context
 from pathlib import Path
 
-ROOT_DIR   = Path(__file__).parent.parent
-MODEL_PATH = ROOT_DIR / "models" / "ai_detector.pkl"
+from compiled_model import load_model
+from segmenters import load_segmenter
+
+# Load the compiled scorer if it exists, else the pipeline (SCORER=compiled|sklearn),
+# from MODEL_DIR (default models/). Loaded before any worker is forked, so
+# workers share it copy-on-write.
+MODEL_DIR = Path(os.environ.get("MODEL_DIR", Path(__file__).parent.parent / "models"))
+pipeline, _ = load_model(MODEL_DIR / "ai_detector.pkl", MODEL_DIR / "ai_detector.model", kind=os.environ.get("SCORER"))
+segmenter = None
+skipped_records = 0
 
-# Load the pipeline
-pipeline = joblib.load(MODEL_PATH)
+# Rough characters per sentence, used to size the document groups sent to workers
+CHARS_PER_SENTENCE = 100
 
 def predict(text: str) -> str:
     prob = pipeline.predict_proba([text])[0][1]  # probability that it is AI
     label = "AI" if prob >= 0.5 else "Human"
     return f"✅ {label}  (p= {prob:.2f})"
 
+# ------------------ Document mode ------------------
+
+def read_jsonl(lines, source, id_field, text_field):
+    global skipped_records
+    for n, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            problem = f"invalid JSON ({e})"
+        else:
+            if not isinstance(record, dict):
+                problem = "not a JSON object"
+            elif not isinstance(record.get(text_field), str):
+                problem = f"no string field '{text_field}'"
+            else:
+                yield record.get(id_field, f"{source}:{n}"), record[text_field]
+                continue
+        skipped_records += 1
+        print(f"Skipping {source}:{n}: {problem}", file=sys.stderr)
+
+def read_documents(inputs, jsonl, id_field, text_field):
+    """Yield (id, text) from files, directories (recursively) and '-' for stdin."""
+    for item in inputs:
+        if item == "-":
+            if jsonl:
+                yield from read_jsonl(sys.stdin, "stdin", id_field, text_field)
+            else:
+                for n, line in enumerate(sys.stdin, 1):
+                    if line.strip():
+                        yield f"stdin:{n}", line
+            continue
+        path = Path(item)
+        files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+        for file in files:
+            with file.open(encoding="utf-8", errors="replace") as f:
+                if jsonl or file.suffix == ".jsonl":
+                    yield from read_jsonl(f, str(file), id_field, text_field)
+                else:
+                    yield str(file), f.read()
+
+def group_documents(docs, batch_size):
+    """Group documents so that each group holds about `batch_size` sentences."""
+    group, chars = [], 0
+    for doc in docs:
+        group.append(doc)
+        chars += len(doc[1])
+        if chars >= batch_size * CHARS_PER_SENTENCE:
+            yield group
+            group, chars = [], 0
+    if group:
+        yield group
+
+def score_group(group, batch_size, with_sentences):
+    """Segment a group of documents and score their sentences in vectorized batches."""
+    per_doc = [[s.strip() for s in segmenter.split(text)] for _, text in group]
+    flat = [s for sentences in per_doc for s in sentences]
+    probs = []
+    for i in range(0, len(flat), batch_size):
+        probs.extend(pipeline.predict_proba(flat[i:i + batch_size])[:, 1].tolist())
+
+    results, i = [], 0
+    for (doc_id, _), sentences in zip(group, per_doc):
+        doc_probs = probs[i:i + len(sentences)]
+        i += len(sentences)
+        result = {
+            "id": doc_id,
+            "prob": sum(doc_probs) / len(doc_probs) if doc_probs else None,
+            "ai_fraction": sum(p >= 0.5 for p in doc_probs) / len(doc_probs) if doc_probs else None,
+            "n_sentences": len(sentences),
+        }
+        if with_sentences:
+            result["sentences"] = [{"text": s, "prob": p} for s, p in zip(sentences, doc_probs)]
+        results.append(result)
+    return results
+
+def run_documents(args):
+    global segmenter
+    segmenter = load_segmenter(args.segmenter)
+    groups = group_documents(read_documents(args.inputs, args.jsonl, args.id_field, args.text_field), args.batch_size)
+    score = lambda g: score_group(g, args.batch_size, not args.no_sentences)
+
+    n_docs = n_sentences = 0
+    start = time.perf_counter()
+
+    def emit(results):
+        nonlocal n_docs, n_sentences
+        for result in results:
+            sys.stdout.write(json.dumps(result) + "\n")
+            n_docs += 1
+            n_sentences += result["n_sentences"]
+
+    if args.workers <= 1:
+        for group in groups:
+            emit(score(group))
+    else:
+        # Bounded window of in-flight groups keeps memory flat and output in input order
+        with get_context("fork").Pool(args.workers) as pool:
+            in_flight = deque()
+            for group in groups:
+                in_flight.append(pool.apply_async(score_group, (group, args.batch_size, not args.no_sentences)))
+                if len(in_flight) >= args.workers * 2:
+                    emit(in_flight.popleft().get())
+            while in_flight:
+                emit(in_flight.popleft().get())
+    sys.stdout.flush()
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"{n_docs:,} documents, {n_sentences:,} sentences in {elapsed:.2f}s "
+        f"({n_docs / elapsed:,.1f} docs/s, {n_sentences / elapsed:,.0f} sentences/s, {args.workers} workers)"
+        + (f", {skipped_records:,} records skipped" if skipped_records else ""),
+        file=sys.stderr,
+    )
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sentences", nargs="*", help="sentences to classify")
+    parser.add_argument("-i", "--inputs", action="append", metavar="PATH",
+                        help="file, directory or - for stdin; repeat for several")
+    parser.add_argument("--jsonl", action="store_true", help="treat inputs as JSONL (.jsonl files always are)")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--batch-size", type=int, default=4096, help="sentences per vectorized call")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--segmenter", default=os.environ.get("SEGMENTER", "spacy"))
+    parser.add_argument("--no-sentences", action="store_true", help="only output per-document aggregates")
+    args = parser.parse_args()
+
+    if args.inputs:
+        run_documents(args)
+        sys.exit(0)
+
+    if not args.sentences:
         print("Provide at least one sentence to classify.")
         sys.exit(1)
 
-    for sentence in sys.argv[1:]:
+    for sentence in args.sentences:
         print(predict(sentence))
@@ -0,0 +1,183 @@
+"""
+Cross-validated hyperparameter search for train.py (`python train.py --search grid`).
+
+Candidates are grouped by vectorizer settings. For each group, every fold
+is vectorized once (in parallel) and all classifier settings are fitted
+on those shared matrices, again fold-parallel with joblib. When a candidate
+finishes, a row is appended to the CSV and JSONL leaderboards in
+`out_dir`. Each row has its cross-validated scores, fit time, compiled
+model size and per-sentence scoring time through the compiled scorer (the
+serving path). Candidates over the latency or size budget are marked.
+"""
+
+import csv
+import itertools
+import json
+import random
+import time
+from pathlib import Path
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+from sklearn.pipeline import Pipeline
+
+from compiled_model import LinearScorer, compile_pipeline
+from normalize import make_step, normalize_batch
+
+# train.py's TF‑IDF and LogisticRegression settings that the search does not vary
+BASE_VECTORIZER = {"stop_words": "english", "lowercase": False}
+BASE_CLASSIFIER = {"max_iter": 2000, "solver": "lbfgs"}
+
+VECTORIZER_GRID = {
+    "ngram_range": [(1, 1), (1, 2), (1, 3)],
+    "max_features": [20000, 50000, 100000],
+}
+CLASSIFIER_GRID = {
+    "C": [0.1, 0.3, 1.0, 3.0, 10.0],
+    "class_weight": ["balanced", None],
+}
+
+LATENCY_SAMPLE = 2000  # validation sentences timed per candidate
+
+def expand(grid: dict) -> list[dict]:
+    return [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+
+def candidates(mode: str, n_iter: int, seed: int = 42) -> list[tuple[dict, dict]]:
+    """(vectorizer params, classifier params) pairs: the full grid, or `n_iter` random ones."""
+    pairs = list(itertools.product(expand(VECTORIZER_GRID), expand(CLASSIFIER_GRID)))
+    if mode == "random" and n_iter < len(pairs):
+        pairs = random.Random(seed).sample(pairs, n_iter)
+    return pairs
+
+def vectorize_fold(params: dict, train_texts: list[str], val_texts: list[str]):
+    vectorizer = TfidfVectorizer(**BASE_VECTORIZER, **params)
+    X_train = vectorizer.fit_transform(train_texts)
+    X_val = vectorizer.transform(val_texts)
+    if hasattr(vectorizer, "stop_words_"):
+        del vectorizer.stop_words_
+    return vectorizer, X_train, X_val
+
+def fit_fold(params: dict, X_train, y_train, X_val, y_val) -> dict:
+    clf = LogisticRegression(**BASE_CLASSIFIER, **params)
+    start = time.perf_counter()
+    clf.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    proba = clf.predict_proba(X_val)[:, 1]
+    pred = (proba >= 0.5).astype(int)
+    return {
+        "clf": clf,
+        "fit_seconds": fit_seconds,
+        "accuracy": accuracy_score(y_val, pred),
+        "f1": f1_score(y_val, pred),
+        "roc_auc": roc_auc_score(y_val, proba) if len(np.unique(y_val)) > 1 else float("nan"),
+    }
+
+def serving_cost(vectorizer, clf, sample: list[str]) -> tuple[float, float]:
+    """(compiled model size in MB, µs per sentence) through LinearScorer, as the server runs it."""
+    compiled = compile_pipeline(Pipeline([("normalize", make_step()), ("tfidf", vectorizer), ("clf", clf)]))
+    size_mb = sum(a.nbytes for a in compiled["arrays"].values()) / 1e6
+    scorer = LinearScorer(compiled["arrays"], compiled["model"])
+    scorer.predict_proba(sample[:10])  # warm up
+    start = time.perf_counter()
+    scorer.predict_proba(sample)
+    return size_mb, (time.perf_counter() - start) / len(sample) * 1e6
+
+class Leaderboard:
+    """Appends one row per finished candidate to <out_dir>/leaderboard.csv and .jsonl."""
+
+    FIELDS = [
+        "ngram_range", "max_features", "C", "class_weight",
+        "accuracy", "accuracy_std", "f1", "roc_auc", "fit_seconds",
+        "model_mb", "us_per_sentence", "within_budget",
+    ]
+
+    def __init__(self, out_dir: Path):
+        out_dir.mkdir(parents=True, exist_ok=True)
+        self.csv_path = out_dir / "leaderboard.csv"
+        self.jsonl_path = out_dir / "leaderboard.jsonl"
+        self.rows = []
+        with self.csv_path.open("w", newline="") as f:
+            csv.writer(f).writerow(self.FIELDS)
+        self.jsonl_path.write_text("")
+
+    def add(self, row: dict):
+        self.rows.append(row)
+        with self.csv_path.open("a", newline="") as f:
+            csv.writer(f).writerow([row[field] for field in self.FIELDS])
+        with self.jsonl_path.open("a") as f:
+            f.write(json.dumps(row) + "\n")
+
+    def ranked(self) -> list[dict]:
+        """Within-budget candidates first, then by mean accuracy, then by latency."""
+        return sorted(self.rows, key=lambda r: (not r["within_budget"], -r["accuracy"], r["us_per_sentence"]))
+
+def run_search(texts, labels, folds, mode="grid", n_iter=20, n_jobs=-1, out_dir: Path = Path("search"),
+               latency_budget_us=None, size_budget_mb=None) -> list[dict]:
+    """
+    Cross-validate every candidate on `folds` ([(train positions, validation positions)])
+    and return the leaderboard rows, best first.
+    """
+    raw_texts = list(texts)
+    texts = normalize_batch(raw_texts)  # normalized once, shared by every fold and candidate
+    labels = np.asarray(labels)
+    pairs = candidates(mode, n_iter)
+    by_vectorizer = {}
+    for vec_params, clf_params in pairs:
+        by_vectorizer.setdefault(json.dumps(vec_params), []).append(clf_params)
+
+    board = Leaderboard(out_dir)
+    parallel = Parallel(n_jobs=n_jobs)
+    print(f"Searching {len(pairs)} candidates ({len(by_vectorizer)} vectorizer settings) over {len(folds)} folds")
+
+    for vec_key, clf_grid in by_vectorizer.items():
+        vec_params = {k: tuple(v) if isinstance(v, list) else v for k, v in json.loads(vec_key).items()}
+        start = time.perf_counter()
+        vectorized = parallel(
+            delayed(vectorize_fold)(vec_params, [texts[i] for i in tr], [texts[i] for i in va]) for tr, va in folds
+        )
+        print(f"  vectorized {vec_params} × {len(folds)} folds in {time.perf_counter() - start:.1f}s")
+
+        jobs = [
+            delayed(fit_fold)(clf_params, X_train, labels[tr], X_val, labels[va])
+            for clf_params in clf_grid
+            for (_, X_train, X_val), (tr, va) in zip(vectorized, folds)
+        ]
+        results = parallel(jobs)
+
+        # Serving cost of each candidate's first-fold model, timed on first-fold validation sentences
+        sample = [raw_texts[i] for i in folds[0][1][:LATENCY_SAMPLE]]
+        for n, clf_params in enumerate(clf_grid):
+            per_fold = results[n * len(folds):(n + 1) * len(folds)]
+            model_mb, us = serving_cost(vectorized[0][0], per_fold[0]["clf"], sample)
+            row = {
+                "ngram_range": list(vec_params["ngram_range"]),
+                "max_features": vec_params["max_features"],
+                "C": clf_params["C"],
+                "class_weight": clf_params["class_weight"],
+                "accuracy": float(np.mean([r["accuracy"] for r in per_fold])),
+                "accuracy_std": float(np.std([r["accuracy"] for r in per_fold])),
+                "f1": float(np.mean([r["f1"] for r in per_fold])),
+                "roc_auc": float(np.mean([r["roc_auc"] for r in per_fold])),
+                "fit_seconds": float(np.mean([r["fit_seconds"] for r in per_fold])),
+                "model_mb": round(model_mb, 3),
+                "us_per_sentence": round(us, 2),
+                "within_budget": (latency_budget_us is None or us <= latency_budget_us)
+                                 and (size_budget_mb is None or model_mb <= size_budget_mb),
+            }
+            board.add(row)
+
+    ranked = board.ranked()
+    (out_dir / "leaderboard.json").write_text(json.dumps(ranked, indent=2))
+
+    print(f"\n{'ngram':<7} {'features':>8} {'C':>6} {'weight':>9} {'accuracy':>9} {'F1':>7} "
+          f"{'fit s':>6} {'MB':>6} {'µs/sent':>8} budget")
+    for row in ranked[:10]:
+        print(f"{str(tuple(row['ngram_range'])):<7} {row['max_features']:>8} {row['C']:>6} "
+              f"{str(row['class_weight']):>9} {row['accuracy']:>9.4f} {row['f1']:>7.4f} "
+              f"{row['fit_seconds']:>6.2f} {row['model_mb']:>6.3f} {row['us_per_sentence']:>8.1f} "
+              f"{'ok' if row['within_budget'] else 'over'}")
+    print(f"\nLeaderboard: {out_dir / 'leaderboard.csv'}, {out_dir / 'leaderboard.json'}")
+    return ranked
@@ -0,0 +1,87 @@
+"""
+Sentence segmentation backends.
+
+Every backend returns (start, end) character spans so callers can either
+slice out sentences or track offsets. Pick one by name with
+`load_segmenter`:
+
+    spacy        full en_core_web_sm parse (reference, slowest)
+    spacy-senter en_core_web_sm with only the statistical sentence recognizer
+    sentencizer  spaCy's rule-based sentencizer on a blank English pipeline
+    regex        punctuation + capital letter regex, no spaCy at all
+"""
+
+import re
+
+# Components of the trained pipelines that play no part in sentence boundaries
+UNUSED_COMPONENTS = ["tagger", "parser", "ner", "lemmatizer", "attribute_ruler"]
+
+class SpacySegmenter:
+    """Sentence spans from any spaCy pipeline that sets `doc.sents`."""
+
+    def __init__(self, nlp):
+        self.nlp = nlp
+
+    @staticmethod
+    def _spans(doc):
+        return [(sent.start_char, sent.end_char) for sent in doc.sents]
+
+    def spans(self, text: str):
+        return self._spans(self.nlp(text))
+
+    def split(self, text: str):
+        return [text[a:b] for a, b in self.spans(text) if text[a:b].strip()]
+
+    def pipe(self, texts, batch_size=64, n_process=1):
+        """Yield span lists for many texts, batched (and optionally multi-process)."""
+        for doc in self.nlp.pipe(texts, batch_size=batch_size, n_process=n_process):
+            yield self._spans(doc)
+
+class RegexSegmenter:
+    """
+    Split after . ! ? when followed by whitespace and a capital letter or
+    an opening quote, and at blank lines. The AI data generator splits only
+    before a capital letter, so this also breaks before quoted sentences
+    and between paragraphs that lack final punctuation.
+    """
+
+    BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[A-Z\"'“])|\n\s*\n")
+
+    def spans(self, text: str):
+        spans = []
+        start = 0
+        for match in self.BOUNDARY.finditer(text):
+            spans.append((start, match.start()))
+            start = match.end()
+        spans.append((start, len(text)))
+        return spans
+
+    def split(self, text: str):
+        return [text[a:b] for a, b in self.spans(text) if text[a:b].strip()]
+
+    def pipe(self, texts, batch_size=64, n_process=1):
+        for text in texts:
+            yield self.spans(text)
+
+def load_segmenter(name: str = "spacy", model: str = "en_core_web_sm"):
+    """Build a segmentation backend by name (see module docstring)."""
+    if name == "regex":
+        return RegexSegmenter()
+
+    import spacy
+
+    if name == "spacy":
+        return SpacySegmenter(spacy.load(model))
+    if name == "spacy-senter":
+        nlp = spacy.load(model, exclude=UNUSED_COMPONENTS)
+        nlp.enable_pipe("senter")
+        # senter has its own embedding; drop the shared tok2vec if nothing listens to it
+        if "tok2vec" in nlp.pipe_names and not nlp.get_pipe("tok2vec").listening_components:
+            nlp.disable_pipe("tok2vec")
+        return SpacySegmenter(nlp)
+    if name == "sentencizer":
+        nlp = spacy.blank("en")
+        nlp.add_pipe("sentencizer")
+        return SpacySegmenter(nlp)
+
+    raise ValueError(f"Unknown segmenter '{name}' (choose spacy, spacy-senter, sentencizer or regex)")
@@ -3,12 +3,21 @@
 Train an AI‑vs‑Human sentence detector.
 
 Usage:
-    python train.py  # runs the whole pipeline
+    python train.py                        # runs the whole pipeline
+    python train.py --collapse-near-dups   # keep one sentence per near-duplicate cluster
+    python train.py --split random         # plain stratified split, ignoring near duplicates
+    python train.py --C 0.5                # reuses the cached feature matrices from the last run
+    python train.py --search grid          # cross-validated search, writes models/search/leaderboard.*
+    python train.py --prune-top-k 5000 --precision int8 --compression-report   # smaller serving model
+    python train.py --cascade --cascade-band 0.3 0.7 --cascade-report         # char n-gram model for unsure sentences
 """
 
+import argparse
+import json
 import os
-import re
-import string
+import sys
+import time
+import hashlib
 from pathlib import Path
 import joblib
 
@@ -23,19 +32,100 @@ from sklearn.metrics import (
 )
 from sklearn.pipeline import Pipeline
 
+from cascade import DEFAULT_BAND, Cascade, compile_cascade, secondary_classifier, secondary_vectorizer
+from cascade import write_report as write_cascade_report
+from compiled_model import PRECISIONS, compile_pipeline, save_compiled
+from compress_model import compress, write_report
+from feature_cache import FeatureCache, featurize
+from near_dup import collapse, group_kfold, group_split, update_index
+from normalize import make_step
+from search import run_search
+
+parser = argparse.ArgumentParser(description="Train the AI‑vs‑Human sentence detector")
+parser.add_argument("--split", choices=["group", "random"], default="group",
+                    help="group: near-duplicate clusters never cross the train/test split")
+parser.add_argument("--collapse-near-dups", action="store_true",
+                    help="train and test on one sentence per near-duplicate cluster and label")
+parser.add_argument("--near-dup-threshold", type=float, default=0.6,
+                    help="min estimated Jaccard similarity of near duplicates")
+parser.add_argument("--ngram-max", type=int, default=2, help="longest word n-gram")
+parser.add_argument("--max-features", type=int, default=50000, help="vocabulary size")
+parser.add_argument("--C", type=float, default=1.0, help="inverse regularization strength")
+parser.add_argument("--class-weight", choices=["balanced", "none"], default="balanced")
+parser.add_argument("--no-feature-cache", action="store_true", help="always re-vectorize")
+parser.add_argument("--cache-max-age-days", type=float, default=14, help="evict cache entries unused for longer")
+parser.add_argument("--cache-max-gb", type=float, default=2.0, help="evict oldest cache entries beyond this size")
+parser.add_argument("--data-dir", type=Path, help="read store/ or humanData.txt + aiData.txt from here (default: data/)")
+parser.add_argument("--output-dir", type=Path, help="write models and caches here (default: models/)")
+parser.add_argument("--timings-json", type=Path, help="also write the stage timings to this file")
+parser.add_argument("--search", choices=["grid", "random"],
+                    help="cross-validate candidate settings on the training split instead of training one model")
+parser.add_argument("--n-iter", type=int, default=20, help="candidates sampled by --search random")
+parser.add_argument("--folds", type=int, default=5, help="cross-validation folds for --search")
+parser.add_argument("--jobs", type=int, default=-1, help="parallel fold fits for --search")
+parser.add_argument("--latency-budget-us", type=float, help="--search: max µs per sentence when serving")
+parser.add_argument("--size-budget-mb", type=float, help="--search: max compiled model size")
+parser.add_argument("--prune-threshold", type=float, help="drop features whose |coef| is below this")
+parser.add_argument("--prune-top-k", type=int, help="keep only the K features with the largest |coef|")
+parser.add_argument("--sparse-refit", choices=["l1", "elasticnet"],
+                    help="refit with a sparsity-inducing penalty (saga) and drop zero coefficients")
+parser.add_argument("--l1-ratio", type=float, default=0.5, help="--sparse-refit elasticnet: L1 share of the penalty")
+parser.add_argument("--precision", choices=PRECISIONS, default="float32", help="weight storage in the compiled model")
+parser.add_argument("--compression-report", action="store_true",
+                    help="compare compression levels on the test split, write models/compression_report.*")
+parser.add_argument("--cascade", action="store_true",
+                    help="also train a char n-gram secondary model for sentences the primary is unsure about")
+parser.add_argument("--cascade-band", type=float, nargs=2, default=DEFAULT_BAND, metavar=("LOW", "HIGH"),
+                    help="primary probabilities escalated to the secondary model")
+parser.add_argument("--secondary-max-features", type=int, default=200_000, help="secondary model vocabulary size")
+parser.add_argument("--secondary-ngram-max", type=int, default=5, help="secondary model's longest char n-gram")
+parser.add_argument("--cascade-report", action="store_true",
+                    help="compare each model alone with the cascade at several bands, write models/cascade_report.*")
+args = parser.parse_args()
+
+# Wall time per stage, printed at the end
+timings = {}
+_last_mark = time.perf_counter()
+
+def mark(stage: str):
+    """Record the time since the previous mark as `stage`."""
+    global _last_mark
+    now = time.perf_counter()
+    timings[stage] = now - _last_mark
+    _last_mark = now
+
 # ------------------------------------------------------------------
 # 1️⃣  Load data
 # ------------------------------------------------------------------
-ROOT_DIR = Path(__file__).parent.parent
-DATA_DIR = ROOT_DIR / "data"
+ROOT_DIR   = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR / "data"))
+
+from datastore import DatasetStore, text_hash
+
+DATA_DIR   = args.data_dir or ROOT_DIR / "data"
+STORE_DIR  = DATA_DIR / "store"
+OUTPUT_DIR = args.output_dir or ROOT_DIR / "models"
 
 def read_lines(path: Path) -> list[str]:
     """Read a file, strip whitespace and filter empty lines."""
     with path.open(encoding="utf-8") as f:
         return [line.strip() for line in f if line.strip()]
 
-human_sentences = read_lines(DATA_DIR / "humanData.txt")
-ai_sentences     = read_lines(DATA_DIR / "aiData.txt")
+# Prefer the deduplicated dataset store; fall back to the raw text files
+store = DatasetStore(STORE_DIR) if (STORE_DIR / "manifest.json").exists() else None
+if store is not None:
+    print(f"Reading dataset store {STORE_DIR}: {store.counts()}")
+    # Lines appended to the text files since the last import are not in the store yet
+    for name, count in store.missing_legacy(DATA_DIR).items():
+        print(f"⚠️  {count} lines of {DATA_DIR / name} are not in the store; "
+              f"run `python data/datastore.py import-legacy` to include them")
+    human_sentences, ai_sentences = [], []
+    for text, label, _ in store:
+        (ai_sentences if label == 1 else human_sentences).append(text)
+else:
+    human_sentences = read_lines(DATA_DIR / "humanData.txt")
+    ai_sentences     = read_lines(DATA_DIR / "aiData.txt")
+mark("load data")
 
 # ------------------------------------------------------------------
 # 2️⃣  Create DataFrame
@@ -46,40 +136,74 @@ df = pd.DataFrame(
         "label":    [0]*len(human_sentences) + [1]*len(ai_sentences)
     }
 )
+
+# Near-duplicate clusters (MinHash LSH), updated incrementally from models/near_dup_index.npz
+if args.split == "group" or args.collapse_near_dups:
+    index = update_index(
+        df["sentence"].tolist(), [text_hash(s) for s in df["sentence"]],
+        path=OUTPUT_DIR / "near_dup_index.npz", threshold=args.near_dup_threshold,
+    )
+    df["cluster"] = index.clusters()
+    n_clusters = df["cluster"].nunique()
+    print(f"Near-duplicate clusters: {n_clusters:,} for {len(df):,} sentences")
+    if args.collapse_near_dups:
+        df = df.iloc[collapse(df["label"].to_numpy(), df["cluster"].to_numpy())].reset_index(drop=True)
+        print(f"Collapsed near duplicates: {len(df):,} sentences kept")
+    mark("near duplicates")
+
 print(f"Dataset shape: {df.shape}")
 print(df["label"].value_counts())
 
 # ------------------------------------------------------------------
-# 3️⃣  (Optional) Basic cleaning – remove URLs, emails, punctuation
+# 3️⃣  Basic cleaning – remove URLs, emails, punctuation, lowercase
 # ------------------------------------------------------------------
-def basic_clean(text: str) -> str:
-    # Remove URLs
-    text = re.sub(r"http\S+|www.\S+", "", text)
-    # Remove emails
-    text = re.sub(r"\S+@\S+", "", text)
-    # Remove punctuation
-    text = text.translate(str.maketrans("", "", string.punctuation))
-    # Lowercase
-    return text.lower()
+# Done by the pipeline's first step (normalize.py), so the saved model
+# applies the same transform to whatever it is asked to score.
 
-df["cleaned"] = df["sentence"].apply(basic_clean)
+# ------------------------------------------------------------------
+# 4️⃣  Train / test split (stratified; grouped so a near-duplicate cluster never crosses it)
+# ------------------------------------------------------------------
+if args.split == "group":
+    # 80% train, 20% test, stratified by each cluster's majority label
+    train_idx, test_idx = group_split(df["label"].to_numpy(), df["cluster"].to_numpy(), test_size=0.20, seed=42)
+    X_train, X_test = df["sentence"].iloc[train_idx], df["sentence"].iloc[test_idx]
+    y_train, y_test = df["label"].iloc[train_idx], df["label"].iloc[test_idx]
+else:
+    X_train, X_test, y_train, y_test = train_test_split(
+        df["sentence"], df["label"],
+        test_size=0.20,   # 80% train, 20% test
+        random_state=42,
+        stratify=df["label"]
+    )
+mark("split")
 
 # ------------------------------------------------------------------
-# 4️⃣  Train / test split (stratified)
+# Hyperparameter search (--search): K-fold CV on the training split only, then stop
 # ------------------------------------------------------------------
-X_train, X_test, y_train, y_test = train_test_split(
-    df["cleaned"], df["label"],
-    test_size=0.20,   # 80% train, 20% test
-    random_state=42,
-    stratify=df["label"]
-)
+if args.search:
+    train_labels = y_train.to_numpy()
+    if args.split == "group":
+        folds = group_kfold(train_labels, df["cluster"].to_numpy()[train_idx], n_splits=args.folds, seed=42)
+    else:
+        folds = list(StratifiedKFold(n_splits=args.folds, shuffle=True, random_state=42).split(X_train, train_labels))
+    ranked = run_search(
+        X_train.tolist(), train_labels, folds, mode=args.search, n_iter=args.n_iter, n_jobs=args.jobs,
+        out_dir=OUTPUT_DIR / "search",
+        latency_budget_us=args.latency_budget_us, size_budget_mb=args.size_budget_mb,
+    )
+    best = ranked[0]
+    mark("search")
+    print(f"\nBest: python train.py --ngram-max {best['ngram_range'][1]} --max-features {best['max_features']} "
+          f"--C {best['C']} --class-weight {best['class_weight'] or 'none'}")
+    print(f"Search took {timings['search']:.1f}s")
+    sys.exit(0)
 
 # ------------------------------------------------------------------
-# 5️⃣  Build a pipeline: TF‑IDF → LogisticRegression
+# 5️⃣  Build a pipeline: normalize → TF‑IDF → LogisticRegression
 # ------------------------------------------------------------------
 tfidf = TfidfVectorizer(
-    ngram_range=(1, 2),   # unigrams + bigrams
-    max_features=50000,  # keep top 50k terms
+    ngram_range=(1, args.ngram_max),   # unigrams + bigrams by default
+    max_features=args.max_features,   # keep the top 50k terms by default
     stop_words="english",
     lowercase=False      # already lowercased
 )
@@ -87,28 +211,36 @@ tfidf = TfidfVectorizer(
 clf = LogisticRegression(
     max_iter=2000,
     n_jobs=-1,
-    class_weight="balanced",
+    class_weight=None if args.class_weight == "none" else args.class_weight,
     penalty="l2",
-    C=1.0,
+    C=args.C,
     solver="lbfgs"
 )
 
+# ------------------------------------------------------------------
+# 6️⃣  Train (the vectorized matrices come from the feature cache when the data and TF‑IDF settings match)
+# ------------------------------------------------------------------
+cache = None if args.no_feature_cache else FeatureCache(
+    root=OUTPUT_DIR / "feature_cache",
+    max_age_days=args.cache_max_age_days, max_bytes=int(args.cache_max_gb * (1 << 30))
+)
+tfidf, M_train, M_test, cache_hit = featurize(tfidf, X_train, y_train, X_test, y_test, cache)
+mark("features (cache hit)" if cache_hit else "features (normalize + vectorize)")
+
+print("Training …")
+clf.fit(M_train, y_train)
 pipeline = Pipeline([
+    ("normalize", make_step()),
     ("tfidf", tfidf),
     ("clf", clf)
 ])
-
-# ------------------------------------------------------------------
-# 6️⃣  Train
-# ------------------------------------------------------------------
-print("Training …")
-pipeline.fit(X_train, y_train)
+mark("fit")
 
 # ------------------------------------------------------------------
 # 7️⃣  Evaluate
 # ------------------------------------------------------------------
-y_pred = pipeline.predict(X_test)
-y_proba = pipeline.predict_proba(X_test)[:, 1]
+y_pred = clf.predict(M_test)
+y_proba = clf.predict_proba(M_test)[:, 1]
 
 print("\n=== Classification Report ===")
 print(classification_report(y_test, y_pred, target_names=["Human", "AI"]))
@@ -116,18 +248,146 @@ print(classification_report(y_test, y_pred, target_names=["Human", "AI"]))
 print("\n=== Confusion Matrix ===")
 print(confusion_matrix(y_test, y_pred))
 
+metrics = {
+    "accuracy":  accuracy_score(y_test, y_pred),
+    "precision": precision_score(y_test, y_pred),
+    "recall":    recall_score(y_test, y_pred),
+    "f1":        f1_score(y_test, y_pred),
+    "roc_auc":   roc_auc_score(y_test, y_proba),
+}
+
 print("\n=== Metrics ===")
-print(f"Accuracy : {accuracy_score(y_test, y_pred):.4f}")
-print(f"Precision: {precision_score(y_test, y_pred):.4f}")
-print(f"Recall   : {recall_score(y_test, y_pred):.4f}")
-print(f"F1‑Score : {f1_score(y_test, y_pred):.4f}")
-print(f"ROC‑AUC  : {roc_auc_score(y_test, y_proba):.4f}")
+print(f"Accuracy : {metrics['accuracy']:.4f}")
+print(f"Precision: {metrics['precision']:.4f}")
+print(f"Recall   : {metrics['recall']:.4f}")
+print(f"F1‑Score : {metrics['f1']:.4f}")
+print(f"ROC‑AUC  : {metrics['roc_auc']:.4f}")
+mark("evaluate")
+
+def threshold_metrics(proba) -> dict:
+    """Test-split metrics of AI probabilities, thresholded at 0.5."""
+    return {
+        "accuracy": accuracy_score(y_test, proba >= 0.5),
+        "precision": precision_score(y_test, proba >= 0.5),
+        "recall": recall_score(y_test, proba >= 0.5),
+        "f1": f1_score(y_test, proba >= 0.5),
+        "roc_auc": roc_auc_score(y_test, proba),
+    }
+
+# ------------------------------------------------------------------
+# 8️⃣  Compress (optional): sparse refit, prune by |coef|; --precision applies when compiling
+# ------------------------------------------------------------------
+pruning = args.prune_threshold is not None or args.prune_top_k is not None
+refitted = pipeline
+if args.sparse_refit:
+    refitted = compress(pipeline, M_train, y_train, refit=args.sparse_refit, l1_ratio=args.l1_ratio)
+    mark("sparse refit")
+served = compress(refitted, threshold=args.prune_threshold, top_k=args.prune_top_k)
+
+uncompressed_metrics = None
+if served is not pipeline:
+    n_before, n_after = len(tfidf.vocabulary_), len(served.named_steps["tfidf"].vocabulary_)
+    uncompressed_metrics, metrics = metrics, threshold_metrics(served.predict_proba(X_test)[:, 1])
+    print(f"\nCompressed to {n_after:,} of {n_before:,} features: F1 {metrics['f1']:.4f} "
+          f"({metrics['f1'] - uncompressed_metrics['f1']:+.4f}), "
+          f"ROC‑AUC {metrics['roc_auc']:.4f} ({metrics['roc_auc'] - uncompressed_metrics['roc_auc']:+.4f})")
+    mark("compress")
+
+if args.compression_report:
+    extra = [(args.sparse_refit, refitted)] if args.sparse_refit else []
+    if pruning:
+        extra.append(("selected", served))
+    write_report(pipeline, X_test, y_test, OUTPUT_DIR, extra)
+    mark("compression report")
 
 # ------------------------------------------------------------------
-# Save the model (vectoriser + classifier)
+# 9️⃣  Cascade (optional): char n-gram secondary model for sentences inside the uncertainty band
 # ------------------------------------------------------------------
-OUTPUT_DIR = ROOT_DIR / "models"
-OUTPUT_DIR.mkdir(exist_ok=True)
+cascade = None
+primary_metrics = None
+if args.cascade:
+    print("\nTraining the secondary model (char n-grams) …")
+    sec_tfidf, S_train, _, sec_hit = featurize(
+        secondary_vectorizer(args.secondary_max_features, args.secondary_ngram_max),
+        X_train, y_train, X_test, y_test, cache,
+    )
+    mark("secondary features (cache hit)" if sec_hit else "secondary features (vectorize)")
+    sec_clf = secondary_classifier(clf).fit(S_train, y_train)
+    secondary = Pipeline([("normalize", make_step()), ("tfidf", sec_tfidf), ("clf", sec_clf)])
+    mark("fit secondary")
+
+    cascade = Cascade(served, secondary, args.cascade_band)
+    cascade_proba, escalated = cascade.predict_cascade(X_test)
+    primary_metrics, metrics = metrics, threshold_metrics(cascade_proba[:, 1])
+    print(f"Cascade, band {cascade.band[0]:.2f}–{cascade.band[1]:.2f}: {escalated.mean():.1%} of test sentences "
+          f"escalated, F1 {metrics['f1']:.4f} ({metrics['f1'] - primary_metrics['f1']:+.4f}), "
+          f"ROC‑AUC {metrics['roc_auc']:.4f} ({metrics['roc_auc'] - primary_metrics['roc_auc']:+.4f})")
+    mark("evaluate cascade")
+
+    if args.cascade_report:
+        write_cascade_report(cascade, X_test, y_test, OUTPUT_DIR, args.precision)
+        mark("cascade report")
 
-joblib.dump(pipeline, OUTPUT_DIR / "ai_detector.pkl")
+# ------------------------------------------------------------------
+# Save the model (vectoriser + classifier, or the cascade of two)
+# ------------------------------------------------------------------
+OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+joblib.dump(cascade or served, OUTPUT_DIR / "ai_detector.pkl")
 print(f"\nModel saved to {OUTPUT_DIR / 'ai_detector.pkl'}")
+
+# ------------------------------------------------------------------
+# Export the compiled, memory-mappable artifact (vocabulary, idf × coef, intercept)
+# ------------------------------------------------------------------
+def data_hash(*paths: Path) -> str:
+    """sha256 over the training data files."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with path.open("rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+metadata = {
+    "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    "training_data_hash": store.fingerprint() if store is not None
+                          else data_hash(DATA_DIR / "humanData.txt", DATA_DIR / "aiData.txt"),
+    "n_train": int(len(X_train)),
+    "n_test": int(len(X_test)),
+    "split": args.split,
+    "collapsed_near_dups": args.collapse_near_dups,
+    "ngram_max": args.ngram_max,
+    "max_features": args.max_features,
+    "C": args.C,
+    "class_weight": args.class_weight,
+    "compression": {
+        "prune_threshold": args.prune_threshold,
+        "prune_top_k": args.prune_top_k,
+        "sparse_refit": args.sparse_refit,
+        "precision": args.precision,
+        "n_features": len(served.named_steps["tfidf"].vocabulary_),
+    },
+    "metrics": {name: float(value) for name, value in metrics.items()},
+}
+if uncompressed_metrics is not None:
+    metadata["uncompressed_metrics"] = {name: float(value) for name, value in uncompressed_metrics.items()}
+if cascade is not None:
+    metadata["cascade"] = {
+        "band": list(cascade.band),
+        "secondary_max_features": args.secondary_max_features,
+        "secondary_ngram_max": args.secondary_ngram_max,
+        "n_secondary_features": len(sec_tfidf.vocabulary_),
+        "test_escalation_rate": float(escalated.mean()),
+    }
+    metadata["primary_metrics"] = {name: float(value) for name, value in primary_metrics.items()}
+compiled = compile_cascade(cascade, args.precision) if cascade else compile_pipeline(served, args.precision)
+digest = save_compiled(compiled, OUTPUT_DIR / "ai_detector.model", metadata)
+print(f"Compiled artifact saved to {OUTPUT_DIR / 'ai_detector.model'} ({digest[:12]})")
+mark("save")
+
+print("\n=== Stage timings ===")
+for stage, seconds in timings.items():
+    print(f"{stage:<34} {seconds:>8.2f}s")
+print(f"{'total':<34} {sum(timings.values()):>8.2f}s")
+if args.timings_json:
+    args.timings_json.write_text(json.dumps(timings, indent=2))
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+"""
+Out-of-core, incremental training of the AI‑vs‑Human detector.
+
+Reads humanData.txt and aiData.txt in chunks, featurizes them with a
+stateless HashingVectorizer and trains an SGD logistic regression with
+`partial_fit`, so memory stays flat however large the corpus grows.
+The byte offset reached in each file is saved, and the next run
+warm-starts the saved model on only the lines appended since then. A
+fingerprint of each file (inode, and a hash of the bytes at its start
+and just before the offset) is saved too; if it no longer matches, the
+file was rewritten and training starts over.
+
+About 10% of lines (chosen by a hash of the line, so the choice never
+changes between runs) are held out for evaluation.
+
+Usage:
+    python train_stream.py             # continue from the last run, or start fresh
+    python train_stream.py --fresh     # ignore saved state and retrain from scratch
+    python train_stream.py --compare   # also fit the in-memory batch pipeline
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+import zlib
+from pathlib import Path
+
+import joblib
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+from sklearn.pipeline import Pipeline
+
+from normalize import make_step, normalize_batch
+
+ROOT_DIR   = Path(__file__).parent.parent
+DATA_DIR   = ROOT_DIR / "data"
+OUTPUT_DIR = ROOT_DIR / "models"
+MODEL_PATH = OUTPUT_DIR / "ai_detector_stream.pkl"
+STATE_PATH = OUTPUT_DIR / "stream_state.json"
+
+SOURCES = {"humanData.txt": 0, "aiData.txt": 1}
+HOLDOUT_BUCKETS = 10  # 1 in 10 lines is held out
+MARK_BYTES = 64 << 10  # bytes hashed at the start of a file and before its offset
+
+def is_holdout(line: str) -> bool:
+    return zlib.crc32(line.encode("utf-8")) % HOLDOUT_BUCKETS == 0
+
+def read_chunks(path: Path, offset: int, chunk_lines: int):
+    """
+    Yield (lines, end_offset) from `offset` onwards. A trailing line with no
+    newline yet (a file still being appended) is left for the next run.
+    """
+    with path.open("rb") as f:
+        f.seek(offset)
+        lines = []
+        while True:
+            raw = f.readline()
+            if not raw.endswith(b"\n"):
+                break
+            offset += len(raw)
+            line = raw.decode("utf-8", errors="replace").strip()
+            if line:
+                lines.append(line)
+            if len(lines) >= chunk_lines:
+                yield lines, offset
+                lines = []
+        if lines:
+            yield lines, offset
+
+def make_vectorizer() -> HashingVectorizer:
+    return HashingVectorizer(
+        ngram_range=(1, 2),
+        n_features=2 ** 20,
+        alternate_sign=False,
+        stop_words="english",
+        lowercase=False,   # normalize() already lowercases
+    )
+
+def file_mark(path: Path, offset: int) -> dict:
+    """Fingerprint of the first `offset` bytes of a file, to tell an append from a rewrite."""
+    def digest(start: int, end: int) -> str:
+        f.seek(start)
+        return hashlib.sha256(f.read(end - start)).hexdigest()
+
+    with path.open("rb") as f:
+        return {
+            "inode": os.fstat(f.fileno()).st_ino,
+            "head": digest(0, min(offset, MARK_BYTES)),
+            "tail": digest(max(0, offset - MARK_BYTES), offset),
+        }
+
+def load_state(fresh: bool):
+    """Return (classifier or None, offsets) to resume from."""
+    if fresh or not (STATE_PATH.exists() and MODEL_PATH.exists()):
+        return None, {name: 0 for name in SOURCES}
+    state = json.loads(STATE_PATH.read_text())
+    offsets = {}
+    for name in SOURCES:
+        path, offset = DATA_DIR / name, state["offsets"].get(name, 0)
+        if offset > path.stat().st_size or state.get("marks", {}).get(name) != file_mark(path, offset):
+            # The file was truncated or rewritten; the saved model no longer matches it
+            print(f"{name} changed before the saved offset; retraining from scratch")
+            return None, {name: 0 for name in SOURCES}
+        offsets[name] = offset
+    return joblib.load(MODEL_PATH).named_steps["clf"], offsets
+
+def train(clf, offsets: dict, vectorizer, chunk_lines: int):
+    """partial_fit on new lines, alternating human and AI chunks. Returns (clf, n_trained)."""
+    readers = {name: read_chunks(DATA_DIR / name, offsets[name], chunk_lines) for name in SOURCES}
+    rng = np.random.default_rng(42)
+    n_trained = 0
+    while readers:
+        texts, labels = [], []
+        for name in list(readers):
+            try:
+                lines, offsets[name] = next(readers[name])
+            except StopIteration:
+                del readers[name]
+                continue
+            lines = [line for line in lines if not is_holdout(line)]
+            texts.extend(normalize_batch(lines))
+            labels.extend([SOURCES[name]] * len(lines))
+        if not texts:
+            continue
+
+        order = rng.permutation(len(texts))
+        X = vectorizer.transform([texts[i] for i in order])
+        y = np.array(labels)[order]
+        if clf is None:
+            clf = SGDClassifier(loss="log_loss", alpha=1e-5, random_state=42)
+        clf.partial_fit(X, y, classes=[0, 1])
+        n_trained += len(texts)
+        print(f"  trained on {n_trained:,} new lines", end="\r")
+    print()
+    return clf, n_trained
+
+def holdout_texts(chunk_lines: int):
+    """Yield (cleaned texts, labels) chunks of held-out lines across the whole corpus."""
+    for name, label in SOURCES.items():
+        for lines, _ in read_chunks(DATA_DIR / name, 0, chunk_lines):
+            held = normalize_batch(line for line in lines if is_holdout(line))
+            if held:
+                yield held, [label] * len(held)
+
+def evaluate(predict_proba, chunk_lines: int) -> dict:
+    """Stream the held-out lines through `predict_proba`; only the scores are kept."""
+    y_true, y_proba = [], []
+    for texts, labels in holdout_texts(chunk_lines):
+        y_true.extend(labels)
+        y_proba.extend(predict_proba(texts))
+    y_true, y_proba = np.array(y_true), np.array(y_proba)
+    y_pred = (y_proba >= 0.5).astype(int)
+    return {
+        "n_test":   len(y_true),
+        "accuracy": accuracy_score(y_true, y_pred),
+        "f1":       f1_score(y_true, y_pred),
+        "roc_auc":  roc_auc_score(y_true, y_proba),
+    }
+
+def batch_baseline(chunk_lines: int):
+    """Fit train.py's in-memory TF‑IDF + LogisticRegression on the same split, for comparison."""
+    texts, labels = [], []
+    for name, label in SOURCES.items():
+        for lines, _ in read_chunks(DATA_DIR / name, 0, chunk_lines):
+            kept = normalize_batch(line for line in lines if not is_holdout(line))
+            texts.extend(kept)
+            labels.extend([label] * len(kept))
+    pipeline = Pipeline([
+        ("tfidf", TfidfVectorizer(ngram_range=(1, 2), max_features=50000, stop_words="english", lowercase=False)),
+        ("clf", LogisticRegression(max_iter=2000, class_weight="balanced", C=1.0)),
+    ])
+    pipeline.fit(texts, labels)
+    return pipeline
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fresh", action="store_true", help="ignore saved state and retrain from scratch")
+    parser.add_argument("--chunk-lines", type=int, default=10000, help="lines read per file per step")
+    parser.add_argument("--no-eval", action="store_true", help="skip the held-out evaluation pass")
+    parser.add_argument("--compare", action="store_true", help="also train the batch pipeline and compare")
+    args = parser.parse_args()
+
+    vectorizer = make_vectorizer()
+    clf, offsets = load_state(args.fresh)
+    print("Warm-starting from" if clf is not None else "Training from scratch at", offsets)
+
+    start = time.perf_counter()
+    clf, n_trained = train(clf, offsets, vectorizer, args.chunk_lines)
+    train_time = time.perf_counter() - start
+    if clf is None:
+        print("No training data found.")
+        return
+    print(f"Trained on {n_trained:,} new lines in {train_time:.2f}s")
+
+    OUTPUT_DIR.mkdir(exist_ok=True)
+    joblib.dump(Pipeline([("normalize", make_step()), ("hash", vectorizer), ("clf", clf)]), MODEL_PATH)
+    marks = {name: file_mark(DATA_DIR / name, offset) for name, offset in offsets.items()}
+    STATE_PATH.write_text(json.dumps({"offsets": offsets, "marks": marks}, indent=2))
+    print(f"Model saved to {MODEL_PATH}")
+
+    if args.no_eval:
+        return
+
+    results = {"streaming": (train_time, evaluate(
+        lambda texts: clf.predict_proba(vectorizer.transform(texts))[:, 1], args.chunk_lines))}
+    if args.compare:
+        start = time.perf_counter()
+        pipeline = batch_baseline(args.chunk_lines)
+        batch_time = time.perf_counter() - start
+        results["batch"] = (batch_time, evaluate(lambda texts: pipeline.predict_proba(texts)[:, 1], args.chunk_lines))
+
+    print(f"\n{'mode':<10} {'train s':>8} {'accuracy':>9} {'F1':>7} {'ROC‑AUC':>8} {'n_test':>8}")
+    for mode, (seconds, m) in results.items():
+        print(f"{mode:<10} {seconds:>8.2f} {m['accuracy']:>9.4f} {m['f1']:>7.4f} {m['roc_auc']:>8.4f} {m['n_test']:>8,}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+Documents/sec for one /analyze call per document vs /analyze/batch.
+
+Runs in-process through the Flask test client, with the score cache
+disabled so every run does the full scoring work.
+
+Usage:
+    python benchmarks/bench_batch_endpoint.py
+    python benchmarks/bench_batch_endpoint.py --docs 1000 --processes 1 2 4
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+DATA_DIR = ROOT_DIR / "data"
+sys.path.append(str(ROOT_DIR / "frontend"))
+
+os.environ["SCORE_CACHE_ENTRIES"] = "0"
+import server
+
+def build_documents(n_docs: int, per_doc: int) -> list[str]:
+    lines = []
+    for name in ("humanData.txt", "aiData.txt"):
+        path = DATA_DIR / name
+        if path.exists():
+            with path.open(encoding="utf-8") as f:
+                lines.extend(line.strip() for line in f if line.strip())
+    if not lines:
+        sys.exit("No data found; run the gather scripts first.")
+    random.seed(42)
+    return [" ".join(random.choices(lines, k=per_doc)) for _ in range(n_docs)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=500)
+    parser.add_argument("--sentences", type=int, default=15, help="sentences per document")
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    docs = build_documents(args.docs, args.sentences)
+    client = server.app.test_client()
+
+    start = time.perf_counter()
+    for text in docs:
+        client.post("/analyze", json={"text": text})
+    elapsed = time.perf_counter() - start
+    print(f"{'/analyze x N':<28} {len(docs) / elapsed:>9.1f} docs/s")
+
+    for n_process in sorted(set(args.processes)):
+        start = time.perf_counter()
+        client.post(f"/analyze/batch?n_process={n_process}", json=docs)
+        elapsed = time.perf_counter() - start
+        label = f"/analyze/batch n_process={n_process}"
+        print(f"{label:<28} {len(docs) / elapsed:>9.1f} docs/s")
+
+if __name__ == "__main__":
+    main()
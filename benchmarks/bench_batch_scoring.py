@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+Compare per-sentence vs batched scoring against document length.
+
+Usage:
+    python benchmarks/bench_batch_scoring.py            # default lengths
+    python benchmarks/bench_batch_scoring.py 10 300 1000
+"""
+
+import sys
+import time
+import random
+from pathlib import Path
+
+import joblib
+
+ROOT_DIR   = Path(__file__).parent.parent
+DATA_DIR   = ROOT_DIR / "data"
+MODEL_PATH = ROOT_DIR / "models" / "ai_detector.pkl"
+
+LENGTHS = [1, 10, 30, 100, 300, 1000]
+REPEATS = 5
+
+def load_sentences() -> list[str]:
+    """Sentences from the training data, or a filler sentence if none exist."""
+    sentences = []
+    for name in ("humanData.txt", "aiData.txt"):
+        path = DATA_DIR / name
+        if path.exists():
+            with path.open(encoding="utf-8") as f:
+                sentences.extend(line.strip() for line in f if line.strip())
+    return sentences or ["The quick brown fox jumps over the lazy dog."]
+
+def best_of(fn, repeats=REPEATS) -> float:
+    """Best wall time of `repeats` calls, in seconds."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    lengths = [int(n) for n in sys.argv[1:]] or LENGTHS
+    pipeline = joblib.load(MODEL_PATH)
+    pool = load_sentences()
+    random.seed(42)
+
+    print(f"{'sentences':>10} {'per-call ms':>12} {'batched ms':>12} {'speedup':>8}")
+    for n in lengths:
+        doc = [random.choice(pool) for _ in range(n)]
+        looped = best_of(lambda: [pipeline.predict_proba([s])[0][1] for s in doc])
+        batched = best_of(lambda: pipeline.predict_proba(doc)[:, 1])
+        print(f"{n:>10} {looped * 1000:>12.2f} {batched * 1000:>12.2f} {looped / batched:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+Compiled linear scorer vs the sklearn pipeline: agreement, per-sentence
+latency and batch throughput.
+
+Usage:
+    python benchmarks/bench_compiled_scorer.py
+    python benchmarks/bench_compiled_scorer.py --batch 20000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).parent.parent
+DATA_DIR = ROOT_DIR / "data"
+sys.path.append(str(ROOT_DIR / "backend"))
+
+from compiled_model import load_model
+
+def load_sentences() -> list[str]:
+    sentences = []
+    for name in ("humanData.txt", "aiData.txt"):
+        path = DATA_DIR / name
+        if path.exists():
+            with path.open(encoding="utf-8") as f:
+                sentences.extend(line.strip() for line in f if line.strip())
+    if not sentences:
+        sys.exit("No data found; run the gather scripts first.")
+    return sentences
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch", type=int, default=10000, help="sentences in the throughput batch")
+    parser.add_argument("--single", type=int, default=500, help="one-sentence calls for latency")
+    args = parser.parse_args()
+
+    random.seed(42)
+    pool = load_sentences()
+    batch = random.choices(pool, k=args.batch)
+
+    models = {}
+    for kind in ("sklearn", "compiled"):
+        start = time.perf_counter()
+        models[kind], _ = load_model(kind=kind)
+        print(f"load {kind:<9} {time.perf_counter() - start:.3f}s")
+
+    diff = np.abs(models["compiled"].predict_proba(batch) - models["sklearn"].predict_proba(batch)).max()
+    print(f"max |Δp| over {len(batch)} sentences: {diff:.2e}\n")
+
+    print(f"{'scorer':<9} {'µs/sentence (single)':>21} {'sentences/s (batch)':>20}")
+    for kind, model in models.items():
+        start = time.perf_counter()
+        for s in batch[:args.single]:
+            model.predict_proba([s])
+        single = (time.perf_counter() - start) / args.single
+
+        start = time.perf_counter()
+        model.predict_proba(batch)
+        throughput = len(batch) / (time.perf_counter() - start)
+        print(f"{kind:<9} {single * 1e6:>21.1f} {throughput:>20,.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+Cross-request micro-batching (frontend/batching.py) against scoring each
+request on its own.
+
+--callers concurrent callers each score --requests requests of
+--sentences-per-request synthetic sentences. They are threads, as in the
+threaded Flask server. Each request may also do --other-ms of other Python work (segmenting,
+rendering), during which the caller is open but not in the queue.
+
+    unbatched     every request calls predict_proba itself
+    batched       MicroBatcher at each --max-wait-ms
+
+Usage:
+    python benchmarks/bench_microbatch.py
+    python benchmarks/bench_microbatch.py --callers 32 --max-wait-ms 0.5 2 5 --scorer sklearn
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR / "backend"))
+sys.path.append(str(ROOT_DIR / "frontend"))
+sys.path.append(str(Path(__file__).parent))
+
+from batching import MicroBatcher
+from compiled_model import load_model
+from synthetic import sentence
+
+def busy(ms: float):
+    end = time.perf_counter() + ms / 1e3
+    while time.perf_counter() < end:
+        pass
+
+def make_requests(args) -> list[list[list[str]]]:
+    """Per caller, its list of requests (lists of sentences)."""
+    rng = random.Random(0)
+    return [
+        [[sentence(rng, rng.random() < 0.5) for _ in range(args.sentences_per_request)] for _ in range(args.requests)]
+        for _ in range(args.callers)
+    ]
+
+def run_threads(requests, score, args, batcher=None) -> tuple[float, list[float]]:
+    latencies, lock = [], threading.Lock()
+
+    def caller(mine):
+        own = []
+        for sentences in mine:
+            start = time.perf_counter()
+            if batcher:
+                batcher.join()
+            try:
+                busy(args.other_ms)
+                score(sentences)
+            finally:
+                if batcher:
+                    batcher.leave()
+            own.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=caller, args=(mine,)) for mine in requests]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start, latencies
+
+def report(name: str, wall: float, latencies: list[float], args, batcher=None):
+    n = len(latencies)
+    q = statistics.quantiles(latencies, n=100)
+    line = (f"{name:<16} {n * args.sentences_per_request / wall:>12,.0f} {n / wall:>8,.0f} "
+            f"{q[49] * 1e3:>7.2f} {q[98] * 1e3:>7.2f}")
+    if batcher:
+        stats = batcher.stats()
+        flushes = " ".join(f"{reason}={count}" for reason, count in stats["flushes"].items() if count)
+        line += f" {stats['mean_batch']:>10.1f} {stats['mean_queue_ms']:>8.2f}  {flushes}"
+    print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="requests per caller")
+    parser.add_argument("--sentences-per-request", type=int, default=3)
+    parser.add_argument("--other-ms", type=float, default=0.0, help="other work per request, in ms")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, nargs="+", default=[0.5, 2.0, 5.0])
+    parser.add_argument("--scorer", choices=("compiled", "sklearn"), default=None)
+    args = parser.parse_args()
+
+    model, path = load_model(kind=args.scorer)
+
+    def predict(sentences):
+        return model.predict_proba(sentences)[:, 1].tolist()
+
+    requests = make_requests(args)
+    predict(requests[0][0])  # warm up
+    print(f"{args.callers} callers × {args.requests} requests × {args.sentences_per_request} sentences, "
+          f"{args.other_ms:g} ms other work, model {path.name}\n")
+    print(f"{'mode':<16} {'sentences/s':>12} {'req/s':>8} {'p50 ms':>7} {'p99 ms':>7} {'mean batch':>10} {'queue ms':>8}  flushes")
+
+    report("unbatched", *run_threads(requests, predict, args), args)
+    for wait_ms in args.max_wait_ms:
+        batcher = MicroBatcher(predict, max_batch=args.max_batch, max_wait=wait_ms / 1e3)
+        report(f"batched {wait_ms:g} ms", *run_threads(requests, batcher.score, args, batcher), args, batcher)
+
+if __name__ == "__main__":
+    main()
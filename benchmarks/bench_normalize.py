@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+Text normalization throughput on a large corpus: the old per-row
+`basic_clean` through `Series.apply` against normalize.py's
+single-process, pandas and multi-process batch paths. All paths
+are checked to produce identical output.
+
+Usage:
+    python benchmarks/bench_normalize.py                  # 1M sentences
+    python benchmarks/bench_normalize.py --n 200000 --processes 4
+"""
+
+import argparse
+import os
+import random
+import re
+import string
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ROOT_DIR = Path(__file__).parent.parent
+DATA_DIR = ROOT_DIR / "data"
+sys.path.append(str(ROOT_DIR / "backend"))
+
+from normalize import normalize_batch, normalize_series
+
+def basic_clean(text: str) -> str:
+    """train.py's original per-row cleaning, kept here as the baseline."""
+    text = re.sub(r"http\S+|www.\S+", "", text)
+    text = re.sub(r"\S+@\S+", "", text)
+    text = text.translate(str.maketrans("", "", string.punctuation))
+    return text.lower()
+
+def load_sentences() -> list[str]:
+    sentences = []
+    for name in ("humanData.txt", "aiData.txt"):
+        path = DATA_DIR / name
+        if path.exists():
+            with path.open(encoding="utf-8") as f:
+                sentences.extend(line.strip() for line in f if line.strip())
+    if not sentences:
+        sys.exit("No data found; run the gather scripts first.")
+    return sentences
+
+def corpus(n: int) -> list[str]:
+    """`n` sentences sampled from the data, about 2% carrying a URL or an email."""
+    random.seed(42)
+    pool = load_sentences()
+    extras = ["See https://example.com/page?id=3 for more.", "Mail me at someone@example.org today!", "www.example.net"]
+    return [
+        s + " " + random.choice(extras) if random.random() < 0.02 else s
+        for s in random.choices(pool, k=n)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=1_000_000, help="sentences to normalize")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    texts = corpus(args.n)
+    series = pd.Series(texts)
+
+    runs = {
+        "basic_clean (apply)": lambda: series.apply(basic_clean).tolist(),
+        "normalize_series": lambda: normalize_series(series).tolist(),
+        "normalize_batch": lambda: normalize_batch(texts),
+        f"normalize_batch ×{args.processes}": lambda: normalize_batch(texts, processes=args.processes),
+    }
+
+    print(f"{'method':<24} {'seconds':>8} {'sentences/s':>12} {'speed-up':>9}")
+    baseline = reference = None
+    for name, run in runs.items():
+        start = time.perf_counter()
+        out = run()
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            baseline, reference = elapsed, out
+        elif out != reference:
+            sys.exit(f"{name} output differs from basic_clean")
+        print(f"{name:<24} {elapsed:>8.2f} {args.n / elapsed:>12,.0f} {baseline / elapsed:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
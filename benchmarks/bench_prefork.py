@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+"""
+Throughput and memory of frontend/serve.py as workers are added, and a hot
+reload under load.
+
+Trains a model on a synthetic corpus in a scratch directory, then for each
+worker count starts a fresh serve.py and drives /analyze with
+--clients-per-worker concurrent clients for --seconds. The score cache is
+off, so every request segments and scores its document. Reported:
+
+    req/s        completed requests per second
+    speedup      req/s over the 1-worker run; efficiency is speedup / workers
+    p50/p99 ms   request latency
+    RSS / PSS    summed over master and workers. RSS counts shared pages once
+                 per process, PSS splits them between the sharers, so
+                 PSS << RSS means the model and segmenter are shared.
+
+Then, under load at the largest worker count, a second artifact (the same
+model compiled to int8, so it hashes differently) is moved into place with
+os.replace and the master gets SIGHUP. Every request must still succeed, and
+/readyz must report the new model.
+
+On Linux with enough cores the client runs on CPU 0 and the server on the
+next N, so they do not compete. On fewer cores they share, and the scaling
+shown is a lower bound.
+
+Requires aiohttp (`pip install aiohttp`).
+
+Usage:
+    python benchmarks/bench_prefork.py                    # 1, 2, 4, ... workers up to the free cores
+    python benchmarks/bench_prefork.py --workers 1 2 4 8 --seconds 20
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR / "backend"))
+sys.path.append(str(Path(__file__).parent))
+
+from synthetic import make_documents, write_corpus
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+CPUS = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+
+def train_models(work_dir: Path, n_sentences: int) -> tuple[Path, Path]:
+    """(model dir, path of an int8 copy of its artifact to reload into)."""
+    import joblib
+    from compiled_model import compile_pipeline, save_compiled
+
+    write_corpus(work_dir / "data", n_sentences)
+    model_dir = work_dir / "models"
+    subprocess.run(
+        [sys.executable, str(ROOT_DIR / "backend" / "train.py"), "--data-dir", str(work_dir / "data"),
+         "--output-dir", str(model_dir), "--no-feature-cache"],
+        check=True, stdout=subprocess.DEVNULL,
+    )
+    alternate = work_dir / "int8.model"
+    save_compiled(compile_pipeline(joblib.load(model_dir / "ai_detector.pkl"), "int8"), alternate)
+    return model_dir, alternate
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def pin(cpus):
+    if hasattr(os, "sched_setaffinity") and cpus:
+        os.sched_setaffinity(0, cpus)
+
+def start_server(workers: int, port: int, model_dir: Path, args) -> subprocess.Popen:
+    env = dict(os.environ, MODEL_DIR=str(model_dir), SEGMENTER=args.segmenter, SCORE_CACHE_ENTRIES="0")
+    server_cpus = CPUS[1:workers + 1] if len(CPUS) > workers else None
+    return subprocess.Popen(
+        [sys.executable, str(ROOT_DIR / "frontend" / "serve.py"), "--workers", str(workers),
+         "--bind", f"127.0.0.1:{port}"],
+        env=env, stderr=subprocess.DEVNULL, preexec_fn=lambda: pin(server_cpus),
+    )
+
+def stop_server(proc: subprocess.Popen) -> None:
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+def process_tree(pid: int) -> list[int]:
+    """The pid and its children (Linux /proc)."""
+    try:
+        children = Path(f"/proc/{pid}/task/{pid}/children").read_text().split()
+    except OSError:
+        return [pid]
+    return [pid] + [int(c) for c in children]
+
+def memory_mb(pid: int) -> dict:
+    """Summed RSS and PSS of a process and its children, from /proc/<pid>/smaps_rollup."""
+    total = {"rss_mb": 0.0, "pss_mb": 0.0}
+    for p in process_tree(pid):
+        try:
+            lines = Path(f"/proc/{p}/smaps_rollup").read_text().splitlines()
+        except OSError:
+            continue
+        for line in lines:
+            field, *rest = line.split()
+            if field in ("Rss:", "Pss:"):
+                total[f"{field[:-1].lower()}_mb"] += int(rest[0]) / 1024
+    return total
+
+async def wait_ready(base_url: str, proc, timeout=120.0) -> dict:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as http:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                sys.exit("Server exited during startup")
+            try:
+                async with http.get(base_url + "/readyz") as response:
+                    if response.status == 200:
+                        return await response.json()
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    sys.exit("Server did not become ready")
+
+async def drive(base_url: str, docs: list[str], clients: int, seconds: float, during=None) -> dict:
+    """Closed-loop load: `clients` tasks posting /analyze back to back for `seconds`."""
+    latencies, failures = [], []
+    deadline = time.monotonic() + seconds
+
+    async def client(i: int, http):
+        rng = random.Random(i)
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                async with http.post(base_url + "/analyze", json={"text": rng.choice(docs)}) as response:
+                    await response.read()
+                    ok = response.status == 200
+            except aiohttp.ClientError:
+                ok = False
+            (latencies if ok else failures).append(time.perf_counter() - start)
+
+    connector = aiohttp.TCPConnector(limit=0, force_close=True)
+    async with aiohttp.ClientSession(connector=connector) as http:
+        start = time.perf_counter()
+        tasks = [asyncio.create_task(client(i, http)) for i in range(clients)]
+        extra = await during() if during else {}
+        await asyncio.gather(*tasks)
+        wall = time.perf_counter() - start
+    q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [float("nan")] * 99
+    return {
+        "requests": len(latencies),
+        "failed": len(failures),
+        "req_per_s": len(latencies) / wall,
+        "p50_ms": q[49] * 1e3,
+        "p99_ms": q[98] * 1e3,
+        **extra,
+    }
+
+def run_scaling(workers: int, model_dir: Path, docs: list[str], args) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    proc = start_server(workers, port, model_dir, args)
+    try:
+        asyncio.run(wait_ready(base_url, proc))
+        asyncio.run(drive(base_url, docs, workers * args.clients_per_worker, min(2.0, args.seconds)))  # warm
+        result = asyncio.run(drive(base_url, docs, workers * args.clients_per_worker, args.seconds))
+        result.update(memory_mb(proc.pid))
+    finally:
+        stop_server(proc)
+    return result
+
+def run_reload(workers: int, model_dir: Path, alternate: Path, docs: list[str], args) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    proc = start_server(workers, port, model_dir, args)
+    try:
+        before = asyncio.run(wait_ready(base_url, proc))
+        steady = memory_mb(proc.pid)
+
+        async def reload_midway():
+            await asyncio.sleep(args.seconds / 3)
+            staged = model_dir / ".ai_detector.model.new"
+            shutil.copyfile(alternate, staged)
+            os.replace(staged, model_dir / "ai_detector.model")
+            proc.send_signal(signal.SIGHUP)
+            peak, after = steady, before
+            async with aiohttp.ClientSession() as http:
+                while after["model"] == before["model"] and proc.poll() is None:
+                    peak = max(peak, memory_mb(proc.pid), key=lambda m: m["pss_mb"])
+                    await asyncio.sleep(0.1)
+                    async with http.get(base_url + "/readyz") as response:
+                        after = await response.json()
+            return {"old_model": before["model"], "new_model": after["model"],
+                    "steady_pss_mb": steady["pss_mb"], "peak_pss_mb": peak["pss_mb"]}
+
+        return asyncio.run(drive(base_url, docs, workers * args.clients_per_worker, args.seconds, reload_midway))
+    finally:
+        stop_server(proc)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    free = max(1, len(CPUS) - 1)
+    default_workers = sorted({1, *(2 ** i for i in range(1, 8) if 2 ** i <= free), free})
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers)
+    parser.add_argument("--clients-per-worker", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10.0, help="load duration per run")
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--sentences-per-doc", type=int, default=20)
+    parser.add_argument("--train-sentences", type=int, default=20_000)
+    parser.add_argument("--segmenter", default=os.environ.get("SEGMENTER", "sentencizer"))
+    args = parser.parse_args()
+    if aiohttp is None:
+        sys.exit("The benchmark needs aiohttp: pip install aiohttp")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_dir, alternate = train_models(Path(tmp), args.train_sentences)
+        docs = make_documents(args.docs, args.sentences_per_doc)
+        pin(CPUS[:1] if len(CPUS) > max(args.workers) else None)
+
+        print(f"{len(CPUS)} CPUs, {args.clients_per_worker} clients per worker, {args.seconds:g} s per run, "
+              f"{args.sentences_per_doc}-sentence documents, SEGMENTER={args.segmenter}\n")
+        print(f"{'workers':>7} {'req/s':>8} {'speedup':>8} {'efficiency':>10} {'p50 ms':>7} {'p99 ms':>7} "
+              f"{'failed':>6} {'RSS MB':>7} {'PSS MB':>7}")
+        base = None
+        for workers in args.workers:
+            r = run_scaling(workers, model_dir, docs, args)
+            base = base or r["req_per_s"] / workers
+            speedup = r["req_per_s"] / base
+            print(f"{workers:>7} {r['req_per_s']:>8,.1f} {speedup:>7.2f}× {speedup / workers:>10.0%} "
+                  f"{r['p50_ms']:>7.1f} {r['p99_ms']:>7.1f} {r['failed']:>6} {r['rss_mb']:>7.0f} {r['pss_mb']:>7.0f}")
+
+        workers = max(args.workers)
+        r = run_reload(workers, model_dir, alternate, docs, args)
+        print(f"\nHot reload with {workers} workers under load: {r['requests']:,} requests, {r['failed']} failed, "
+              f"model {r['old_model']} → {r['new_model']}, PSS {r['steady_pss_mb']:.0f} MB steady, "
+              f"{r['peak_pss_mb']:.0f} MB peak")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+/analyze render cost and payload size on a large document: the old
+`highlight` (string `+=`, inline style per span) against render.py's
+single-pass, class-based `highlight` and its delta mode after a
+one-sentence edit. Payloads are measured as sent: raw JSON, gzip, and
+brotli if installed.
+
+Scores are random, so no trained model is needed.
+
+Usage:
+    python benchmarks/bench_render.py                   # 10k sentences
+    python benchmarks/bench_render.py --sentences 50000 --repeat 10
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR / "frontend"))
+sys.path.append(str(Path(__file__).parent))
+
+from compression import brotli, compress
+from render import delta, highlight
+from synthetic import sentence
+
+def color_intensity(prob: float) -> str:
+    """server.py's original per-span inline style, kept here as the baseline."""
+    base_opacity = abs(prob - 0.5) * 1.8
+    opacity = min(max(base_opacity, 0.15), 0.9)
+    if prob >= 0.5:
+        return f"background-color: rgba(255, 80, 80, {opacity:.2f});"
+    else:
+        return f"background-color: rgba(80, 255, 120, {opacity:.2f});"
+
+def highlight_old(results):
+    highlighted = ""
+    for s, prob, sid in results:
+        style = color_intensity(prob)
+        highlighted += f"<span data-id='{sid}' style='{style}'>{s}</span> "
+    return highlighted.strip()
+
+def analyzed(sentences: list[str]) -> list[tuple]:
+    rng = random.Random(0)
+    return [(s, rng.random(), hashlib.blake2b(s.encode("utf-8"), digest_size=16).hexdigest()) for s in sentences]
+
+def best_of(repeat: int, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per method; the best is reported")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    results = analyzed([sentence(rng, rng.random() < 0.5) for _ in range(args.sentences)])
+    edited = results[:]
+    edited[len(edited) // 2] = analyzed(["A freshly typed sentence."])[0]
+    known = [sid for _, _, sid in results]
+
+    runs = {
+        "old (+=, inline style)": lambda: {"html": highlight_old(results), "results": {sid: p for _, p, sid in results}},
+        "single pass, classes": lambda: {"html": highlight(results), "results": {sid: p for _, p, sid in results}},
+        "delta (1 sentence edit)": lambda: {"ops": delta(edited, known)},
+    }
+
+    encodings = ["gzip"] + (["br"] if brotli else [])
+    print(f"{len(results):,} sentences")
+    print(f"{'mode':<26} {'render ms':>10} {'json KB':>9} " + " ".join(f"{e + ' KB':>9}" for e in encodings))
+    for name, run in runs.items():
+        seconds, body = best_of(args.repeat, run)
+        payload = json.dumps(body).encode("utf-8")
+        sizes = " ".join(f"{len(compress(payload, e)) / 1024:>9.1f}" for e in encodings)
+        print(f"{name:<26} {seconds * 1e3:>10.2f} {len(payload) / 1024:>9.1f} {sizes}")
+
+if __name__ == "__main__":
+    main()
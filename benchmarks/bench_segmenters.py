@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+Compare sentence segmentation backends against the full spaCy parse.
+
+Documents are rebuilt from the training data by joining consecutive lines,
+so the reference boundaries come from `spacy` on the same text. For each
+backend we report boundary precision / recall / F1 and throughput.
+
+Usage:
+    python benchmarks/bench_segmenters.py
+    python benchmarks/bench_segmenters.py --docs 500 --sentences 20
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+DATA_DIR = ROOT_DIR / "data"
+sys.path.append(str(ROOT_DIR / "backend"))
+
+from segmenters import load_segmenter
+
+BACKENDS = ["spacy", "spacy-senter", "sentencizer", "regex"]
+
+def build_documents(n_docs: int, per_doc: int) -> list[str]:
+    """Join runs of consecutive data lines into pseudo-documents."""
+    docs = []
+    for name in ("humanData.txt", "aiData.txt"):
+        path = DATA_DIR / name
+        if not path.exists():
+            continue
+        with path.open(encoding="utf-8") as f:
+            lines = [line.strip() for line in f if line.strip()]
+        for i in range(0, len(lines) - per_doc + 1, per_doc):
+            docs.append(" ".join(lines[i:i + per_doc]))
+    if not docs:
+        sys.exit("No data found; run the gather scripts first.")
+    random.seed(42)
+    random.shuffle(docs)
+    return docs[:n_docs]
+
+def boundaries(text: str, spans) -> set[int]:
+    """Sentence end offsets, ignoring trailing whitespace and the final end."""
+    ends = set()
+    for start, end in spans:
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end < len(text.rstrip()):
+            ends.add(end)
+    return ends
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=300)
+    parser.add_argument("--sentences", type=int, default=20, help="data lines per document")
+    parser.add_argument("--reference", default="spacy")
+    args = parser.parse_args()
+
+    docs = build_documents(args.docs, args.sentences)
+    n_chars = sum(len(d) for d in docs)
+    print(f"{len(docs)} documents, {n_chars:,} characters\n")
+
+    results = {}
+    for name in BACKENDS:
+        try:
+            start = time.perf_counter()
+            segmenter = load_segmenter(name)
+            load_time = time.perf_counter() - start
+        except (OSError, ValueError, ImportError) as e:
+            print(f"skipping {name}: {e}")
+            continue
+        start = time.perf_counter()
+        spans = list(segmenter.pipe(docs))
+        elapsed = time.perf_counter() - start
+        results[name] = (load_time, elapsed, [boundaries(d, s) for d, s in zip(docs, spans)])
+
+    if args.reference not in results:
+        sys.exit(f"Reference backend '{args.reference}' is unavailable.")
+    reference = results[args.reference][2]
+
+    print(f"{'backend':<14} {'load s':>7} {'docs/s':>9} {'precision':>10} {'recall':>7} {'F1':>7}")
+    for name, (load_time, elapsed, found) in results.items():
+        tp = sum(len(f & r) for f, r in zip(found, reference))
+        n_found = sum(len(f) for f in found)
+        n_ref = sum(len(r) for r in reference)
+        precision = tp / n_found if n_found else 1.0
+        recall = tp / n_ref if n_ref else 1.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        print(
+            f"{name:<14} {load_time:>7.2f} {len(docs) / elapsed:>9.1f} "
+            f"{precision:>10.3f} {recall:>7.3f} {f1:>7.3f}"
+        )
+
+if __name__ == "__main__":
+    main()
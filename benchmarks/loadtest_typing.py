@@ -0,0 +1,356 @@
+#!/usr/bin/env python
+"""
+Load test for auto-analyze: simulated typists against a live server,
+comparing three ways the page can send requests while the user types.
+
+    keystroke    POST /analyze with the full text on every input event,
+                 requests overlapping (the original page)
+    serialized   /analyze/incremental edits on every input event, one in
+                 flight at a time and the rest coalesced
+    debounced    the current page: adaptive idle debounce, the request in
+                 flight aborted when superseded, and X-Analyze-Seq so the
+                 server drops superseded work before segmentation/inference
+
+Each typist starts from a document of --sentences sentences and types
+--chars more characters at about --cps characters per second, pausing at
+some sentence ends. Every strategy gets a fresh server process. Server
+work comes from its /metrics counters and its CPU time. "Lag" is the time
+from the last keystroke until the typist's display shows the final text.
+
+Requires aiohttp (`pip install aiohttp`) and a trained model in models/.
+
+Usage:
+    python benchmarks/loadtest_typing.py
+    python benchmarks/loadtest_typing.py --typists 16 --chars 400 --only debounced
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import re
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(Path(__file__).parent))
+
+from synthetic import sentence
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+STRATEGIES = ["keystroke", "serialized", "debounced"]
+
+# Same constants as the page (frontend/templates/index.html)
+DEBOUNCE_MIN, DEBOUNCE_MAX, MAX_WAIT = 0.150, 1.0, 2.0
+
+def compute_edit(old: str, new: str):
+    """The page's computeEdit: one edit between the common prefix and suffix."""
+    if old == new:
+        return None
+    start, limit = 0, min(len(old), len(new))
+    while start < limit and old[start] == new[start]:
+        start += 1
+    old_end, new_end = len(old), len(new)
+    while old_end > start and new_end > start and old[old_end - 1] == new[new_end - 1]:
+        old_end -= 1
+        new_end -= 1
+    return {"offset": start, "removed": old_end - start, "inserted": new[start:new_end]}
+
+# ------------------ Simulated pages ------------------
+
+class Page:
+    """One typist's browser tab."""
+
+    def __init__(self, http, base_url: str, doc_id: str):
+        self.http, self.base_url, self.doc_id = http, base_url, doc_id
+        self.loop = asyncio.get_running_loop()
+        self.sent = self.aborted = self.superseded = self.resyncs = self.errors = 0
+        self.displayed, self.shown_at = None, 0.0
+
+    async def post(self, path: str, body: dict, headers=None):
+        """The response JSON, or None when the request failed (e.g. an overloaded server refused it)."""
+        self.sent += 1
+        try:
+            async with self.http.post(self.base_url + path, json=body, headers=headers) as response:
+                return await response.json()
+        except aiohttp.ClientError:
+            self.errors += 1
+            return None
+
+    def show(self, text: str):
+        self.displayed, self.shown_at = text, self.loop.time()
+
+class KeystrokePage(Page):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.tasks = set()
+
+    def on_input(self, text: str):
+        task = asyncio.create_task(self.analyze(text))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def analyze(self, text: str):
+        if await self.post("/analyze", {"text": text}) is not None:
+            self.show(text)  # whichever response lands last wins, as with innerHTML
+
+    async def finish(self):
+        while self.tasks:
+            await asyncio.gather(*self.tasks)
+
+class IncrementalPage(Page):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.synced, self.version = None, 0
+
+    def body(self, text: str):
+        if self.synced is None:
+            return {"docId": self.doc_id, "text": text}
+        edit = compute_edit(self.synced, text)
+        return edit and {"docId": self.doc_id, "version": self.version, "edit": edit}
+
+    def apply(self, text: str, patch: dict) -> bool:
+        """Apply a response; False when the request must be sent again as a full sync."""
+        if patch is None or patch.get("resync"):
+            self.resyncs += patch is not None
+            self.synced = None
+            return False
+        self.synced, self.version = text, patch["version"]
+        self.show(text)
+        return True
+
+class SerializedPage(IncrementalPage):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.text, self.pending, self.running = "", False, None
+
+    def on_input(self, text: str):
+        self.text = text
+        if self.running:
+            self.pending = True
+        else:
+            self.running = asyncio.create_task(self.run())
+
+    async def run(self):
+        try:
+            while True:
+                self.pending = False
+                text = self.text
+                body = self.body(text)
+                if body is not None and not self.apply(text, await self.post("/analyze/incremental", body)):
+                    self.pending = True
+                if not self.pending:
+                    break
+        finally:
+            self.running = None
+
+    async def finish(self):
+        while self.running:
+            await self.running
+
+class DebouncedPage(IncrementalPage):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.text, self.seq = "", 0
+        self.timer, self.burst_start, self.round_trip = None, 0.0, DEBOUNCE_MIN
+        self.in_flight = None
+
+    def on_input(self, text: str):
+        self.text = text
+        now = self.loop.time()
+        if self.timer is None:
+            self.burst_start = now
+        else:
+            self.timer.cancel()
+        pause = min(max(1.5 * self.round_trip, DEBOUNCE_MIN), DEBOUNCE_MAX)
+        self.timer = self.loop.call_later(min(pause, max(MAX_WAIT - (now - self.burst_start), 0)), self.fire)
+
+    def fire(self):
+        self.timer = None
+        if self.in_flight and not self.in_flight.done():
+            self.in_flight.cancel()
+            self.aborted += 1
+        self.in_flight = asyncio.create_task(self.analyze())
+
+    async def analyze(self):
+        text = self.text
+        body = self.body(text)
+        if body is None:
+            return
+        self.seq += 1
+        headers = {"X-Analyze-Session": self.doc_id, "X-Analyze-Seq": str(self.seq)}
+        start = self.loop.time()
+        patch = await self.post("/analyze/incremental", body, headers)
+        self.round_trip = 0.7 * self.round_trip + 0.3 * (self.loop.time() - start)
+        if patch and patch.get("superseded"):
+            self.superseded += 1
+        elif not self.apply(text, patch):
+            self.in_flight = asyncio.create_task(self.analyze())
+
+    async def finish(self):
+        while self.timer or (self.in_flight and not self.in_flight.done()):
+            await asyncio.sleep(0.02)
+
+PAGES = {"keystroke": KeystrokePage, "serialized": SerializedPage, "debounced": DebouncedPage}
+
+# ------------------ Typists ------------------
+
+def typing_script(rng: random.Random, chars: int, cps: float) -> tuple[str, list[tuple[float, str]]]:
+    """(final added text, [(delay before key, text typed so far)])."""
+    added = ""
+    while len(added) < chars:
+        added += " " + sentence(rng, rng.random() < 0.5)
+    added = added[:chars]
+    keys = []
+    for i, ch in enumerate(added):
+        delay = rng.uniform(0.5, 1.5) / cps
+        if i and added[i - 1] in ".!?" and rng.random() < 0.3:
+            delay += rng.uniform(0.5, 2.0)  # stop to think
+        keys.append((delay, added[:i + 1]))
+    return added, keys
+
+async def typist(page: Page, base: str, keys):
+    page.on_input(base)
+    await asyncio.sleep(1.0)
+    last_key = page.loop.time()
+    for delay, typed in keys:
+        await asyncio.sleep(delay)
+        page.on_input(base + typed)
+        last_key = page.loop.time()
+    await page.finish()
+    final = base + keys[-1][1]
+    return page, (page.shown_at - last_key if page.displayed == final else None)
+
+async def run_strategy(name: str, base_url: str, args) -> list:
+    rng = random.Random(0)
+    scripts = []
+    for _ in range(args.typists):
+        base = " ".join(sentence(rng, rng.random() < 0.5) for _ in range(args.sentences))
+        scripts.append((base, typing_script(rng, args.chars, args.cps)[1]))
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as http:
+        pages = [PAGES[name](http, base_url, f"{name}-{i}") for i in range(args.typists)]
+        return await asyncio.gather(*(typist(page, base, keys) for page, (base, keys) in zip(pages, scripts)))
+
+# ------------------ Server process ------------------
+
+def serve(port: int):
+    sys.path.append(str(ROOT_DIR / "frontend"))
+    from werkzeug.serving import make_server
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    import server
+    make_server("127.0.0.1", port, server.app, threaded=True).serve_forever()
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+METRIC_LINE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+
+def parse_metrics(text: str) -> dict:
+    """{(name, labels): value} from the Prometheus text format."""
+    out = {}
+    for line in text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            out[(match[1], match[2] or "")] = float(match[3])
+    return out
+
+def total(metrics: dict, name: str, label: str = "") -> float:
+    return sum(v for (n, labels), v in metrics.items() if n == name and label in labels)
+
+async def fetch_metrics(base_url: str) -> dict:
+    async with aiohttp.ClientSession() as http:
+        async with http.get(base_url + "/metrics") as response:
+            return parse_metrics(await response.text())
+
+async def wait_ready(base_url: str, proc, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            sys.exit("Server exited during startup")
+        try:
+            return await fetch_metrics(base_url)
+        except aiohttp.ClientError:
+            await asyncio.sleep(0.2)
+    sys.exit("Server did not start")
+
+def run(name: str, args) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, SEGMENTER=args.segmenter, METRICS="1")
+    proc = subprocess.Popen([sys.executable, __file__, "--serve", str(port)], env=env)
+    try:
+        before = asyncio.run(wait_ready(base_url, proc))
+        start = time.perf_counter()
+        outcomes = asyncio.run(run_strategy(name, base_url, args))
+        wall = time.perf_counter() - start
+        after = asyncio.run(fetch_metrics(base_url))
+    finally:
+        proc.send_signal(signal.SIGINT)
+        _, _, usage = os.wait4(proc.pid, 0)
+    pages = [page for page, _ in outcomes]
+    lags = [lag for _, lag in outcomes if lag is not None]
+    work = {key: after.get(key, 0) - before.get(key, 0) for key in after}
+    return {
+        "sent": sum(p.sent for p in pages),
+        "aborted": sum(p.aborted for p in pages),
+        "dropped": total(work, "aidet_superseded_total"),
+        "resyncs": sum(p.resyncs for p in pages),
+        "errors": sum(p.errors for p in pages),
+        "sentences": total(work, "aidet_sentences_total"),
+        "segment_s": total(work, "aidet_stage_seconds_sum", 'stage="segment"'),
+        "predict_s": total(work, "aidet_stage_seconds_sum", 'stage="predict"'),
+        "cpu_s": usage.ru_utime + usage.ru_stime,
+        "lag_ms": statistics.median(lags) * 1e3 if lags else float("nan"),
+        "stale": len(pages) - len(lags),
+        "wall_s": wall,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--typists", type=int, default=8)
+    parser.add_argument("--sentences", type=int, default=40, help="sentences already in each document")
+    parser.add_argument("--chars", type=int, default=200, help="characters each typist types")
+    parser.add_argument("--cps", type=float, default=12.0, help="typing speed, characters per second")
+    parser.add_argument("--segmenter", default=os.environ.get("SEGMENTER", "regex"))
+    parser.add_argument("--only", nargs="+", choices=STRATEGIES)
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+    if aiohttp is None:
+        sys.exit("The load test needs aiohttp: pip install aiohttp")
+
+    print(f"{args.typists} typists × {args.chars} chars at {args.cps:g} chars/s, "
+          f"{args.sentences}-sentence documents, SEGMENTER={args.segmenter}\n")
+    print(f"{'strategy':<11} {'requests':>8} {'aborted':>8} {'dropped':>8} {'resyncs':>8} {'errors':>7} {'sentences':>10} "
+          f"{'segment s':>9} {'predict s':>9} {'cpu s':>6} {'lag ms':>7} {'stale':>5}")
+    results = {}
+    for name in args.only or STRATEGIES:
+        r = results[name] = run(name, args)
+        print(f"{name:<11} {r['sent']:>8,} {r['aborted']:>8,} {r['dropped']:>8,.0f} {r['resyncs']:>8,} {r['errors']:>7,} "
+              f"{r['sentences']:>10,.0f} {r['segment_s']:>9.2f} {r['predict_s']:>9.2f} {r['cpu_s']:>6.1f} "
+              f"{r['lag_ms']:>7.0f} {r['stale']:>5}")
+
+    if "keystroke" in results and "debounced" in results:
+        old, new = results["keystroke"], results["debounced"]
+        print(f"\ndebounced vs keystroke: {1 - new['sent'] / old['sent']:.0%} fewer requests, "
+              f"{1 - new['sentences'] / max(old['sentences'], 1):.0%} fewer sentences scored, "
+              f"{1 - new['cpu_s'] / old['cpu_s']:.0%} less server CPU")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+"""
+Reproducible performance suite for the training, prediction and serving paths.
+
+Builds a synthetic corpus (benchmarks/synthetic.py), trains a model on it in
+a scratch directory, then runs each benchmark in its own process so load
+times and peak RSS are not polluted by earlier ones:
+
+    train            wall time per train.py stage
+    model_load_*     load time of the compiled artifact and the pickle
+    split_sentences  segmenter throughput
+    analyze_text     per-document scoring latency, in-process
+    highlight        per-document HTML rendering time
+    analyze_http     /analyze latency through the Flask test client
+    predict_batch    predict.py document-mode throughput
+
+Results are written as JSON. With --compare, each metric is checked against
+a baseline results file. Metrics more than --tolerance worse (and beyond a
+small absolute noise floor) are flagged, and the exit status is 1.
+
+Usage:
+    python benchmarks/suite.py --save-baseline
+    python benchmarks/suite.py --compare benchmarks/results/baseline.json
+    python benchmarks/suite.py --docs 500 --sentences-per-doc 20 --only analyze_http highlight
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR    = Path(__file__).parent.parent
+RESULTS_DIR = Path(__file__).parent / "results"
+BASELINE    = RESULTS_DIR / "baseline.json"
+sys.path.append(str(Path(__file__).parent))
+
+from synthetic import make_documents, write_corpus
+
+BENCHMARKS = [
+    "train", "model_load_compiled", "model_load_sklearn", "split_sentences",
+    "analyze_text", "highlight", "analyze_http", "predict_batch",
+]
+
+def percentiles(samples: list[float], unit: float, suffix: str) -> dict:
+    p50, p95, p99 = np.percentile(np.array(samples) * unit, [50, 95, 99])
+    return {f"p50_{suffix}": p50, f"p95_{suffix}": p95, f"p99_{suffix}": p99}
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024  # bytes on macOS, KiB on Linux
+
+# ------------------ Benchmarks (each runs in a worker process) ------------------
+
+def bench_train(config: dict) -> dict:
+    import runpy
+    timings = Path(config["work_dir"]) / "train_timings.json"
+    sys.argv = [
+        "train.py", "--data-dir", str(Path(config["work_dir"]) / "data"),
+        "--output-dir", config["model_dir"], "--no-feature-cache", "--timings-json", str(timings),
+    ]
+    sys.path.append(str(ROOT_DIR / "backend"))
+    runpy.run_path(str(ROOT_DIR / "backend" / "train.py"), run_name="__main__")
+    stages = json.loads(timings.read_text())
+    result = {f"{stage.split(' (')[0].replace(' ', '_')}_s": seconds for stage, seconds in stages.items()}
+    result["total_s"] = sum(stages.values())
+    return result
+
+def bench_model_load(config: dict, kind: str) -> dict:
+    sys.path.append(str(ROOT_DIR / "backend"))
+    start = time.perf_counter()
+    from compiled_model import load_model
+    model_dir = Path(config["model_dir"])
+    model, _ = load_model(model_dir / "ai_detector.pkl", model_dir / "ai_detector.model", kind=kind)
+    model.predict_proba(["Warm the model up."])
+    return {"load_s": time.perf_counter() - start}
+
+def import_server():
+    sys.path.append(str(ROOT_DIR / "frontend"))
+    import server
+    return server
+
+def bench_split_sentences(config: dict) -> dict:
+    server = import_server()
+    docs = make_documents(config["docs"], config["sentences_per_doc"])
+    server.split_sentences(docs[0])
+    start = time.perf_counter()
+    n = sum(len(server.split_sentences(doc)) for doc in docs)
+    return {"sentences_per_s": n / (time.perf_counter() - start)}
+
+def bench_analyze_text(config: dict) -> dict:
+    server = import_server()
+    docs = make_documents(config["docs"], config["sentences_per_doc"])
+    server.analyze_text(docs[0])
+    samples = []
+    for doc in docs:
+        start = time.perf_counter()
+        server.analyze_text(doc)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples, 1e3, "ms")
+
+def bench_highlight(config: dict) -> dict:
+    server = import_server()
+    results = [server.analyze_text(doc) for doc in make_documents(config["docs"], config["sentences_per_doc"])]
+    samples = []
+    for result in results:
+        start = time.perf_counter()
+        server.highlight(result)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples, 1e6, "us")
+
+def bench_analyze_http(config: dict) -> dict:
+    server = import_server()
+    client = server.app.test_client()
+    docs = make_documents(config["docs"], config["sentences_per_doc"])
+    for doc in docs[:5]:
+        client.post("/analyze", json={"text": doc + " Warm-up."})
+    samples = []
+    start_all = time.perf_counter()
+    for doc in docs:
+        start = time.perf_counter()
+        response = client.post("/analyze", json={"text": doc})
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.status_code
+    result = percentiles(samples, 1e3, "ms")
+    result["requests_per_s"] = len(docs) / (time.perf_counter() - start_all)
+    return result
+
+def bench_predict_batch(config: dict) -> dict:
+    sys.path.append(str(ROOT_DIR / "backend"))
+    import predict
+    from segmenters import load_segmenter
+    predict.segmenter = load_segmenter(config["segmenter"])
+    docs = list(enumerate(make_documents(config["docs"] * 5, config["sentences_per_doc"], seed=2)))
+    predict.score_group(docs[:2], 4096, False)
+    start = time.perf_counter()
+    n = sum(r["n_sentences"] for group in predict.group_documents(docs, 4096)
+            for r in predict.score_group(group, 4096, False))
+    return {"sentences_per_s": n / (time.perf_counter() - start)}
+
+def run_worker(name: str, config: dict) -> dict:
+    if name == "train":
+        result = bench_train(config)
+    elif name.startswith("model_load_"):
+        result = bench_model_load(config, name.removeprefix("model_load_"))
+    else:
+        result = globals()[f"bench_{name}"](config)
+    result["peak_rss_mb"] = peak_rss_mb()
+    return {k: float(v) for k, v in result.items()}
+
+# ------------------ Driver ------------------
+
+# Differences smaller than this (in the metric's unit) are noise, whatever the relative change
+NOISE_FLOOR = {"_per_s": 0.0, "_s": 0.01, "_ms": 0.05, "_us": 2.0, "_mb": 2.0}
+
+def lower_is_better(metric: str) -> bool:
+    return not metric.endswith("_per_s")
+
+def noise_floor(metric: str) -> float:
+    return next((floor for suffix, floor in NOISE_FLOOR.items() if metric.endswith(suffix)), 0.0)
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[tuple]:
+    """(benchmark, metric, baseline, current, relative change) for every metric worse than `tolerance`."""
+    regressions = []
+    for bench, metrics in current["benchmarks"].items():
+        for metric, value in metrics.items():
+            base = baseline.get("benchmarks", {}).get(bench, {}).get(metric)
+            if not base:
+                continue
+            change = (value - base) / base
+            worse = change if lower_is_better(metric) else -change
+            if worse > tolerance and abs(value - base) > noise_floor(metric):
+                regressions.append((bench, metric, base, value, change))
+    return regressions
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=200, help="documents per serving benchmark")
+    parser.add_argument("--sentences-per-doc", type=int, default=10)
+    parser.add_argument("--train-sentences", type=int, default=20000, help="synthetic training corpus size")
+    parser.add_argument("--segmenter", default=os.environ.get("SEGMENTER", "regex"))
+    parser.add_argument("--scorer", default="compiled", choices=["compiled", "sklearn"])
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="run a subset (train always runs first)")
+    parser.add_argument("--output", type=Path, help="results file (default: benchmarks/results/<time>.json)")
+    parser.add_argument("--compare", type=Path, metavar="BASELINE", help="flag regressions against this results file")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative slowdown")
+    parser.add_argument("--save-baseline", action="store_true", help=f"also write the results to {BASELINE}")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--config", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(args.worker, json.loads(args.config))
+        Path(args.result_file).write_text(json.dumps(result))
+        return
+
+    work_dir = Path(tempfile.mkdtemp(prefix="aidet-bench-"))
+    config = {
+        "docs": args.docs,
+        "sentences_per_doc": args.sentences_per_doc,
+        "train_sentences": args.train_sentences,
+        "segmenter": args.segmenter,
+        "scorer": args.scorer,
+        "work_dir": str(work_dir),
+        "model_dir": str(work_dir / "models"),
+    }
+    env = dict(
+        os.environ, MODEL_DIR=config["model_dir"], SEGMENTER=args.segmenter, SCORER=args.scorer,
+        SCORE_CACHE_ENTRIES="0", SCORE_CACHE_DB="",
+    )
+    write_corpus(work_dir / "data", args.train_sentences)
+
+    names = ["train"] + [n for n in BENCHMARKS if n != "train" and (not args.only or n in args.only)]
+    results = {}
+    try:
+        for name in names:
+            result_file = work_dir / f"{name}.json"
+            completed = subprocess.run(
+                [sys.executable, __file__, "--worker", name, "--config", json.dumps(config), "--result-file", str(result_file)],
+                env=env, cwd=ROOT_DIR, capture_output=True, text=True,
+            )
+            if completed.returncode != 0:
+                sys.exit(f"{name} failed:\n{completed.stderr[-4000:]}")
+            results[name] = json.loads(result_file.read_text())
+            print(f"{name:<20} " + "  ".join(f"{k}={v:,.2f}" for k, v in results[name].items()))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "config": {k: v for k, v in config.items() if k not in ("work_dir", "model_dir")},
+        },
+        "benchmarks": results,
+    }
+    RESULTS_DIR.mkdir(exist_ok=True)
+    output = args.output or RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {output}")
+    if args.save_baseline:
+        BASELINE.write_text(json.dumps(report, indent=2))
+        print(f"Baseline saved to {BASELINE}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        if baseline["meta"].get("config") != report["meta"]["config"]:
+            print("⚠️  Baseline was run with a different configuration; comparisons may not be meaningful")
+        regressions = compare(report, baseline, args.tolerance)
+        if not regressions:
+            print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
+            return
+        print(f"\n{'benchmark':<20} {'metric':<18} {'baseline':>12} {'current':>12} {'change':>8}")
+        for bench, metric, base, value, change in regressions:
+            print(f"{bench:<20} {metric:<18} {base:>12,.2f} {value:>12,.2f} {change:>+8.1%}  REGRESSION")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
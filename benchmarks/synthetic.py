@@ -0,0 +1,55 @@
+"""
+Deterministic synthetic corpora for benchmarks, so they run offline and
+give the same inputs on every machine.
+
+"Human" and "AI" sentences share a common vocabulary and each mix in
+their own style words, so a trained model has real signal to find.
+"""
+
+import random
+from pathlib import Path
+
+COMMON = (
+    "the a of and to in that it was for on with as by at from this but not "
+    "or be are have had they which one all were when there can an more so "
+    "time people way day world life work part place case point number group"
+).split()
+
+HUMAN_STYLE = (
+    "honestly yeah kinda weird tired gonna lunch rain bus cousin laughed "
+    "forgot kitchen sister shouted muddy grabbed coffee dog late stupid "
+    "whatever maybe guess stuff old porch window knocked dinner cold"
+).split()
+
+AI_STYLE = (
+    "furthermore additionally crucial comprehensive innovative leverage "
+    "landscape essential significant enhance foster robust framework "
+    "ultimately various pivotal seamless dynamic insights realm delve "
+    "transformative notably overall facilitate intricate"
+).split()
+
+def sentence(rng: random.Random, label: int) -> str:
+    style = AI_STYLE if label else HUMAN_STYLE
+    words = [rng.choice(style) if rng.random() < 0.35 else rng.choice(COMMON)
+             for _ in range(rng.randint(6, 24))]
+    text = " ".join(words)
+    return text[0].upper() + text[1:] + rng.choice(".!?")
+
+def make_corpus(n_sentences: int, seed: int = 0) -> tuple[list[str], list[str]]:
+    """(human sentences, AI sentences), about half each."""
+    rng = random.Random(seed)
+    human = [sentence(rng, 0) for _ in range(n_sentences // 2)]
+    ai = [sentence(rng, 1) for _ in range(n_sentences - n_sentences // 2)]
+    return human, ai
+
+def make_documents(n_docs: int, sentences_per_doc: int, seed: int = 1) -> list[str]:
+    """Documents whose sentences are a random mix of both styles."""
+    rng = random.Random(seed)
+    return [" ".join(sentence(rng, rng.random() < 0.5) for _ in range(sentences_per_doc)) for _ in range(n_docs)]
+
+def write_corpus(data_dir: Path, n_sentences: int, seed: int = 0) -> None:
+    """Write humanData.txt and aiData.txt, as the gather scripts would."""
+    data_dir.mkdir(parents=True, exist_ok=True)
+    human, ai = make_corpus(n_sentences, seed)
+    (data_dir / "humanData.txt").write_text("\n".join(human) + "\n", encoding="utf-8")
+    (data_dir / "aiData.txt").write_text("\n".join(ai) + "\n", encoding="utf-8")
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Append-only binary store for the training sentences.
+
+Layout of data/store/:
+    manifest.json       shard list, source names, per-label and per-source counts
+    shard-00000.blob    UTF-8 sentences back to back
+    shard-00000.idx     one fixed-size record per sentence:
+                        offset, length, label, source id, 64-bit content hash
+
+A hash index built from the .idx files rejects exact duplicates at insert
+time. Counts live in the manifest, so they are O(1) to read. Readers
+memory-map the shards and slice sentences straight out of the blob.
+
+Only the manifest makes appended records visible: it is rewritten
+atomically after the shard files are synced, and anything past the
+manifest's counts (a crashed write) is truncated on the next open.
+
+The legacy humanData.txt and aiData.txt next to the store are imported
+by import_legacy, which the gatherers run first: all of them into a new
+store, then only what was appended since. The manifest records how many
+bytes of each were imported, so checking for unimported lines reads only
+the tail.
+
+Usage:
+    python3 datastore.py stats
+    python3 datastore.py import-legacy
+    python3 datastore.py import humanData.txt --label 0 --source legacy-human
+"""
+
+import argparse
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+from pathlib import Path
+
+import numpy as np
+
+STORE_DIR = Path(__file__).parent / "store"
+SHARD_BYTES = 64 << 20
+FORMAT_VERSION = 1
+# Text files the gatherers append to, next to the store: name -> (label, source)
+LEGACY_FILES = {"humanData.txt": (0, "legacy-human"), "aiData.txt": (1, "legacy-ai")}
+
+RECORD = np.dtype([
+    ("offset", "<u8"),
+    ("length", "<u4"),
+    ("label", "u1"),
+    ("source", "<u2"),
+    ("hash", "<u8"),
+])
+
+def text_hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+class DatasetStore:
+    """Open a store for reading, and for appending when `writable`."""
+
+    def __init__(self, root: Path = STORE_DIR, writable: bool = False):
+        self.root = Path(root)
+        self.writable = writable
+        self._lock_file = None
+        if writable:
+            self.root.mkdir(parents=True, exist_ok=True)
+            # One writer at a time; readers never take the lock
+            self._lock_file = open(self.root / ".lock", "w")
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+
+        manifest_path = self.root / "manifest.json"
+        if manifest_path.exists():
+            self.manifest = json.loads(manifest_path.read_text())
+            if self.manifest.get("format") != FORMAT_VERSION:
+                raise ValueError(f"{manifest_path} has unsupported format {self.manifest.get('format')}")
+        else:
+            self.manifest = {"format": FORMAT_VERSION, "shards": [], "sources": {}, "counts": {"label": {}, "source": {}}}
+        self.manifest.setdefault("legacy", {})  # legacy file name -> bytes imported
+
+        self._pending = []      # (text bytes, label, source id, hash) not yet flushed
+        self._pending_hashes = set()
+        self._hashes = None     # sorted committed hashes, loaded on first insert
+        if writable:
+            self._recover()
+
+    # ------------------ reading ------------------
+
+    def counts(self) -> dict:
+        """Sentences per label and per source, straight from the manifest."""
+        return {
+            "total": sum(shard["records"] for shard in self.manifest["shards"]),
+            "label": dict(self.manifest["counts"]["label"]),
+            "source": dict(self.manifest["counts"]["source"]),
+        }
+
+    def _shard_path(self, name: str, suffix: str) -> Path:
+        return self.root / f"{name}{suffix}"
+
+    def shards(self):
+        """Yield (records, blob) per shard: a memmap of RECORD and an mmap of the text."""
+        for shard in self.manifest["shards"]:
+            if not shard["records"]:
+                continue
+            records = np.memmap(self._shard_path(shard["name"], ".idx"), dtype=RECORD, mode="r", shape=(shard["records"],))
+            with open(self._shard_path(shard["name"], ".blob"), "rb") as f:
+                blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            yield records, blob
+
+    def __iter__(self):
+        """Yield (text, label, source name) for every sentence, in insertion order."""
+        names = {v: k for k, v in self.manifest["sources"].items()}
+        for records, blob in self.shards():
+            view = memoryview(blob)
+            for offset, length, label, source in zip(
+                records["offset"].tolist(), records["length"].tolist(),
+                records["label"].tolist(), records["source"].tolist(),
+            ):
+                yield str(view[offset:offset + length], "utf-8"), label, names[source]
+            view.release()
+
+    def labels(self) -> np.ndarray:
+        """Label of every sentence, without touching the text."""
+        parts = [np.asarray(records["label"]) for records, _ in self.shards()]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.uint8)
+
+    def hashes(self) -> np.ndarray:
+        """Content hash of every sentence, in insertion order."""
+        parts = [np.asarray(records["hash"]) for records, _ in self.shards()]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.uint64)
+
+    def legacy_tail(self, name: str, data_dir: Path):
+        """
+        (complete lines of `name` past the imported offset, offset after them).
+        A file shorter than the offset was rewritten and is read from the start.
+        """
+        path = Path(data_dir) / name
+        if not path.exists():
+            return [], 0
+        offset = self.manifest["legacy"].get(name, 0)
+        if offset > path.stat().st_size:
+            offset = 0
+        lines = []
+        with path.open("rb") as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # still being written; picked up next time
+                lines.append(raw.decode("utf-8"))
+                offset += len(raw)
+        return lines, offset
+
+    def missing_legacy(self, data_dir: Path) -> dict:
+        """{legacy file name: lines past the imported offset that the store lacks}."""
+        hashes = self.hashes()
+        missing = {}
+        for name in LEGACY_FILES:
+            lines, _ = self.legacy_tail(name, data_dir)
+            tail = np.array([text_hash(line.strip()) for line in lines if line.strip()], dtype=np.uint64)
+            count = int((~np.isin(tail, hashes)).sum())
+            if count:
+                missing[name] = count
+        return missing
+
+    def fingerprint(self) -> str:
+        """sha256 over every record's content hash and label, in order."""
+        digest = hashlib.sha256()
+        for records, _ in self.shards():
+            digest.update(np.ascontiguousarray(records[["hash", "label"]]).tobytes())
+        return digest.hexdigest()
+
+    # ------------------ writing ------------------
+
+    def _recover(self):
+        """Drop bytes written after the last manifest commit (an interrupted flush)."""
+        for shard in self.manifest["shards"]:
+            idx = self._shard_path(shard["name"], ".idx")
+            blob = self._shard_path(shard["name"], ".blob")
+            if idx.exists() and idx.stat().st_size > shard["records"] * RECORD.itemsize:
+                os.truncate(idx, shard["records"] * RECORD.itemsize)
+            if blob.exists() and blob.stat().st_size > shard["bytes"]:
+                os.truncate(blob, shard["bytes"])
+
+    def _load_hashes(self):
+        self._hashes = np.sort(self.hashes())
+
+    def _known(self, h: int) -> bool:
+        if h in self._pending_hashes:
+            return True
+        i = np.searchsorted(self._hashes, np.uint64(h))
+        return i < len(self._hashes) and self._hashes[i] == h
+
+    def add(self, text: str, label: int, source: str) -> bool:
+        """Queue one sentence; returns False if it is an exact duplicate."""
+        if not self.writable:
+            raise RuntimeError("store was opened read-only")
+        text = text.strip()
+        if not text:
+            return False
+        if self._hashes is None:
+            self._load_hashes()
+        h = text_hash(text)
+        if self._known(h):
+            return False
+        sources = self.manifest["sources"]
+        if source not in sources:
+            sources[source] = len(sources)
+        self._pending.append((text.encode("utf-8"), label, sources[source], h))
+        self._pending_hashes.add(h)
+        return True
+
+    def add_many(self, texts, label: int, source: str) -> int:
+        """Queue many sentences and flush; returns how many were new."""
+        added = sum(self.add(text, label, source) for text in texts)
+        self.flush()
+        return added
+
+    def import_legacy(self, data_dir: Path) -> int:
+        """Add the lines appended to the LEGACY_FILES since the last import; returns how many were new."""
+        added = 0
+        for name, (label, source) in LEGACY_FILES.items():
+            lines, offset = self.legacy_tail(name, data_dir)
+            added += sum(self.add(line, label, source) for line in lines)
+            self.manifest["legacy"][name] = offset
+        self.flush(commit=True)
+        return added
+
+    def flush(self, commit: bool = False):
+        """Append queued sentences to the shards, then commit the manifest (also when `commit`)."""
+        if not self._pending:
+            if commit:
+                self._commit_manifest()
+            return
+        shards = self.manifest["shards"]
+        counts = self.manifest["counts"]
+        names = {v: k for k, v in self.manifest["sources"].items()}
+
+        pending = self._pending
+        while pending:
+            if not shards or shards[-1]["bytes"] >= SHARD_BYTES:
+                shards.append({"name": f"shard-{len(shards):05d}", "records": 0, "bytes": 0})
+            shard = shards[-1]
+
+            # Fill the current shard up to SHARD_BYTES
+            take, size = 0, shard["bytes"]
+            while take < len(pending) and (take == 0 or size + len(pending[take][0]) <= SHARD_BYTES):
+                size += len(pending[take][0])
+                take += 1
+            batch, pending = pending[:take], pending[take:]
+
+            records = np.zeros(len(batch), dtype=RECORD)
+            offset = shard["bytes"]
+            with open(self._shard_path(shard["name"], ".blob"), "ab") as blob:
+                for i, (data, label, source, h) in enumerate(batch):
+                    blob.write(data)
+                    records[i] = (offset, len(data), label, source, h)
+                    offset += len(data)
+                blob.flush()
+                os.fsync(blob.fileno())
+            with open(self._shard_path(shard["name"], ".idx"), "ab") as idx:
+                idx.write(records.tobytes())
+                idx.flush()
+                os.fsync(idx.fileno())
+
+            shard["records"] += len(batch)
+            shard["bytes"] = offset
+            for _, label, source, _ in batch:
+                counts["label"][str(label)] = counts["label"].get(str(label), 0) + 1
+                counts["source"][names[source]] = counts["source"].get(names[source], 0) + 1
+
+        self._commit_manifest()
+        new = np.fromiter(self._pending_hashes, dtype=np.uint64, count=len(self._pending_hashes))
+        self._hashes = np.sort(np.concatenate([self._hashes, new]))
+        self._pending, self._pending_hashes = [], set()
+
+    def _commit_manifest(self):
+        """Atomically replace manifest.json: write and sync a temp file, then rename it over."""
+        tmp = self.root / "manifest.json.tmp"
+        with open(tmp, "w") as f:
+            f.write(json.dumps(self.manifest, indent=2))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.root / "manifest.json")
+
+    def close(self, commit: bool = True):
+        """Flush queued sentences (unless `commit` is False, which drops them) and release the lock."""
+        if self.writable and commit:
+            self.flush()
+        self._pending, self._pending_hashes = [], set()
+        if self._lock_file:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Sentences queued before an error are not committed
+        self.close(commit=exc_type is None)
+
+def import_legacy(root: Path = STORE_DIR) -> int:
+    """Import what was appended to the LEGACY_FILES in `root`'s parent since the last import."""
+    root = Path(root)
+    with DatasetStore(root, writable=True) as store:
+        return store.import_legacy(root.parent)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", type=Path, default=STORE_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="show counts per label and source")
+    sub.add_parser("import-legacy", help="import new lines of humanData.txt and aiData.txt next to the store")
+    imp = sub.add_parser("import", help="import a text file, one sentence per line")
+    imp.add_argument("path", type=Path)
+    imp.add_argument("--label", type=int, required=True, help="0 = Human, 1 = AI")
+    imp.add_argument("--source", required=True)
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        print(json.dumps(DatasetStore(args.root).counts(), indent=2))
+        return
+    if args.command == "import-legacy":
+        print(f"✓ Imported {import_legacy(args.root)} sentences from {', '.join(LEGACY_FILES)}")
+        return
+
+    with DatasetStore(args.root, writable=True) as store, args.path.open(encoding="utf-8") as f:
+        added = store.add_many(f, args.label, args.source)
+    print(f"✓ Imported {added} new sentences from {args.path}")
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,30 @@
 #!/usr/bin/env python3
 """
 AI Data Gathering Script using Ollama and smollm2:135m
-Generates AI text samples and saves them to aiData.txt
+Generates AI text samples and saves them to aiData.txt and the dataset store
+
+Usage:
+    python3 gatherAIData.py                      # one `ollama run` per prompt, in sequence
+    python3 gatherAIData.py --http --concurrency 8
+        # concurrent, resumable generation through Ollama's HTTP API
 """
 
+import argparse
+import asyncio
+import json
 import subprocess
 import sys
 import os
 import re
 import random
+from pathlib import Path
+
+from datastore import STORE_DIR, DatasetStore, import_legacy
+
+try:
+    import aiohttp
+except ImportError:  # only needed for --http
+    aiohttp = None
 
 class OllamaAIDataGenerator:
     """Generates AI text using Ollama with smollm2:135m model"""
@@ -16,6 +32,8 @@ class OllamaAIDataGenerator:
     def __init__(self, model="smollm2:135m"):
         self.model = model
         self.output_file = "aiData.txt"
+        self.store_dir = STORE_DIR
+        self.store = None  # kept open across prompts by the async generator
         
         # Prompt generation components
         self.story_subjects = [
@@ -214,8 +232,8 @@ class OllamaAIDataGenerator:
             ]
             return f"Provide a guide on how to {random.choice(activities)}."
     
-    def generate_dataset(self, num_samples=10, use_dynamic=False):
-        """Generate multiple AI text samples"""
+    def build_prompts(self, num_samples=10, use_dynamic=False):
+        """Build the list of prompts to generate from"""
         
         static_prompts = [
             "Write a short story about a person discovering something mysterious in their town.",
@@ -270,21 +288,20 @@ class OllamaAIDataGenerator:
             "Write about rediscovering lost knowledge."
         ]
         
-        generated_texts = []
-        
         if use_dynamic:
             print("Using dynamic prompt generation...")
-            prompts = [self.generate_dynamic_prompt() for _ in range(num_samples)]
-            num_to_generate = num_samples
-        else:
-            prompts = static_prompts
-            num_to_generate = min(num_samples, len(prompts))
+            return [self.generate_dynamic_prompt() for _ in range(num_samples)]
+        return static_prompts[:min(num_samples, len(static_prompts))]
+    
+    def generate_dataset(self, num_samples=10, use_dynamic=False):
+        """Generate multiple AI text samples"""
+        
+        generated_texts = []
+        prompts = self.build_prompts(num_samples, use_dynamic)
+        num_to_generate = len(prompts)
         
         for i in range(num_to_generate):
-            if use_dynamic:
-                prompt = prompts[i]
-            else:
-                prompt = prompts[i % len(prompts)]
+            prompt = prompts[i]
                 
             print(f"\n{'='*60}")
             print(f"Sample {i+1}/{num_to_generate}")
@@ -307,11 +324,20 @@ class OllamaAIDataGenerator:
         sentences = [s.strip() for s in sentences if s.strip()]
         return sentences
     
+    def save_to_store(self, sentences):
+        """Add sentences to the dataset store as AI text; returns how many were new"""
+        source = f"ollama:{self.model}"
+        if self.store is not None:
+            return self.store.add_many(sentences, label=1, source=source)
+        with DatasetStore(self.store_dir, writable=True) as store:
+            return store.add_many(sentences, label=1, source=source)
+    
     def save_to_file(self, texts, append=True, split_sentences=True):
         """Save generated texts to aiData.txt"""
         try:
             mode = 'a' if append else 'w'
             total_sentences = 0
+            stored = []
             
             with open(self.output_file, mode, encoding='utf-8') as f:
                 if append and os.path.exists(self.output_file) and os.path.getsize(self.output_file) > 0:
@@ -321,12 +347,17 @@ class OllamaAIDataGenerator:
                     if split_sentences:
                         sentences = self.split_into_sentences(text)
                         total_sentences += len(sentences)
+                        stored.extend(sentences)
                         for sentence in sentences:
                             f.write(sentence)
                             f.write("\n")
                     else:
                         f.write(text)
                         f.write("\n")
+                        stored.append(text)
+            
+            added = self.save_to_store(stored)
+            print(f"✓ {added} new sentences added to the dataset store ({self.store_dir})")
             
             if split_sentences:
                 print(f"\n✓ Successfully saved {len(texts)} samples ({total_sentences} sentences) to {self.output_file}")
@@ -339,13 +370,223 @@ class OllamaAIDataGenerator:
         except Exception as e:
             print(f"✗ Error saving to file: {e}")
 
+class AsyncOllamaAIDataGenerator(OllamaAIDataGenerator):
+    """
+    Generates AI text concurrently through Ollama's HTTP API.
+    
+    Requests share a pooled aiohttp session and at most `concurrency` run at
+    once. Tokens are streamed, sentences are appended to aiData.txt as each
+    prompt completes, and completed prompts are recorded in a journal so an
+    interrupted run picks up where it left off.
+    """
+    
+    def __init__(self, model="smollm2:135m", host="http://127.0.0.1:11434",
+                 concurrency=4, timeout=120, journal_file="aiData.journal.jsonl"):
+        super().__init__(model)
+        if "://" not in host:
+            host = "http://" + host  # OLLAMA_HOST is often just host:port
+        self.host = host.rstrip("/")
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.journal_file = journal_file
+        self.write_lock = asyncio.Lock()
+    
+    def load_journal(self):
+        """Return (prompt plan, completed prompt indices) from a previous run"""
+        plan, done = None, set()
+        if not os.path.exists(self.journal_file):
+            return plan, done
+        with open(self.journal_file, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line from a crash
+                if "plan" in record:
+                    plan = record["plan"]
+                elif "done" in record:
+                    done.add(record["done"])
+        return plan, done
+    
+    def append_journal(self, record):
+        with open(self.journal_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def append_sentences(self, sentences):
+        """Append sentences to aiData.txt, starting on a fresh line"""
+        needs_newline = False
+        if os.path.exists(self.output_file) and os.path.getsize(self.output_file) > 0:
+            with open(self.output_file, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        with open(self.output_file, 'a', encoding='utf-8') as f:
+            if needs_newline:
+                f.write("\n")
+            for sentence in sentences:
+                f.write(sentence)
+                f.write("\n")
+            f.flush()
+            os.fsync(f.fileno())
+    
+    async def check_server(self):
+        """Check that the Ollama server is up and has the model"""
+        try:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
+                async with session.get(f"{self.host}/api/tags") as response:
+                    response.raise_for_status()
+                    names = [m.get("name", "") for m in (await response.json()).get("models", [])]
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"✗ Cannot reach Ollama at {self.host}: {e}")
+            return False
+        if not any(name == self.model or name.startswith(self.model + ":") for name in names):
+            print(f"✗ Model '{self.model}' not found on {self.host}")
+            return False
+        print(f"✓ Ollama server at {self.host} has '{self.model}'")
+        return True
+    
+    async def stream_generate(self, session, prompt, max_tokens=500):
+        """Generate text for one prompt, reading the token stream as it arrives"""
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": True,
+            "options": {"num_predict": max_tokens},
+        }
+        parts = []
+        async with session.post(f"{self.host}/api/generate", json=payload) as response:
+            response.raise_for_status()
+            async for line in response.content:
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(chunk["error"])
+                parts.append(chunk.get("response", ""))
+                if chunk.get("done"):
+                    break
+        return "".join(parts).strip()
+    
+    async def generate_one(self, session, semaphore, index, total, prompt, retries=2):
+        """Generate, save and journal one prompt; returns its sentence count"""
+        async with semaphore:
+            for attempt in range(retries + 1):
+                try:
+                    text = await self.stream_generate(session, prompt)
+                    break
+                except (aiohttp.ClientError, asyncio.TimeoutError, RuntimeError, ValueError) as e:
+                    print(f"✗ Sample {index+1}/{total} attempt {attempt+1} failed: {e}")
+                    if attempt == retries:
+                        return 0
+                    await asyncio.sleep(2 ** attempt)
+        
+        if not text:
+            print(f"✗ Sample {index+1}/{total} came back empty")
+            return 0
+        
+        sentences = self.split_into_sentences(text)
+        async with self.write_lock:
+            # Sentences first, then the journal: a crash in between repeats a prompt rather than losing it
+            self.append_sentences(sentences)
+            self.save_to_store(sentences)
+            self.append_journal({"done": index, "sentences": len(sentences)})
+        print(f"✓ Sample {index+1}/{total}: {len(text)} characters, {len(sentences)} sentences")
+        return len(sentences)
+    
+    async def generate_dataset_async(self, num_samples=10, use_dynamic=False, resume=True):
+        """Generate all prompts concurrently; returns (prompts completed, sentences written)"""
+        plan, done = self.load_journal() if resume else (None, set())
+        if plan is None:
+            plan, done = self.build_prompts(num_samples, use_dynamic), set()
+            with open(self.journal_file, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({"plan": plan}) + "\n")
+        else:
+            print(f"Resuming: {len(done)}/{len(plan)} prompts already done")
+        
+        pending = [(i, prompt) for i, prompt in enumerate(plan) if i not in done]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        with DatasetStore(self.store_dir, writable=True) as self.store:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+                counts = await asyncio.gather(*(
+                    self.generate_one(session, semaphore, i, len(plan), prompt) for i, prompt in pending
+                ))
+        self.store = None
+        
+        completed = len(done) + sum(1 for n in counts if n)
+        if completed == len(plan):
+            os.remove(self.journal_file)
+        return completed, sum(counts)
+
+def main_http(args):
+    """Concurrent generation through the Ollama HTTP API"""
+    if aiohttp is None:
+        print("✗ --http needs aiohttp: pip install aiohttp")
+        sys.exit(1)
+    
+    generator = AsyncOllamaAIDataGenerator(
+        host=args.host, concurrency=args.concurrency, journal_file=args.journal
+    )
+    generator.store_dir = args.store
+    
+    print("\nChecking prerequisites...")
+    if not asyncio.run(generator.check_server()):
+        print(f"\nStart Ollama (`ollama serve`) and pull the model: ollama pull {generator.model}")
+        sys.exit(1)
+    
+    plan, done = generator.load_journal()
+    resume = plan is not None and not args.no_resume
+    num_samples, use_dynamic = 0, False
+    if not resume:
+        try:
+            num_samples = int(input("\nHow many text samples to generate? (default: 10): ") or "10")
+        except ValueError:
+            num_samples = 10
+        
+        prompt_choice = input("\nUse dynamic prompt generation? (y/n, default: n): ").lower() or "n"
+        use_dynamic = prompt_choice == "y"
+    
+    print(f"\nGenerating with {args.concurrency} concurrent requests...")
+    completed, total_sentences = asyncio.run(
+        generator.generate_dataset_async(num_samples, use_dynamic=use_dynamic, resume=resume)
+    )
+    
+    if completed:
+        print(f"\n✓ {completed} samples done, {total_sentences} sentences appended to {generator.output_file}")
+        if os.path.exists(generator.journal_file):
+            print(f"Some prompts failed; run again to retry them (progress is in {generator.journal_file})")
+    else:
+        print("\n✗ No texts were generated successfully")
+        sys.exit(1)
+
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description="Generate AI text samples with Ollama")
+    parser.add_argument("--http", action="store_true", help="use the Ollama HTTP API concurrently")
+    parser.add_argument("--host", default=os.environ.get("OLLAMA_HOST", "http://127.0.0.1:11434"))
+    parser.add_argument("--concurrency", type=int, default=4, help="parallel requests with --http")
+    parser.add_argument("--journal", default="aiData.journal.jsonl", help="resume journal for --http")
+    parser.add_argument("--no-resume", action="store_true", help="ignore an existing journal")
+    parser.add_argument("--store", type=Path, default=STORE_DIR, help="dataset store directory")
+    args = parser.parse_args()
+    
     print("="*60)
     print("AI Data Generator using Ollama (smollm2:135m)")
     print("="*60)
     
+    # Import lines added to the text files outside the gatherers before appending to them
+    seeded = import_legacy(args.store)
+    if seeded:
+        print(f"✓ Imported {seeded} sentences from the text files into the dataset store")
+    
+    if args.http:
+        main_http(args)
+        return
+    
     generator = OllamaAIDataGenerator()
+    generator.store_dir = args.store
     
     print("\nChecking prerequisites...")
     if not generator.check_ollama_installed():
@@ -1,56 +1,222 @@
-import requests
-from bs4 import BeautifulSoup
+"""
+Human data gathering: download Project Gutenberg books and extract sentences.
+
+- Fetches books concurrently over a pooled requests session
+- Caches pages on disk and revalidates them with ETag / Last-Modified,
+  so re-runs only download what changed
+- Parses HTML incrementally with lxml, one <p> at a time
+- Sentence-tokenizes paragraph blocks across processes
+- Skips sentences already in humanData.txt before appending, and adds
+  new ones to the dataset store (datastore.py), tagged with their book
+
+Usage:
+    python3 gatherHumanData.py                   # the default Gutenberg books
+    python3 gatherHumanData.py --html-dir books/ # offline, from local HTML files
+"""
+
+import argparse
+import hashlib
+import json
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
 import nltk
-nltk.download('punkt')
+import requests
+from lxml import etree, html as lxml_html
 from nltk.tokenize import sent_tokenize
+from requests.adapters import HTTPAdapter
+
+from datastore import STORE_DIR, DatasetStore, import_legacy
+
+URLS = [
+    "https://www.gutenberg.org/cache/epub/1342/pg1342.html",     # Pride and Prejudice
+    "https://www.gutenberg.org/cache/epub/11/pg11-images.html",  # Alice's Adventures in Wonderland
+    "https://www.gutenberg.org/cache/epub/84/pg84-images.html",  # Frankenstein
+    "https://www.gutenberg.org/cache/epub/1661/pg1661.html",     # Sherlock Holmes
+]
+
+CACHE_DIR = Path(__file__).parent / ".http_cache"
+PARAGRAPHS_PER_BLOCK = 200
+
+def ensure_punkt():
+    """Download the punkt sentence model only if it is not installed yet."""
+    for resource in ("punkt", "punkt_tab"):
+        try:
+            nltk.data.find(f"tokenizers/{resource}")
+        except LookupError:
+            nltk.download(resource, quiet=True)
+
+# ------------------ Fetching ------------------
+
+def make_session(pool_size: int) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def fetch_cached(session: requests.Session, url: str, cache_dir: Path = CACHE_DIR) -> Path:
+    """
+    Return the path of an up-to-date copy of `url` in the cache. Cached pages
+    are revalidated with If-None-Match / If-Modified-Since; a 304 (or a
+    network error, when a copy exists) reuses the cached body.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    body_path = cache_dir / f"{key}.html"
+    meta_path = cache_dir / f"{key}.json"
+
+    headers = {}
+    if body_path.exists() and meta_path.exists():
+        meta = json.loads(meta_path.read_text())
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        response = session.get(url, headers=headers, stream=True, timeout=60)
+    except requests.RequestException:
+        if body_path.exists():
+            print(f"⚠️  {url} unreachable, using cached copy")
+            return body_path
+        raise
+
+    with response:
+        if response.status_code == 304:
+            return body_path
+        response.raise_for_status()
+        tmp = body_path.with_suffix(".tmp")
+        with tmp.open("wb") as f:
+            for block in response.iter_content(1 << 16):
+                f.write(block)
+        os.replace(tmp, body_path)
+        meta_path.write_text(json.dumps({
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }))
+    return body_path
+
+# ------------------ Parsing ------------------
+
+def normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+def iter_paragraphs(path: Path):
+    """Yield the text of each <p> element, clearing parsed elements as we go."""
+    for _, element in etree.iterparse(str(path), events=("end",), tag="p", html=True, encoding="utf-8"):
+        text = normalize("".join(element.itertext()))
+        element.clear(keep_tail=True)
+        if text:
+            yield text
+
+def extract_text_blocks(path: Path) -> list[str]:
+    """Paragraph texts of a book, without the Gutenberg header and license."""
+    paragraphs = list(iter_paragraphs(path))
+    if len(paragraphs) <= 10:
+        # Few <p> tags: fall back to <div> blocks, then to the whole page
+        tree = lxml_html.parse(str(path))
+        divs = [normalize(div.text_content()) for div in tree.iter("div")]
+        paragraphs = divs if len(divs) > 10 else [normalize(tree.getroot().text_content())]
+
+    # Keep only the text between the "*** START OF" and "*** END OF" markers when present
+    start = next((i + 1 for i, p in enumerate(paragraphs) if "*** START OF" in p), 0)
+    end = next((i for i, p in enumerate(paragraphs) if "*** END OF" in p), len(paragraphs))
+    return [p for p in paragraphs[start:end] if "Project Gutenberg" not in p]
+
+def tokenize_block(paragraphs: list[str]) -> list[str]:
+    """Sentence-tokenize one block of paragraphs (runs in a worker process)."""
+    return [s.strip() for p in paragraphs for s in sent_tokenize(p) if s.strip()]
+
+def get_sentences(path: Path, pool: ProcessPoolExecutor, max_sentences=8000) -> list[str]:
+    blocks = extract_text_blocks(path)
+    chunks = [blocks[i:i + PARAGRAPHS_PER_BLOCK] for i in range(0, len(blocks), PARAGRAPHS_PER_BLOCK)]
+    sentences = []
+    for found in pool.map(tokenize_block, chunks):
+        sentences.extend(found)
+        if len(sentences) >= max_sentences:
+            break
+    return sentences[:max_sentences]
 
 def get_sentences_from_html(url, max_sentences=8000):
-    response = requests.get(url)
-    response.encoding = 'utf-8'  # Ensure proper text decoding
-    soup = BeautifulSoup(response.text, 'html.parser')
-    
-    # Try different containers for the main text
-    text_blocks = []
-
-    # 1️⃣ Try <p> tags first
-    paragraphs = [p.get_text() for p in soup.find_all('p')]
-    if len(paragraphs) > 10:
-        text_blocks = paragraphs
+    """Download (or revalidate) one page and return its sentences."""
+    ensure_punkt()
+    with ProcessPoolExecutor() as pool:
+        return get_sentences(fetch_cached(make_session(1), url), pool, max_sentences)
+
+# ------------------ Dedup + output ------------------
+
+def sentence_key(sentence: str) -> bytes:
+    return hashlib.blake2b(sentence.strip().encode("utf-8"), digest_size=12).digest()
+
+def existing_keys(path: Path) -> set[bytes]:
+    keys = set()
+    if path.exists():
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    keys.add(sentence_key(line))
+    return keys
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--html-dir", type=Path, help="read *.html / *.htm files from here instead of downloading")
+    parser.add_argument("--output", type=Path, default=Path("humanData.txt"))
+    parser.add_argument("--cache-dir", type=Path, default=CACHE_DIR)
+    parser.add_argument("--store", type=Path, default=STORE_DIR, help="dataset store directory")
+    parser.add_argument("--fetch-workers", type=int, default=8, help="concurrent downloads")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="tokenizer processes")
+    parser.add_argument("--per-book", type=int, default=6000, help="max sentences per book")
+    parser.add_argument("--max-total", type=int, default=9000, help="max new sentences per run")
+    args = parser.parse_args()
+
+    ensure_punkt()
+
+    if args.html_dir:
+        sources = sorted(p for p in args.html_dir.iterdir() if p.suffix.lower() in (".html", ".htm"))
+        fetched = [(str(p), p) for p in sources]
     else:
-        # 2️⃣ Try <div> blocks if <p> tags were too few
-        divs = [div.get_text() for div in soup.find_all('div')]
-        if len(divs) > 10:
-            text_blocks = divs
-        else:
-            # 3️⃣ Fallback: use the whole text content
-            text_blocks = [soup.get_text()]
-
-    text = ' '.join(text_blocks)
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'Project Gutenberg.*?End of the Project Gutenberg', '', text, flags=re.DOTALL)  # remove license text
-
-    sentences = sent_tokenize(text)
-    return sentences[:max_sentences]
+        session = make_session(args.fetch_workers)
+        with ThreadPoolExecutor(args.fetch_workers) as fetch_pool:
+            paths = list(fetch_pool.map(lambda url: fetch_cached(session, url, args.cache_dir), URLS))
+        fetched = list(zip(URLS, paths))
 
-if __name__ == "__main__":
-    urls = [
-        "https://www.gutenberg.org/cache/epub/1342/pg1342.html",     # Pride and Prejudice
-        "https://www.gutenberg.org/cache/epub/11/pg11-images.html",  # Alice's Adventures in Wonderland
-        "https://www.gutenberg.org/cache/epub/84/pg84-images.html",  # Frankenstein
-        "https://www.gutenberg.org/cache/epub/1661/pg1661.html",     # Sherlock Holmes
-    ]
+    # Import lines added to the text files outside the gatherers before appending to them
+    seeded = import_legacy(args.store)
+    if seeded:
+        print(f"✅ Imported {seeded} sentences from the text files into the dataset store")
+
+    seen = existing_keys(args.output)
+    new_sentences = []
+    with ProcessPoolExecutor(args.processes) as pool:
+        for source, path in fetched:
+            sentences = get_sentences(path, pool, args.per_book)
+            fresh = 0
+            for sentence in sentences:
+                key = sentence_key(sentence)
+                if key not in seen:
+                    seen.add(key)
+                    new_sentences.append((source, sentence))
+                    fresh += 1
+            print(f"Extracted {len(sentences)} from {source} ({fresh} new)")
 
-    all_sentences = []
-    for url in urls:
-        sentences = get_sentences_from_html(url, 6000)
-        print(f"Extracted {len(sentences)} from {url}")
-        all_sentences.extend(sentences)
+    print(f"✅ Total new sentences collected: {len(new_sentences)}")
 
-    print(f"✅ Total sentences collected: {len(all_sentences)}")
+    new_sentences = new_sentences[:args.max_total]
+    with args.output.open("a", encoding="utf-8") as f:
+        for _, sentence in new_sentences:
+            f.write(sentence + "\n")
 
-    with open("humanData.txt", "a", encoding="utf-8") as f:
-        for sentence in all_sentences[:9000]:
-            f.write(sentence.strip() + "\n")
+    added = 0
+    with DatasetStore(args.store, writable=True) as store:
+        for source, _ in fetched:
+            added += store.add_many((s for src, s in new_sentences if src == source), label=0, source=source)
+    print(f"✅ {added} sentences added to the dataset store ({args.store})")
 
     print("✅ Data extraction complete.")
+
+if __name__ == "__main__":
+    main()
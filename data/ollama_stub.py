@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Ollama HTTP API, for testing gatherAIData.py --http
+without a model. Serves /api/tags and a streaming /api/generate that sends
+a canned answer word by word.
+
+Usage:
+    python3 ollama_stub.py --port 11500 --delay 0.01 --fail-rate 0.1
+    python3 gatherAIData.py --http --host http://127.0.0.1:11500
+"""
+
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients can pool connections
+    model = "smollm2:135m"
+    delay = 0.0
+    fail_rate = 0.0
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self.send_json(200, {"models": [{"name": self.model}]})
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path != "/api/generate":
+            self.send_json(404, {"error": "not found"})
+            return
+        if random.random() < self.fail_rate:
+            self.send_json(500, {"error": "stub failure"})
+            return
+
+        prompt = body.get("prompt", "")
+        answer = (
+            f"This is a generated answer to the prompt {prompt!r}. "
+            "It contains several short sentences. Each one ends with a period. "
+            "The stub streams them one word at a time."
+        )
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for word in answer.split(" "):
+            time.sleep(self.delay)
+            chunk = {"model": self.model, "response": word + " ", "done": False}
+            self.write_chunk((json.dumps(chunk) + "\n").encode("utf-8"))
+        self.write_chunk((json.dumps({"model": self.model, "response": "", "done": True}) + "\n").encode("utf-8"))
+        self.write_chunk(b"")
+
+    def log_message(self, format, *args):
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Ollama HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--model", default=StubHandler.model)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds between streamed words")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests that fail")
+    args = parser.parse_args()
+
+    StubHandler.model = args.model
+    StubHandler.delay = args.delay
+    StubHandler.fail_rate = args.fail_rate
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"Stub Ollama listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
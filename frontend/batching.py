@@ -0,0 +1,190 @@
+"""
+Cross-request micro-batching of model inference.
+
+Concurrent requests each score a handful of sentences, and one vectorized
+predict_proba over all of them costs far less than one per request.
+Callers put their sentences in a queue and get a Future. A scheduler thread
+flushes the queue as one batch when either:
+- it holds `max_batch` sentences ("size")
+- every open caller is waiting in it, so nothing else can join ("callers")
+- the oldest entry has waited `max_wait` seconds ("wait")
+Then it scores the batch in one call and resolves each caller's Future with
+its own slice.
+
+Callers count as open between `join()` and `leave()`; the server does this
+around each scoring request. A caller that is the only open one, or that
+brings `max_batch` sentences or more, is scored at once in its own thread
+("direct"). Without join/leave only "size" and "wait" apply. `max_wait=0`
+turns batching off.
+
+`score()` blocks the calling request thread until its batch is scored.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+FLUSH_REASONS = ("size", "callers", "wait", "direct")
+
+log = logging.getLogger(__name__)
+
+class _Pending:
+    __slots__ = ("sentences", "future", "enqueued")
+
+    def __init__(self, sentences: list, future: Future):
+        self.sentences = sentences
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+class MicroBatcher:
+    """
+    Batches `predict(sentences) -> list of scores` across callers.
+    `on_flush(sentences, callers, queue_waits, reason)` is called after
+    each batch, e.g. to record metrics.
+    """
+
+    def __init__(self, predict, max_batch=256, max_wait=0.002, on_flush=None):
+        self.predict = predict
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.on_flush = on_flush
+        self._reset()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        """Fresh state; also run in a forked child, where the scheduler thread does not exist."""
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._queued = 0
+        self._open = 0
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self.flushes = Counter()
+        self.batched_sentences = 0
+        self.batched_callers = 0
+        self.max_batch_seen = 0
+        self.queue_seconds = 0.0
+
+    # ------------------ Callers ------------------
+
+    def join(self):
+        """A caller that may submit soon; flushes wait for it unless it is already queued."""
+        with self._cond:
+            self._open += 1
+
+    def leave(self):
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def submit(self, sentences) -> Future:
+        """Queue `sentences`; the Future resolves to their scores, in order."""
+        sentences = list(sentences)
+        future = Future()
+        if not sentences:
+            future.set_result([])
+        elif self._direct(sentences):
+            self._flush([_Pending(sentences, future)], "direct")
+        else:
+            with self._cond:
+                self._queue.append(_Pending(sentences, future))
+                self._queued += len(sentences)
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                    self._thread.start()
+                self._cond.notify()
+        return future
+
+    def score(self, sentences) -> list:
+        return self.submit(sentences).result()
+
+    def _direct(self, sentences) -> bool:
+        """Score in the caller's thread: batching is off, the input is a batch by itself, or no one could join it."""
+        if self.max_wait <= 0 or len(sentences) >= self.max_batch:
+            return True
+        with self._cond:
+            return not self._queue and self._open == 1
+
+    # ------------------ Scheduler ------------------
+
+    def _flush_reason(self):
+        if self._queued >= self.max_batch:
+            return "size"
+        if self._open and len(self._queue) >= self._open:
+            return "callers"
+        if time.perf_counter() >= self._queue[0].enqueued + self.max_wait:
+            return "wait"
+        return None
+
+    def _take(self) -> list:
+        """Oldest entries up to `max_batch` sentences (always at least one)."""
+        batch, size = [], 0
+        while self._queue and (not batch or size + len(self._queue[0].sentences) <= self.max_batch):
+            pending = self._queue.popleft()
+            batch.append(pending)
+            size += len(pending.sentences)
+        self._queued -= size
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                while (reason := self._flush_reason()) is None:
+                    self._cond.wait(max(0.0, self._queue[0].enqueued + self.max_wait - time.perf_counter()))
+                batch = self._take()
+            self._flush(batch, reason)
+
+    def _flush(self, batch: list, reason: str):
+        start = time.perf_counter()
+        waits = [start - pending.enqueued for pending in batch]
+        sentences = [s for pending in batch for s in pending.sentences]
+        try:
+            scores = list(self.predict(sentences))
+        except BaseException as e:
+            for pending in batch:
+                pending.future.set_exception(e)
+            return
+        i = 0
+        for pending in batch:
+            j = i + len(pending.sentences)
+            pending.future.set_result(scores[i:j])
+            i = j
+
+        with self._stats_lock:
+            self.flushes[reason] += 1
+            self.batched_sentences += len(sentences)
+            self.batched_callers += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(sentences))
+            self.queue_seconds += sum(waits)
+        if self.on_flush is not None:
+            # Callers already have their scores; a failing callback must not kill the scheduler thread
+            try:
+                self.on_flush(len(sentences), len(batch), waits, reason)
+            except Exception:
+                log.exception("on_flush callback failed")
+
+    def stats(self) -> dict:
+        with self._cond:
+            queued, open_callers = self._queued, self._open
+        with self._stats_lock:
+            batches = sum(self.flushes.values())
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1e3,
+                "batches": batches,
+                "flushes": {reason: self.flushes[reason] for reason in FLUSH_REASONS},
+                "sentences": self.batched_sentences,
+                "callers": self.batched_callers,
+                "mean_batch": self.batched_sentences / batches if batches else 0.0,
+                "mean_callers": self.batched_callers / batches if batches else 0.0,
+                "max_batch_seen": self.max_batch_seen,
+                "mean_queue_ms": self.queue_seconds / self.batched_callers * 1e3 if self.batched_callers else 0.0,
+                "queued": queued,
+                "open_callers": open_callers,
+            }
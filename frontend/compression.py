@@ -0,0 +1,57 @@
+"""
+Response compression negotiated from Accept-Encoding.
+
+Brotli is used when the `brotli` package is installed (`pip install brotli`)
+and the client accepts it, gzip otherwise. Streamed responses, small bodies
+and non-text types are sent as they are.
+
+COMPRESS=0 turns it off; COMPRESS_MIN_BYTES sets the smallest body worth
+compressing.
+"""
+
+import gzip
+import os
+
+from metrics import stage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ENABLED   = os.environ.get("COMPRESS", "1").lower() not in ("0", "false", "off")
+MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", 1024))
+
+# Fast settings: bodies are compressed on every request, not once and cached
+GZIP_LEVEL     = 5
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE = ("text/", "application/json", "application/x-ndjson", "application/javascript")
+ENCODINGS = ["br", "gzip"] if brotli else ["gzip"]
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+def install(app):
+    """Compress eligible responses in an after_request hook (only when ENABLED)."""
+    if not ENABLED:
+        return
+    from flask import request
+
+    @app.after_request
+    def _compress(response):
+        response.vary.add("Accept-Encoding")
+        if (response.is_streamed or response.direct_passthrough
+                or "Content-Encoding" in response.headers
+                or not response.mimetype.startswith(COMPRESSIBLE)
+                or (response.content_length or 0) < MIN_BYTES):
+            return response
+        encoding = request.accept_encodings.best_match(ENCODINGS)
+        if encoding is None:
+            return response
+        with stage("compress"):
+            response.set_data(compress(response.get_data(), encoding))
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,250 @@
+"""
+Incremental re-analysis for live typing.
+
+The server keeps the last segmentation of each document. An edit
+(offset, removed length, inserted text) only re-segments the window of
+sentences around the edit and only scores sentences whose hash changed.
+The result is a patch of span ids for the page to apply to its DOM.
+
+Segments are kept in blocks of about BLOCK_SIZE, each with a pending
+offset shift, so moving the sentences after an edit costs one addition
+per block rather than per sentence. The one O(n) term left per edit is
+rebuilding the document string, a single copy of its characters.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+BLOCK_SIZE = 64
+
+class Segment:
+    """One sentence of a tracked document."""
+    __slots__ = ("start", "end", "text", "sid", "span_id", "prob")
+
+    def __init__(self, start, end, text, sid, span_id, prob):
+        self.start = start
+        self.end = end
+        self.text = text
+        self.sid = sid
+        self.span_id = span_id
+        self.prob = prob
+
+    def as_dict(self) -> dict:
+        return {"id": self.span_id, "text": self.text, "prob": self.prob}
+
+class DocumentState:
+    """
+    Last known text and segmentation of one document.
+
+    `blocks` holds the segments in order, split into runs; a segment's
+    offsets are `seg.start + shifts[b]` for the block `b` holding it.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.blocks = []
+        self.shifts = []
+        self.version = 0
+        self.next_id = 0
+        self.lock = threading.Lock()
+
+    def new_span_id(self) -> str:
+        self.next_id += 1
+        return f"s{self.next_id}"
+
+    @property
+    def segments(self) -> list:
+        """Every segment with its offsets settled (O(n); for resyncs and tests)."""
+        self.settle(0, len(self.blocks))
+        return [seg for block in self.blocks for seg in block]
+
+    def settle(self, first, last):
+        """Fold the pending shift of blocks[first:last] into their segments."""
+        for b in range(first, last):
+            if self.shifts[b]:
+                for seg in self.blocks[b]:
+                    seg.start += self.shifts[b]
+                    seg.end += self.shifts[b]
+                self.shifts[b] = 0
+
+    def replace(self, first, last, segments, delta=0):
+        """Replace blocks[first:last] by `segments` (settled) and shift every later block by `delta`."""
+        n_blocks = -(-len(segments) // BLOCK_SIZE)
+        size = -(-len(segments) // n_blocks) if n_blocks else 0
+        blocks = [segments[i:i + size] for i in range(0, len(segments), size)] if size else []
+        self.blocks[first:last] = blocks
+        self.shifts[first:last] = [0] * len(blocks)
+        if delta:
+            for b in range(first + len(blocks), len(self.shifts)):
+                self.shifts[b] += delta
+
+def trimmed_spans(text, spans, base=0):
+    """Drop blank spans and trim whitespace so offsets cover only the sentence."""
+    out = []
+    for start, end in spans:
+        chunk = text[start:end]
+        stripped = chunk.strip()
+        if not stripped:
+            continue
+        lead = len(chunk) - len(chunk.lstrip())
+        start += lead
+        out.append((base + start, base + start + len(stripped), stripped))
+    return out
+
+class IncrementalAnalyzer:
+    """
+    Track documents by id and re-analyze only the region around each edit.
+
+    `segment(text)` returns (start, end) character spans of sentences.
+    `score(sentences)` returns (sids, probs) for a list of sentences.
+    `checkpoint(stage)` may raise to abandon a call; it is called before
+    segmenting, before scoring and before committing, so an abandoned
+    call leaves the document unchanged.
+    """
+
+    def __init__(self, segment, score, max_docs=1000):
+        self.segment = segment
+        self.score = score
+        self.max_docs = max_docs
+        self._docs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _state(self, doc_id, create=False):
+        with self._lock:
+            state = self._docs.get(doc_id)
+            if state is None and create:
+                state = self._docs[doc_id] = DocumentState()
+                while len(self._docs) > self.max_docs:
+                    self._docs.popitem(last=False)
+            if state is not None:
+                self._docs.move_to_end(doc_id)
+            return state
+
+    def clear(self):
+        """Forget every document; their clients resync on the next edit."""
+        with self._lock:
+            self._docs.clear()
+
+    def _build(self, text, base, spans, checkpoint=None):
+        """Segments for `spans` of `text` (offsets relative to `base`), scored in one batch."""
+        spans = trimmed_spans(text, spans, base)
+        if checkpoint:
+            checkpoint("predict")
+        sids, probs = self.score([s for _, _, s in spans])
+        if checkpoint:
+            checkpoint("commit")
+        return [
+            Segment(start, end, s, sid, None, prob)
+            for (start, end, s), sid, prob in zip(spans, sids, probs)
+        ]
+
+    def reset(self, doc_id, text, checkpoint=None):
+        """Full sync: segment and score the whole document."""
+        state = self._state(doc_id, create=True)
+        with state.lock:
+            if checkpoint:
+                checkpoint("segment")
+            segments = self._build(text, 0, self.segment(text), checkpoint)
+            for seg in segments:
+                seg.span_id = state.new_span_id()
+            state.text = text
+            state.replace(0, len(state.blocks), segments)
+            state.version += 1
+            return {
+                "reset": True,
+                "version": state.version,
+                "spans": [seg.as_dict() for seg in segments],
+            }
+
+    def edit(self, doc_id, version, offset, removed, inserted, checkpoint=None):
+        """
+        Apply one edit and return a patch, or None if the client must resync
+        (unknown document, stale version or out-of-range edit).
+        """
+        state = self._state(doc_id)
+        if state is None:
+            return None
+        with state.lock:
+            old_text = state.text
+            if version != state.version or not (0 <= offset and removed >= 0 and offset + removed <= len(old_text)):
+                return None
+            if checkpoint:
+                checkpoint("segment")
+
+            blocks, shifts = state.blocks, state.shifts
+            edit_end = offset + removed
+            delta = len(inserted) - removed
+            new_text = old_text[:offset] + inserted + old_text[edit_end:]
+
+            # Blocks that can hold the dirty window, plus one either side for its neighbours.
+            last_ends = [block[-1].end + shift for block, shift in zip(blocks, shifts)]
+            first_starts = [block[0].start + shift for block, shift in zip(blocks, shifts)]
+            b_lo = max(min(bisect_left(last_ends, offset), len(blocks) - 1) - 1, 0)
+            b_hi = min(bisect_right(first_starts, edit_end) + 1, len(blocks))
+            state.settle(b_lo, b_hi)
+            segs = [seg for block in blocks[b_lo:b_hi] for seg in block]
+            at_start = b_lo == 0
+            at_end = b_hi == len(blocks)
+
+            # Dirty window: sentences touching the edit plus one neighbour either side,
+            # since an edit can merge or split sentences across its boundaries.
+            starts = [seg.start for seg in segs]
+            ends = [seg.end for seg in segs]
+            lo = max(bisect_left(ends, offset) - 1, 0)
+            hi = min(bisect_right(starts, edit_end) + 1, len(segs))
+            win_start = 0 if at_start and lo == 0 else min(segs[lo].start, offset)
+            win_end = len(old_text) if at_end and hi == len(segs) else max(segs[hi - 1].end, edit_end)
+            new_win_end = win_end + delta
+
+            window = new_text[win_start:new_win_end]
+            fresh = self._build(window, win_start, self.segment(window), checkpoint)
+
+            # Keep span ids for sentences that survived unchanged, pair the rest
+            # up positionally as "changed", and report leftovers as added/removed.
+            old_window = segs[lo:hi]
+            by_sid = {}
+            for seg in old_window:
+                by_sid.setdefault(seg.sid, []).append(seg)
+            unmatched_new = []
+            for seg in fresh:
+                same = by_sid.get(seg.sid)
+                if same:
+                    seg.span_id = same.pop(0).span_id
+                else:
+                    unmatched_new.append(seg)
+            kept = {seg.span_id for seg in fresh if seg.span_id}
+            unmatched_old = [seg for seg in old_window if seg.span_id not in kept]
+
+            changed, added = [], []
+            for i, seg in enumerate(unmatched_new):
+                if i < len(unmatched_old):
+                    seg.span_id = unmatched_old[i].span_id
+                    changed.append(seg.as_dict())
+                else:
+                    seg.span_id = state.new_span_id()
+                    added.append(seg.as_dict())
+            removed_ids = [seg.span_id for seg in unmatched_old[len(unmatched_new):]]
+
+            if lo > 0:
+                after = segs[lo - 1].span_id
+            else:
+                after = blocks[b_lo - 1][-1].span_id if b_lo > 0 else None
+            # Only the window's own blocks are rebuilt; later blocks just take the shift.
+            for seg in segs[hi:]:
+                seg.start += delta
+                seg.end += delta
+            state.replace(b_lo, b_hi, segs[:lo] + fresh + segs[hi:], delta)
+            state.text = new_text
+            state.version += 1
+
+            return {
+                "version": state.version,
+                "added": added,
+                "changed": changed,
+                "removed": removed_ids,
+                "window": {
+                    "after": after,
+                    "ids": [seg.span_id for seg in fresh],
+                },
+            }
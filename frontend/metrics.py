@@ -0,0 +1,318 @@
+"""
+Request instrumentation for the Flask server.
+
+- `stage(name)` times a block of work. Per request, the stage times are
+  summed into a Server-Timing header and observed into a histogram.
+- Counters, gauges and histograms are exposed in the Prometheus text
+  format at /metrics.
+
+Under serve.py every worker has its own registry. `Registry.share(dir)`
+makes each one write its series to <dir>/<pid>.json, and /metrics in any
+worker then merges all of them: counters and histograms are summed, and
+gauges get a "worker" label per live process. The master folds an exited
+worker's file into retired.json, so totals never go backwards.
+
+Set METRICS=0 to turn it all off. `stage()` then returns a shared no-op
+context, every metric is a no-op object, and no request hooks or /metrics
+route are installed.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+
+ENABLED = os.environ.get("METRICS", "1").lower() not in ("0", "false", "off")
+
+# Seconds: 0.1 ms to 10 s
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Bytes: 64 B to 16 MB
+SIZE_BUCKETS = tuple(64 * 4 ** i for i in range(10))
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def series(self) -> dict:
+        with self._lock:
+            return {key: value for key, value in self._series.items()}
+
+    def render(self, series: dict = None) -> list[str]:
+        """Exposition lines for `series` ({label values: value}), this process's own by default."""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted((self.series() if series is None else series).items()):
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key, value) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value:.9g}"]
+
+    @staticmethod
+    def _sum(a, b):
+        return a + b
+
+    def merge(self, parts) -> dict:
+        """One series dict from every process's [(worker, series)]; values are summed."""
+        merged = {}
+        for _, series in parts:
+            for key, value in series.items():
+                merged[key] = self._sum(merged[key], value) if key in merged else value
+        return merged
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._series[self._key(labels)] = value
+
+    def merge(self, parts) -> dict:
+        """Gauges are not summed: each process's series gets its own "worker" label."""
+        return {key + (worker,): value for worker, series in parts if worker != RETIRED for key, value in series.items()}
+
+    def render(self, series: dict = None) -> list[str]:
+        if series is None:
+            return super().render()
+        return _Metric.render(Gauge(self.name, self.help, self.labelnames + ("worker",)), series)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def _render_series(self, key, value) -> list[str]:
+        counts, total, n = value
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', le)])} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {total:.9g}")
+        lines.append(f"{self.name}_count{labels} {n}")
+        return lines
+
+    @staticmethod
+    def _sum(a, b):
+        return [[x + y for x, y in zip(a[0], b[0])], a[1] + b[1], a[2] + b[2]]
+
+    def series(self) -> dict:
+        with self._lock:
+            return {key: [list(counts), total, n] for key, (counts, total, n) in self._series.items()}
+
+class _NullMetric:
+    """Stands in for every metric when instrumentation is off."""
+
+    def inc(self, *args, **kwargs):
+        pass
+
+    set = observe = inc
+
+NULL_METRIC = _NullMetric()
+
+# File of the exited workers' summed counters and histograms in a shared directory
+RETIRED = "retired"
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collect_hooks = []  # called before each scrape, e.g. to refresh gauges
+        self.shared_dir = None
+
+    def _add(self, metric):
+        if not ENABLED:
+            return NULL_METRIC
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self._add(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        for hook in self.collect_hooks:
+            hook()
+        if self.shared_dir is None:
+            return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+        self.write_snapshot()
+        parts = self._read_snapshots()
+        lines = []
+        for metric in self.metrics:
+            series = [(worker, snapshot.get(metric.name, {})) for worker, snapshot in parts]
+            lines.extend(metric.render(metric.merge(series)))
+        return "\n".join(lines) + "\n"
+
+    # ------------------ Several processes ------------------
+
+    def share(self, directory: Path):
+        """Merge /metrics across every process writing snapshots to `directory`."""
+        self.shared_dir = Path(directory)
+        self.shared_dir.mkdir(parents=True, exist_ok=True)
+
+    def snapshot(self) -> dict:
+        return {metric.name: metric.series() for metric in self.metrics}
+
+    def write_snapshot(self):
+        """Atomically write this process's series to <shared dir>/<pid>.json."""
+        if self.shared_dir is None:
+            return
+        _write_snapshot(self.shared_dir / f"{os.getpid()}.json", self.snapshot())
+
+    def _read_snapshots(self) -> list:
+        """[(worker, {metric name: series})] for every file in the shared directory."""
+        retired_path = self.shared_dir / f"{RETIRED}.json"
+        retired, folded = _read_snapshot(retired_path) if retired_path.exists() else ({}, [])
+        parts = [(RETIRED, retired)]
+        for path in sorted(self.shared_dir.glob("*.json")):
+            if path.stem == RETIRED or path.stem in folded:
+                continue  # already counted in retired.json
+            try:
+                parts.append((path.stem, _read_snapshot(path)[0]))
+            except (OSError, ValueError):
+                continue  # removed while we listed the directory
+        return parts
+
+    def retire(self, pid: int):
+        """Fold an exited worker's counters and histograms into retired.json (master only)."""
+        path = self.shared_dir / f"{pid}.json"
+        try:
+            snapshot, _ = _read_snapshot(path)
+        except (OSError, ValueError):
+            return
+        retired_path = self.shared_dir / f"{RETIRED}.json"
+        retired, folded = _read_snapshot(retired_path) if retired_path.exists() else ({}, [])
+        for metric in self.metrics:
+            if metric.kind != "gauge" and metric.name in snapshot:
+                retired[metric.name] = metric.merge([(RETIRED, retired.get(metric.name, {})), (str(pid), snapshot[metric.name])])
+        # Readers skip files listed as folded, so the worker is never counted twice or not at all
+        folded = [p for p in folded if (self.shared_dir / f"{p}.json").exists()] + [str(pid)]
+        _write_snapshot(retired_path, retired, folded)
+        path.unlink()
+
+def _write_snapshot(path: Path, snapshot: dict, folded=()):
+    body = {
+        "metrics": {name: [[list(key), value] for key, value in series.items()] for name, series in snapshot.items()},
+        "folded": list(folded),
+    }
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps(body))
+    os.replace(tmp, path)
+
+def _read_snapshot(path: Path) -> tuple[dict, list]:
+    """({metric name: series}, worker pids folded into this file)."""
+    body = json.loads(path.read_text())
+    snapshot = {name: {tuple(key): value for key, value in series} for name, series in body["metrics"].items()}
+    return snapshot, body["folded"]
+
+registry = Registry()
+
+STAGE_SECONDS   = registry.histogram("aidet_stage_seconds", "Time spent in each request stage", ["stage"])
+REQUEST_SECONDS = registry.histogram("aidet_request_seconds", "Request handling time", ["endpoint"])
+REQUESTS        = registry.counter("aidet_requests_total", "Requests handled", ["endpoint", "status"])
+INPUT_BYTES     = registry.histogram("aidet_input_bytes", "Request body size", ["endpoint"], SIZE_BUCKETS)
+SENTENCES       = registry.counter("aidet_sentences_total", "Sentences scored, by where the score came from", ["source"])
+LOAD_SECONDS    = registry.gauge("aidet_load_seconds", "Startup load time", ["component"])
+
+# ------------------ Per-request stage timers ------------------
+
+_timings: ContextVar = ContextVar("aidet_timings", default=None)
+_NULL_STAGE = nullcontext()
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        STAGE_SECONDS.observe(elapsed, stage=self.name)
+        timings = _timings.get()
+        if timings is not None:
+            timings[self.name] = timings.get(self.name, 0.0) + elapsed
+
+def stage(name: str):
+    """Context manager timing one stage of the current request."""
+    return _Stage(name) if ENABLED else _NULL_STAGE
+
+def server_timing(timings: dict) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in timings.items())
+
+def instrument(app):
+    """Install the request hooks and the /metrics route (only when ENABLED)."""
+    if not ENABLED:
+        return
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_request():
+        g.metrics_start = time.perf_counter()
+        g.metrics_token = _timings.set({})
+
+    @app.after_request
+    def _finish_request(response):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return response
+        endpoint = request.endpoint or "unknown"
+        timings = _timings.get() or {}
+        _timings.reset(g.pop("metrics_token"))
+        elapsed = time.perf_counter() - start
+        if endpoint != "metrics":
+            REQUEST_SECONDS.observe(elapsed, endpoint=endpoint)
+            INPUT_BYTES.observe(request.content_length or 0, endpoint=endpoint)
+        REQUESTS.inc(endpoint=endpoint, status=str(response.status_code))
+        if not response.is_streamed:
+            response.headers["Server-Timing"] = server_timing({**timings, "total": elapsed})
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
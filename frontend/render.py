@@ -0,0 +1,65 @@
+"""
+Highlight rendering for the web page and the HTML-returning endpoints.
+
+Each sentence gets one of a small set of quantized CSS classes instead of
+its own inline style, so a span costs a few bytes of markup. The matching
+stylesheet is generated here and inlined into the page (and served at
+/highlight.css for API clients that ask for HTML).
+"""
+
+from html import escape
+
+LEVELS = 5  # shades per side; the old continuous opacity is bucketed into these
+
+def _opacity(level: int) -> float:
+    """color_intensity's opacity curve, sampled at the middle of a bucket."""
+    distance = (level + 0.5) / LEVELS / 2  # |prob - 0.5|
+    return min(max(distance * 1.8, 0.15), 0.9)
+
+CLASSES_AI    = [f"ai{i}" for i in range(LEVELS)]
+CLASSES_HUMAN = [f"hu{i}" for i in range(LEVELS)]
+# Class for int(prob * 2 * LEVELS): strongest human shade at 0, strongest AI shade at 1
+BY_BUCKET = CLASSES_HUMAN[::-1] + CLASSES_AI + CLASSES_AI[-1:]
+
+def prob_class(prob: float) -> str:
+    """CSS class for a probability (0=Human, 1=AI)."""
+    return BY_BUCKET[int(prob * 2 * LEVELS)]
+
+def stylesheet() -> str:
+    rules = []
+    for i in range(LEVELS):
+        rules.append(f".{CLASSES_AI[i]} {{ background-color: rgba(255, 80, 80, {_opacity(i):.2f}); }}")
+        rules.append(f".{CLASSES_HUMAN[i]} {{ background-color: rgba(80, 255, 120, {_opacity(i):.2f}); }}")
+    return "\n".join(rules)
+
+STYLESHEET = stylesheet()
+
+def highlight(results) -> str:
+    """Highlighted HTML for [(sentence, prob, sid)], built in one pass."""
+    buckets, scale = BY_BUCKET, 2 * LEVELS
+    return " ".join([
+        f"<span data-id='{sid}' class='{buckets[int(prob * scale)]}'>"
+        f"{escape(s, quote=False) if '<' in s or '&' in s or '>' in s else s}</span>"
+        for s, prob, sid in results
+    ])
+
+def delta(results, known: list) -> list:
+    """
+    Edit script turning the client's `known` span ids (in document order)
+    into `results`: [start, count] copies known[start:start + count], and a
+    span object is a sentence the client does not hold. An unchanged
+    document is a single [0, n]; a one-sentence edit is about three ops.
+    """
+    index = {}
+    for i, sid in enumerate(known):
+        index.setdefault(sid, i)
+    ops = []
+    for s, prob, sid in results:
+        k = index.get(sid)
+        if k is None:
+            ops.append({"id": sid, "text": s.strip(), "prob": prob, "cls": prob_class(prob)})
+        elif ops and isinstance(ops[-1], list) and ops[-1][0] + ops[-1][1] == k:
+            ops[-1][1] += 1
+        else:
+            ops.append([k, 1])
+    return ops
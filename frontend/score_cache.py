@@ -0,0 +1,216 @@
+"""
+Server-side cache of sentence probabilities, each with whether a cascade
+escalated the sentence to its secondary model.
+
+Two tiers:
+- an in-process LRU bounded by entry count and approximate bytes
+- an optional sqlite file shared by every worker process on the host,
+  which also survives restarts. It is bounded by a row count, pruned
+  oldest-written first, and rows of other models are deleted at startup
+  and on `set_model`.
+
+Keys combine the model hash with a content hash of the sentence, so a
+retrained `ai_detector.pkl` never reuses stale scores.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+# Rough per-entry cost of an OrderedDict slot + (float, bool) tuple, on top of the key
+ENTRY_OVERHEAD = 176
+# sqlite's default limit on bound parameters is 999
+SQL_CHUNK = 500
+# Rows written between checks of the sqlite tier's size
+PRUNE_EVERY = 1000
+
+def file_hash(path: Path) -> str:
+    """sha256 of a file's contents, used to version cached scores."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ScoreCache:
+    """LRU memory tier with an optional sqlite tier behind it."""
+
+    def __init__(self, model_hash: str, max_entries=100_000, max_bytes=32 << 20, db_path=None, max_db_rows=1_000_000):
+        self.model_hash = model_hash[:16]
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.db_path = str(db_path) if db_path else None
+        self.max_db_rows = max_db_rows
+        self._unpruned = 0
+
+        self._lru = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.db_path:
+            conn = self._conn()
+            # scores_v2 adds the escalation flag and write time; the first table had neither
+            conn.execute("DROP TABLE IF EXISTS scores")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scores_v2 ("
+                " key TEXT PRIMARY KEY, prob REAL NOT NULL, escalated INTEGER NOT NULL, written REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS scores_v2_written ON scores_v2 (written)")
+            conn.commit()
+            self._disk_drop_other_models()
+
+    def key(self, sid: str) -> str:
+        """Cache key for a sentence content hash under the current model."""
+        return f"{self.model_hash}:{sid}"
+
+    # ------------------ sqlite tier ------------------
+
+    def _conn(self):
+        """One sqlite connection per thread; WAL lets processes share the file."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _disk_get(self, keys):
+        found = {}
+        conn = self._conn()
+        for i in range(0, len(keys), SQL_CHUNK):
+            chunk = keys[i:i + SQL_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            rows = conn.execute(f"SELECT key, prob, escalated FROM scores_v2 WHERE key IN ({marks})", chunk)
+            found.update((key, (prob, bool(escalated))) for key, prob, escalated in rows)
+        return found
+
+    def _disk_put(self, items):
+        conn = self._conn()
+        now = time.time()
+        conn.executemany(
+            "INSERT OR REPLACE INTO scores_v2 (key, prob, escalated, written) VALUES (?, ?, ?, ?)",
+            [(key, prob, int(escalated), now) for key, (prob, escalated) in items],
+        )
+        conn.commit()
+        with self._lock:
+            self._unpruned += len(items)
+            prune = self._unpruned >= PRUNE_EVERY
+            if prune:
+                self._unpruned = 0
+        if prune:
+            self._disk_prune()
+
+    def _disk_prune(self):
+        """Delete the oldest-written rows beyond `max_db_rows`."""
+        conn = self._conn()
+        (rows,) = conn.execute("SELECT COUNT(*) FROM scores_v2").fetchone()
+        if rows > self.max_db_rows:
+            conn.execute(
+                "DELETE FROM scores_v2 WHERE key IN (SELECT key FROM scores_v2 ORDER BY written LIMIT ?)",
+                (rows - self.max_db_rows,),
+            )
+            conn.commit()
+
+    def _disk_drop_other_models(self):
+        """Delete rows keyed by any model but the current one; they can never be read again."""
+        conn = self._conn()
+        conn.execute("DELETE FROM scores_v2 WHERE key NOT LIKE ?", (f"{self.model_hash}:%",))
+        conn.commit()
+
+    # ------------------ memory tier ------------------
+
+    def _remember(self, key, score):
+        """Insert into the LRU and evict from the cold end until within bounds."""
+        if key in self._lru:
+            self._lru.move_to_end(key)
+            self._lru[key] = score
+            return
+        self._lru[key] = score
+        self._bytes += len(key) + ENTRY_OVERHEAD
+        while self._lru and (len(self._lru) > self.max_entries or self._bytes > self.max_bytes):
+            old_key, _ = self._lru.popitem(last=False)
+            self._bytes -= len(old_key) + ENTRY_OVERHEAD
+            self.evictions += 1
+
+    # ------------------ public API ------------------
+
+    def get_many(self, sids):
+        """Return {sid: (prob, escalated)} for every sid found in either tier."""
+        found = {}
+        cold = []
+        with self._lock:
+            for sid in sids:
+                key = self.key(sid)
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[sid] = self._lru[key]
+                    self.hits += 1
+                else:
+                    cold.append(sid)
+
+        if cold and self.db_path:
+            rows = self._disk_get([self.key(sid) for sid in cold])
+            with self._lock:
+                for sid in cold:
+                    key = self.key(sid)
+                    if key in rows:
+                        found[sid] = rows[key]
+                        self._remember(key, rows[key])
+                        self.disk_hits += 1
+
+        with self._lock:
+            self.misses += len(sids) - len(found)
+        return found
+
+    def put_many(self, scores):
+        """Store {sid: (prob, escalated)} in both tiers."""
+        if not scores:
+            return
+        items = [(self.key(sid), (float(prob), bool(escalated))) for sid, (prob, escalated) in scores.items()]
+        with self._lock:
+            for key, score in items:
+                self._remember(key, score)
+        if self.db_path:
+            self._disk_put(items)
+
+    def set_model(self, model_hash: str):
+        """Version new entries by another model and drop the memory tier's old ones."""
+        with self._lock:
+            self.model_hash = model_hash[:16]
+            self._lru.clear()
+            self._bytes = 0
+        if self.db_path:
+            self._disk_drop_other_models()
+
+    def after_fork(self):
+        """Drop sqlite connections inherited from the parent; a child opens its own."""
+        self._local = threading.local()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "model": self.model_hash,
+                "entries": len(self._lru),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "disk": self.db_path,
+                "max_disk_rows": self.max_db_rows,
+            }
@@ -0,0 +1,53 @@
+"""
+Dropping superseded work.
+
+The page numbers its analysis requests per session (X-Analyze-Session,
+X-Analyze-Seq). A request is superseded once a later one from the same
+session has arrived. The handlers call a checkpoint before segmentation,
+before inference and before committing incremental state; it raises
+`Superseded` when a newer request is waiting, so the older one stops
+without doing that work.
+
+Requests without the headers (API clients) are never superseded.
+"""
+
+import threading
+from collections import OrderedDict
+
+class Superseded(Exception):
+    """A newer request from the same session arrived; `stage` is where this one stopped."""
+
+    def __init__(self, stage: str):
+        super().__init__(stage)
+        self.stage = stage
+
+def no_checkpoint(stage: str) -> None:
+    pass
+
+class SequenceTracker:
+    """Latest sequence number seen per session, for the most recent `max_sessions` sessions."""
+
+    def __init__(self, max_sessions=10_000):
+        self.max_sessions = max_sessions
+        self._latest = OrderedDict()
+        self._lock = threading.Lock()
+
+    def arrive(self, session: str, seq: int) -> None:
+        with self._lock:
+            if seq > self._latest.get(session, -1):
+                self._latest[session] = seq
+            self._latest.move_to_end(session)
+            while len(self._latest) > self.max_sessions:
+                self._latest.popitem(last=False)
+
+    def is_current(self, session: str, seq: int) -> bool:
+        return seq >= self._latest.get(session, -1)
+
+    def checkpoint(self, session: str, seq: int):
+        """Register a request and return its checkpoint function."""
+        self.arrive(session, seq)
+
+        def check(stage: str) -> None:
+            if not self.is_current(session, seq):
+                raise Superseded(stage)
+        return check
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Production server: a pre-forking master and N worker processes.
+
+The master imports server.py once, which loads the model (the compiled
+artifact is memory-mapped), the sentence segmenter (spaCy) and runs a
+warm-up request. It then binds the socket, freezes the garbage collector and
+forks. Workers share every page loaded before the fork copy-on-write, and
+the artifact's arrays are file-backed, so they stay in one shared copy in
+the page cache. Every worker accepts from the same listening socket and the
+kernel spreads connections across them, so throughput grows with cores
+instead of being capped by one process's GIL.
+
+Signals to the master:
+    SIGHUP          reload the model in MODEL_DIR (install it with os.replace),
+                    fork a new generation of workers and, once they are ready,
+                    drain the old one. No connection is refused in between.
+    SIGTERM/SIGINT  drain every worker and exit
+A worker that dies is replaced without blocking the master: it is forked
+and counted as booting until it reports ready (or BOOT_TIMEOUT passes).
+Draining workers finish their requests (up to GRACEFUL_TIMEOUT seconds)
+while /readyz answers 503.
+
+Each worker runs THREADS (default 4) request threads. More than one is
+also what lets the micro-batcher (batching.py) combine concurrent
+requests; with --threads 1 a worker only ever scores one request at a time.
+
+Workers write their metrics to METRICS_DIR (a temporary directory by
+default), so /metrics on any worker reports the whole server.
+
+Usage:
+    python frontend/serve.py --workers 4 --bind 0.0.0.0:8000
+    kill -HUP <master pid>   # after os.replace(new.model, models/ai_detector.model)
+"""
+
+import argparse
+import gc
+import logging
+import os
+import select
+import signal
+import shutil
+import socket
+import tempfile
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+WORKERS          = int(os.environ.get("WORKERS", os.cpu_count() or 1))
+THREADS          = int(os.environ.get("THREADS", 4))
+GRACEFUL_TIMEOUT = float(os.environ.get("GRACEFUL_TIMEOUT", 30))
+BOOT_TIMEOUT     = float(os.environ.get("BOOT_TIMEOUT", 30))
+BACKLOG          = int(os.environ.get("BACKLOG", 2048))
+METRICS_INTERVAL = 1.0  # seconds between a worker's metrics snapshots
+
+log = logging.getLogger("serve")
+
+def bind(address: str, backlog: int = BACKLOG) -> tuple[socket.socket, str, int]:
+    """Listening socket for "host:port"; returns (socket, host, port)."""
+    host, _, port = address.rpartition(":")
+    host = host.strip("[]") or "127.0.0.1"
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.create_server((host, int(port)), family=family, backlog=backlog)
+    return sock, host, sock.getsockname()[1]
+
+def run_worker(app_module, listener: socket.socket, host: str, port: int, threads: int, ready_fd: int) -> None:
+    """Serve requests until SIGTERM (or the master's exit), then finish in-flight ones."""
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    app_module.score_cache.after_fork()
+    registry = app_module.metrics.registry
+
+    httpd = make_server(host, port, app_module.app, threaded=threads > 1, fd=listener.fileno())
+    httpd.daemon_threads = False  # server_close() waits for in-flight requests
+    master = os.getppid()
+    draining = threading.Event()
+    next_snapshot = 0.0
+
+    def drain(*_):
+        if not draining.is_set():
+            draining.set()
+            app_module.ready.clear()
+            threading.Thread(target=httpd.shutdown, daemon=True).start()
+
+    def service_actions():
+        nonlocal next_snapshot
+        if os.getppid() != master:
+            drain()
+        if time.monotonic() >= next_snapshot:
+            registry.write_snapshot()
+            next_snapshot = time.monotonic() + METRICS_INTERVAL
+
+    signal.signal(signal.SIGTERM, drain)
+    httpd.service_actions = service_actions
+    os.write(ready_fd, b"1")
+    os.close(ready_fd)
+    httpd.serve_forever(poll_interval=0.5)  # closes the server (joining request threads) on return
+    registry.write_snapshot()  # final counts, folded into retired.json by the master
+
+class Master:
+    def __init__(self, app_module, listener: socket.socket, host: str, port: int, workers: int, threads: int):
+        self.app_module = app_module
+        self.listener, self.host, self.port = listener, host, port
+        self.n_workers, self.threads = workers, threads
+        self.generation = 0
+        self.workers = {}    # pid -> (generation, start time)
+        self.draining = {}   # pid -> deadline for SIGKILL
+        self.booting = {}    # readiness fd -> (pid, deadline) of replacement workers
+        self.respawns = []   # monotonic times at which to fork a replacement
+        self.stopping = False
+
+    # ------------------ Workers ------------------
+
+    def spawn(self) -> tuple[int, int]:
+        """Fork one worker of the current generation; returns (pid, fd it reports readiness on)."""
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                for fd in (read_fd, self.wakeup_r, self.wakeup_w, *self.booting):
+                    os.close(fd)
+                run_worker(self.app_module, self.listener, self.host, self.port, self.threads, write_fd)
+            except BaseException:
+                log.exception("Worker %d failed", os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        os.close(write_fd)
+        self.workers[pid] = (self.generation, time.monotonic())
+        return pid, read_fd
+
+    def wait_ready(self, pending: dict) -> list[int]:
+        """Wait for {fd: pid} workers to report ready; returns the pids that did."""
+        ready, deadline = [], time.monotonic() + BOOT_TIMEOUT
+        while pending and time.monotonic() < deadline:
+            readable, _, _ = select.select(list(pending), [], [], deadline - time.monotonic())
+            for fd in readable:
+                pid = pending.pop(fd)
+                if os.read(fd, 1):
+                    ready.append(pid)
+                os.close(fd)
+        for fd, pid in pending.items():
+            log.error("Worker %d did not start within %.0f s", pid, BOOT_TIMEOUT)
+            os.close(fd)
+            self.retire(pid, kill=True)
+        return ready
+
+    def spawn_generation(self) -> bool:
+        """Fork a full set of workers from the current state; True once every one is ready."""
+        gc.collect()
+        gc.freeze()  # keep the collector from writing to (and so copying) inherited objects
+        pending = {}
+        for _ in range(self.n_workers):
+            pid, fd = self.spawn()
+            pending[fd] = pid
+        ready = self.wait_ready(pending)
+        gc.unfreeze()
+        log.info("Generation %d: %d/%d workers ready", self.generation, len(ready), self.n_workers)
+        return len(ready) == self.n_workers
+
+    def retire(self, pid: int, kill: bool = False) -> None:
+        """Ask a worker to drain (or kill it); it is SIGKILLed after GRACEFUL_TIMEOUT."""
+        try:
+            os.kill(pid, signal.SIGKILL if kill else signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        self.draining.setdefault(pid, time.monotonic() + GRACEFUL_TIMEOUT)
+
+    def reap(self) -> None:
+        """Collect exited workers and schedule replacements for current-generation ones that died."""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            self.app_module.metrics.registry.retire(pid)
+            generation, started = self.workers.pop(pid, (None, 0.0))
+            if self.draining.pop(pid, None) is not None or self.stopping or generation != self.generation:
+                continue
+            log.warning("Worker %d exited (status %d), replacing it", pid, status)
+            # Do not spin on a worker that crashes at start
+            delay = 1.0 if time.monotonic() - started < 1.0 else 0.0
+            self.respawns.append(time.monotonic() + delay)
+
+    def respawn_due(self) -> None:
+        """Fork the replacements whose time has come; they report ready through `booting`."""
+        now = time.monotonic()
+        due = [t for t in self.respawns if t <= now]
+        self.respawns = [t for t in self.respawns if t > now]
+        for _ in due:
+            pid, fd = self.spawn()
+            self.booting[fd] = (pid, now + BOOT_TIMEOUT)
+
+    def check_booting(self, readable) -> None:
+        """Settle replacement workers that reported ready, failed, or ran past BOOT_TIMEOUT."""
+        now = time.monotonic()
+        for fd, (pid, deadline) in list(self.booting.items()):
+            if fd in readable:
+                del self.booting[fd]
+                if not os.read(fd, 1):
+                    log.error("Worker %d exited before it was ready", pid)
+                os.close(fd)
+            elif now > deadline:
+                del self.booting[fd]
+                log.error("Worker %d did not start within %.0f s", pid, BOOT_TIMEOUT)
+                os.close(fd)
+                self.retire(pid, kill=True)
+
+    def kill_overdue(self) -> None:
+        now = time.monotonic()
+        for pid, deadline in list(self.draining.items()):
+            if now > deadline:
+                log.warning("Worker %d still draining after %.0f s, killing it", pid, GRACEFUL_TIMEOUT)
+                self.draining[pid] = float("inf")
+                self.retire(pid, kill=True)
+
+    # ------------------ Signals ------------------
+
+    def reload(self) -> None:
+        """Load the new model in the master, start workers on it, then drain the old ones."""
+        old = list(self.workers)
+        start = time.perf_counter()
+        try:
+            self.app_module.reload_model()
+        except Exception:
+            log.exception("Reload failed, still serving model %s", self.app_module.score_cache.model_hash)
+            return
+        self.generation += 1
+        if not self.spawn_generation():
+            log.error("Generation %d did not start, keeping generation %d", self.generation, self.generation - 1)
+            for pid, (generation, _) in list(self.workers.items()):
+                if generation == self.generation:
+                    self.retire(pid, kill=True)
+            self.generation -= 1
+            return
+        for pid in old:
+            self.retire(pid)
+        log.info("Reloaded model %s in %.2f s", self.app_module.score_cache.model_hash, time.perf_counter() - start)
+
+    def stop(self) -> None:
+        self.stopping = True
+        for pid in list(self.workers):
+            self.retire(pid)
+
+    def run(self) -> None:
+        """Start the workers and supervise them until SIGTERM/SIGINT and every worker has exited."""
+        self.wakeup_r, self.wakeup_w = os.pipe()
+        os.set_blocking(self.wakeup_w, False)
+        signal.set_wakeup_fd(self.wakeup_w)
+        for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(sig, lambda *_: None)  # handled below, through the wakeup fd
+
+        log.info("Serving on %s:%d with %d workers (pid %d)", self.host, self.port, self.n_workers, os.getpid())
+        self.spawn_generation()
+        while not (self.stopping and not self.workers):
+            timeout = min([1.0] + [max(0.0, t - time.monotonic()) for t in self.respawns])
+            readable, _, _ = select.select([self.wakeup_r, *self.booting], [], [], timeout)
+            received = os.read(self.wakeup_r, 64) if self.wakeup_r in readable else b""
+            if signal.SIGHUP in received and not self.stopping:
+                self.reload()
+            if (signal.SIGTERM in received or signal.SIGINT in received) and not self.stopping:
+                log.info("Stopping, draining %d workers", len(self.workers))
+                self.stop()
+            self.reap()
+            self.check_booting(readable)
+            if not self.stopping:
+                self.respawn_due()
+            self.kill_overdue()
+        log.info("Stopped")
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-forking production server for the AI detector")
+    parser.add_argument("--bind", default=os.environ.get("BIND", "127.0.0.1:8000"), help="host:port to listen on")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="worker processes (default: CPU count)")
+    parser.add_argument("--threads", type=int, default=THREADS,
+                        help="threads per worker; more than 1 lets long streams share a worker and "
+                             "concurrent requests share micro-batches")
+    parser.add_argument("--access-log", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(process)d] %(levelname)s %(message)s")
+    logging.getLogger("werkzeug").setLevel(logging.INFO if args.access_log else logging.WARNING)
+
+    listener, host, port = bind(args.bind)
+    import server
+    metrics_dir = os.environ.get("METRICS_DIR") or tempfile.mkdtemp(prefix="aidet-metrics-")
+    server.metrics.registry.share(metrics_dir)
+    try:
+        Master(server, listener, host, port, max(1, args.workers), max(1, args.threads)).run()
+    finally:
+        if "METRICS_DIR" not in os.environ:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -1,88 +1,557 @@
 #!/usr/bin/env python3
 """
 Interactive Flask web app for AI vs Human text detection.
-- Uses spaCy for sentence segmentation.
-- Highlights text inline with color intensity based on model confidence.
+- Uses a configurable sentence segmentation backend (spaCy by default).
+- Highlights text inline with color intensity based on model confidence,
+  using quantized CSS classes; /analyze can return only the spans the page lacks.
 - Supports auto-analysis after idle typing.
-- Keeps existing highlights for unchanged text.
+- Caches sentence scores server-side, keyed by sentence and model version.
+- Incremental mode re-analyzes only the sentences around each edit.
+- Batch endpoint scores many documents in one segmentation + inference pass.
+- Streaming endpoint scores large uploads chunk by chunk with bounded memory.
+- Per-stage timings in a Server-Timing header and Prometheus metrics at /metrics
+  (METRICS=0 turns both off).
+- Responses are gzip/brotli compressed when the client accepts it.
+- Requests numbered per session are dropped once a newer one arrives.
+- Sentences from concurrent requests are scored together in micro-batches.
+- A cascade model escalates unsure sentences to its secondary model; each
+  response reports how many (X-Cascade-Escalated).
+- /healthz and /readyz for load balancers; the model can be reloaded in place.
+  serve.py runs it with pre-forked workers for production.
 """
 
-from flask import Flask, render_template, request, jsonify
-import joblib
+from flask import Flask, Response, g, has_request_context, render_template, request, jsonify, stream_with_context
+import json
+import codecs
 from pathlib import Path
-import spacy
 import hashlib
+import os
+import sys
+import threading
+import time
+
+import compression
+import metrics
+from batching import MicroBatcher
+from metrics import stage
+from render import STYLESHEET, delta, highlight, prob_class
+from score_cache import ScoreCache, file_hash
+from sequencing import SequenceTracker, Superseded, no_checkpoint
+from incremental import IncrementalAnalyzer
 
 app = Flask(__name__)
+metrics.instrument(app)
+compression.install(app)
 
-# Load the model and spaCy
 ROOT_DIR   = Path(__file__).parent.parent
-MODEL_PATH = ROOT_DIR / "models" / "ai_detector.pkl"
-pipeline   = joblib.load(MODEL_PATH)
-nlp        = spacy.load("en_core_web_sm")
+MODEL_DIR  = Path(os.environ.get("MODEL_DIR", ROOT_DIR / "models"))
+MODEL_PATH = MODEL_DIR / "ai_detector.pkl"
+sys.path.append(str(ROOT_DIR / "backend"))
+
+from segmenters import load_segmenter
+from compiled_model import load_model
+
+def load_scorer():
+    """Load the model from MODEL_DIR (SCORER=compiled|sklearn, compiled when exported)."""
+    start = time.perf_counter()
+    loaded = load_model(MODEL_PATH, MODEL_DIR / "ai_detector.model", kind=os.environ.get("SCORER"))
+    metrics.LOAD_SECONDS.set(time.perf_counter() - start, component="model")
+    return loaded
+
+def load_sentence_segmenter():
+    """Load the sentence segmenter (SEGMENTER=spacy|spacy-senter|sentencizer|regex)."""
+    start = time.perf_counter()
+    loaded = load_segmenter(os.environ.get("SEGMENTER", "spacy"))
+    metrics.LOAD_SECONDS.set(time.perf_counter() - start, component="segmenter")
+    return loaded
+
+pipeline, MODEL_FILE = load_scorer()
+segmenter = load_sentence_segmenter()
+
+# Defaults for /analyze/batch segmentation
+BATCH_SIZE      = int(os.environ.get("BATCH_SIZE", 64))
+BATCH_PROCESSES = int(os.environ.get("BATCH_PROCESSES", 1))
+
+# /analyze/stream: bytes read per chunk, sentences scored per batch, and the
+# longest unfinished sentence carried between chunks before it is forced out
+STREAM_CHUNK_BYTES = int(os.environ.get("STREAM_CHUNK_BYTES", 64 << 10))
+STREAM_BATCH       = int(os.environ.get("STREAM_BATCH", 256))
+STREAM_MAX_CARRY   = int(os.environ.get("STREAM_MAX_CARRY", 64 << 10))
+
+# Sentence-score cache; set SCORE_CACHE_DB to share scores across processes
+score_cache = ScoreCache(
+    model_hash=file_hash(MODEL_FILE),
+    max_entries=int(os.environ.get("SCORE_CACHE_ENTRIES", 100_000)),
+    max_bytes=int(os.environ.get("SCORE_CACHE_BYTES", 32 << 20)),
+    db_path=os.environ.get("SCORE_CACHE_DB") or None,
+    max_db_rows=int(os.environ.get("SCORE_CACHE_DB_ROWS", 1_000_000)),
+)
+
+CACHE_HIT_RATIO = metrics.registry.gauge("aidet_cache_hit_ratio", "Share of sentence lookups served by the score cache")
+CACHE_ENTRIES   = metrics.registry.gauge("aidet_cache_entries", "Sentence scores held in the memory tier")
+
+def refresh_cache_metrics():
+    stats = score_cache.stats()
+    CACHE_HIT_RATIO.set(stats["hit_ratio"])
+    CACHE_ENTRIES.set(stats["entries"])
+
+metrics.registry.collect_hooks.append(refresh_cache_metrics)
+
+# Latest request number per page session; older requests stop at their next checkpoint
+sequences  = SequenceTracker(max_sessions=int(os.environ.get("SEQUENCE_MAX_SESSIONS", 10_000)))
+SUPERSEDED = metrics.registry.counter("aidet_superseded_total", "Requests dropped for a newer one, by stage reached", ["stage"])
+
+# Set once warm_up() has run; cleared by serve.py while a worker drains
+ready = threading.Event()
+
+WARMUP_TEXT = (
+    "This request warms the server up before real traffic arrives. "
+    "It runs the segmenter, the model and the renderer once! Does it work?"
+)
+
+# Inference micro-batching across concurrent requests (MICROBATCH_MAX_WAIT_MS=0 turns it off)
+MICROBATCH_MAX_SIZE    = int(os.environ.get("MICROBATCH_MAX_SIZE", 256))
+MICROBATCH_MAX_WAIT_MS = float(os.environ.get("MICROBATCH_MAX_WAIT_MS", 2))
+# Endpoints whose requests count as callers that may join a batch
+SCORING_ENDPOINTS = {"analyze", "analyze_incremental", "analyze_batch", "analyze_stream_route"}
+
+BATCH_SENTENCES = metrics.registry.histogram(
+    "aidet_microbatch_sentences", "Sentences per inference batch", buckets=tuple(2 ** i for i in range(13)))
+BATCH_CALLERS = metrics.registry.histogram(
+    "aidet_microbatch_callers", "Requests sharing an inference batch", buckets=(1, 2, 4, 8, 16, 32, 64))
+BATCH_QUEUE_SECONDS = metrics.registry.histogram("aidet_microbatch_queue_seconds", "Time a request waited for its batch")
+BATCH_FLUSHES = metrics.registry.counter("aidet_microbatch_flushes_total", "Inference batches, by what triggered them", ["reason"])
+
+def record_flush(sentences, callers, waits, reason):
+    BATCH_SENTENCES.observe(sentences)
+    BATCH_CALLERS.observe(callers)
+    for wait in waits:
+        BATCH_QUEUE_SECONDS.observe(wait)
+    BATCH_FLUSHES.inc(reason=reason)
+
+# Cascade models (train.py --cascade). "Escalated" everywhere means the escalation flag of a
+# returned score: a cached score keeps the flag it was computed with. Model cost is
+# aidet_sentences_total{source="model"}.
+CASCADE_SENTENCES  = metrics.registry.counter(
+    "aidet_cascade_sentences_total", "Returned sentence scores, by the cascade model that produced them", ["model"])
+CASCADE_ESCALATION = metrics.registry.histogram(
+    "aidet_cascade_escalation_ratio", "Share of a request's returned scores that came from the secondary model",
+    buckets=(0, 0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1))
 
 # ------------------ Utilities ------------------
 
 def hash_text(s: str) -> str:
-    """Create a short hash for a string to track sentence identity."""
-    return hashlib.md5(s.strip().encode("utf-8")).hexdigest()[:10]
+    """Create a collision-safe hash for a string to track sentence identity."""
+    return hashlib.blake2b(s.strip().encode("utf-8"), digest_size=16).hexdigest()
 
 def split_sentences(text: str):
-    """Use spaCy to split text into sentences."""
-    doc = nlp(text)
-    return [sent.text for sent in doc.sents if sent.text.strip()]
-
-def color_intensity(prob: float) -> str:
-    """Map probability (0=Human, 1=AI) to rgba highlight."""
-    base_opacity = abs(prob - 0.5) * 1.8
-    opacity = min(max(base_opacity, 0.15), 0.9)
-    if prob >= 0.5:
-        return f"background-color: rgba(255, 80, 80, {opacity:.2f});"
-    else:
-        return f"background-color: rgba(80, 255, 120, {opacity:.2f});"
-
-def analyze_text(text, old_results=None):
-    """Analyze text, preserving highlights for unchanged sentences."""
-    sentences = split_sentences(text)
-    results = []
-
-    for s in sentences:
-        sid = hash_text(s)
-        # Reuse cached probability if same sentence as before
-        if old_results and sid in old_results:
-            prob = old_results[sid]
-        else:
-            prob = float(pipeline.predict_proba([s])[0][1])
-        results.append((s, prob, sid))
+    """Split text into sentences with the configured segmenter."""
+    return segmenter.split(text)
+
+def split_sentence_spans(text: str):
+    """Find (start, end) character offsets of each sentence."""
+    with stage("segment"):
+        return segmenter.spans(text)
+
+def predict_sentences(sentences):
+    """
+    Score a list of sentences in a single vectorize + predict_proba pass.
+    Returns (prob, escalated) pairs; escalated is True where a cascade's
+    secondary model made the call.
+    """
+    if not sentences:
+        return []
+    model = pipeline
+    if not hasattr(model, "predict_cascade"):
+        return [(prob, False) for prob in model.predict_proba(sentences)[:, 1].tolist()]
+    proba, escalated = model.predict_cascade(sentences)
+    return list(zip(proba[:, 1].tolist(), escalated.tolist()))
+
+batcher = MicroBatcher(
+    predict_sentences,
+    max_batch=MICROBATCH_MAX_SIZE,
+    max_wait=MICROBATCH_MAX_WAIT_MS / 1e3,
+    on_flush=record_flush,
+)
+
+def score_sentences(sentences):
+    """(prob, escalated) per sentence, batched with the sentences of concurrent requests."""
+    return batcher.score(sentences)
+
+def count_escalations(sids: list, scores: dict):
+    """Tally the escalation flags of the scores returned for `sids`, overall and for the current request."""
+    escalated = sum(scores[sid][1] for sid in sids)
+    CASCADE_SENTENCES.inc(len(sids) - escalated, model="primary")
+    CASCADE_SENTENCES.inc(escalated, model="secondary")
+    if has_request_context():
+        g.cascade_scored = g.get("cascade_scored", 0) + len(sids)
+        g.cascade_escalated = g.get("cascade_escalated", 0) + escalated
+
+def score_cached(sentences):
+    """Return (sids, probs), scoring only cache misses and in a single batch."""
+    with stage("hash"):
+        sids = [hash_text(s) for s in sentences]
+    with stage("cache"):
+        cached = score_cache.get_many(sids)
+
+    # Score every uncached sentence at once, then scatter back in order
+    misses = {}
+    for s, sid in zip(sentences, sids):
+        if sid not in cached:
+            misses.setdefault(sid, s)
+    with stage("predict"):
+        scored = score_sentences(list(misses.values()))
+    fresh = dict(zip(misses, scored))
+    with stage("cache"):
+        score_cache.put_many(fresh)
+    metrics.SENTENCES.inc(len(sids) - len(misses), source="cache")
+    metrics.SENTENCES.inc(len(misses), source="model")
+    cached.update(fresh)
+    if hasattr(pipeline, "predict_cascade"):
+        count_escalations(sids, cached)
+
+    return sids, [cached[sid][0] for sid in sids]
+
+def analyze_text(text, checkpoint=no_checkpoint):
+    """Analyze text, reusing cached scores for sentences seen before."""
+    checkpoint("segment")
+    with stage("segment"):
+        sentences = split_sentences(text)
+    checkpoint("predict")
+    sids, probs = score_cached(sentences)
+    return list(zip(sentences, probs, sids))
+
+def analyze_documents(texts, batch_size=BATCH_SIZE, n_process=BATCH_PROCESSES):
+    """
+    Analyze many documents at once: segment them in one `pipe` pass, then
+    score the sentences of every document in a single batch.
+    Returns one list of (sentence, prob, sid) per document.
+    """
+    per_doc = []
+    with stage("segment"):
+        for text, spans in zip(texts, segmenter.pipe(texts, batch_size=batch_size, n_process=n_process)):
+            per_doc.append([text[a:b] for a, b in spans if text[a:b].strip()])
+
+    flat = [s for sentences in per_doc for s in sentences]
+    sids, probs = score_cached(flat)
+
+    results, i = [], 0
+    for sentences in per_doc:
+        j = i + len(sentences)
+        results.append(list(zip(sentences, probs[i:j], sids[i:j])))
+        i = j
     return results
 
-def highlight(results):
-    """Return text with inline highlighting spans."""
-    highlighted = ""
-    for s, prob, sid in results:
-        style = color_intensity(prob)
-        highlighted += f"<span data-id='{sid}' style='{style}'>{s}</span> "
-    return highlighted.strip()
+def stream_sentences(stream, chunk_bytes=STREAM_CHUNK_BYTES, max_carry=STREAM_MAX_CARRY):
+    """
+    Yield sentences from a binary stream, reading it chunk by chunk.
+    The last (possibly unfinished) sentence of each chunk is carried over
+    to the next one, so only about one chunk is ever held in memory.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    carry = ""
+    while True:
+        chunk = stream.read(chunk_bytes)
+        done = not chunk
+        buffer = carry + decoder.decode(chunk or b"", final=done)
+        spans = segmenter.spans(buffer)
+        if not done and spans:
+            *spans, (last_start, _) = spans
+            carry = buffer[last_start:]
+        else:
+            carry = ""
+        for a, b in spans:
+            if buffer[a:b].strip():
+                yield buffer[a:b]
+        # A run-on "sentence" must not grow without bound
+        if len(carry) > max_carry:
+            yield carry
+            carry = ""
+        if done:
+            return
+
+def analyze_stream(stream, batch_size=STREAM_BATCH):
+    """Yield lists of (sentence, prob, sid), one per scored batch."""
+    batch = []
+    for s in stream_sentences(stream):
+        batch.append(s)
+        if len(batch) >= batch_size:
+            sids, probs = score_cached(batch)
+            yield list(zip(batch, probs, sids))
+            batch = []
+    if batch:
+        sids, probs = score_cached(batch)
+        yield list(zip(batch, probs, sids))
+
+# Per-document segmentation state for live typing
+incremental = IncrementalAnalyzer(
+    segment=split_sentence_spans,
+    score=score_cached,
+    max_docs=int(os.environ.get("INCREMENTAL_MAX_DOCS", 1000)),
+)
+
+def warm_up():
+    """
+    Run one request's work so the first real request is not the slow one:
+    fault in the model's pages, segment and score a sample text, and compile
+    the page template. Bypasses the score cache and the metrics.
+    """
+    start = time.perf_counter()
+    touch = getattr(pipeline, "touch", None)
+    if touch is not None:
+        touch()
+    sentences = split_sentences(WARMUP_TEXT)
+    probs = [prob for prob, _ in predict_sentences(sentences)]
+    highlight([(s, p, hash_text(s)) for s, p in zip(sentences, probs)])
+    with app.app_context():
+        render_template("index.html", highlight_css=STYLESHEET)
+    metrics.LOAD_SECONDS.set(time.perf_counter() - start, component="warmup")
+    ready.set()
+
+def reload_model():
+    """
+    Swap in the model currently in MODEL_DIR, e.g. after a new artifact was
+    moved there with os.replace. Requests already running finish with the old
+    model; cached scores and live-typing state of the old one are dropped.
+    """
+    global pipeline, MODEL_FILE
+    model, path = load_scorer()
+    pipeline, MODEL_FILE = model, path
+    score_cache.set_model(file_hash(path))
+    incremental.clear()
+    warm_up()
+
+if os.environ.get("WARMUP", "1").lower() not in ("0", "false", "off"):
+    warm_up()
 
 # ------------------ Routes ------------------
 
+@app.before_request
+def join_batching():
+    if request.endpoint in SCORING_ENDPOINTS:
+        g.batching = True
+        batcher.join()
+
+@app.teardown_request
+def leave_batching(exc):
+    if g.pop("batching", False):
+        batcher.leave()
+
+@app.after_request
+def report_escalations(response):
+    """X-Cascade-Escalated: "<escalated>/<sentences>" on scoring requests while a cascade is loaded (not streams)."""
+    if not response.is_streamed and request.endpoint in SCORING_ENDPOINTS and hasattr(pipeline, "predict_cascade"):
+        scored, escalated = g.pop("cascade_scored", 0), g.pop("cascade_escalated", 0)
+        response.headers["X-Cascade-Escalated"] = f"{escalated}/{scored}"
+        if scored:
+            CASCADE_ESCALATION.observe(escalated / scored)
+    return response
+
+def request_checkpoint():
+    """Checkpoint for the current request, from its X-Analyze-Session / X-Analyze-Seq headers."""
+    session = request.headers.get("X-Analyze-Session")
+    seq = request.headers.get("X-Analyze-Seq", type=int)
+    if not session or seq is None:
+        return no_checkpoint
+    return sequences.checkpoint(session, seq)
+
+@app.errorhandler(Superseded)
+def superseded(e):
+    SUPERSEDED.inc(stage=e.stage)
+    return jsonify({"superseded": True, "stage": e.stage}), 409
+
+@app.route("/healthz")
+def healthz():
+    """Liveness: the process is up and serving."""
+    return jsonify({"status": "ok", "pid": os.getpid()})
+
+@app.route("/readyz")
+def readyz():
+    """Readiness: warmed up and not draining. 503 otherwise."""
+    body = {"ready": ready.is_set(), "model": score_cache.model_hash, "pid": os.getpid()}
+    return jsonify(body), 200 if body["ready"] else 503
+
 @app.route("/")
 def index():
-    return render_template("index.html")
+    return render_template("index.html", highlight_css=STYLESHEET)
+
+@app.route("/highlight.css")
+def highlight_css():
+    response = Response(STYLESHEET, mimetype="text/css")
+    response.cache_control.max_age = 86400
+    return response
 
 @app.route("/analyze", methods=["POST"])
 def analyze():
-    data = request.get_json()
+    """
+    Send {"text"} for highlighted HTML and per-sentence scores. Add
+    "known": [span ids on the page, in order] to get {"ops"} instead: an
+    edit script that re-uses those spans and carries only the new ones
+    (see render.delta).
+    """
+    checkpoint = request_checkpoint()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "expected a JSON object"}), 400
     text = data.get("text", "")
-    old_results = data.get("oldResults", {})
+    if not isinstance(text, str):
+        return jsonify({"error": "text must be a string"}), 400
+    known = data.get("known") or []
+    if not isinstance(known, list) or not all(isinstance(sid, str) for sid in known):
+        return jsonify({"error": "known must be a list of span ids"}), 400
+    results = analyze_text(text, checkpoint)
+
+    if "known" in data:
+        with stage("highlight"):
+            ops = delta(results, known)
+        return jsonify({"ops": ops})
 
-    results = analyze_text(text, old_results)
-    html = highlight(results)
+    with stage("highlight"):
+        html = highlight(results)
 
-    # Return both highlighted HTML and cached result dict
+    # Return both highlighted HTML and per-sentence scores
     result_dict = {sid: prob for _, prob, sid in results}
     return jsonify({"html": html, "results": result_dict})
 
+@app.route("/analyze/incremental", methods=["POST"])
+def analyze_incremental():
+    """
+    Live-typing mode. Send {"docId", "text"} to (re)sync a document, then
+    {"docId", "version", "edit": {"offset", "removed", "inserted"}} per edit.
+    A response with "resync": true means the server needs the full text again.
+    """
+    checkpoint = request_checkpoint()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "expected a JSON object"}), 400
+    doc_id = str(data.get("docId", ""))
+    if not doc_id:
+        return jsonify({"error": "docId is required"}), 400
+
+    if "text" in data:
+        if not isinstance(data["text"], str):
+            return jsonify({"error": "text must be a string"}), 400
+        patch = incremental.reset(doc_id, data["text"], checkpoint)
+    else:
+        edit = data.get("edit") or {}
+        if not isinstance(edit, dict):
+            return jsonify({"error": "malformed edit"}), 400
+        try:
+            patch = incremental.edit(
+                doc_id,
+                int(data.get("version", -1)),
+                int(edit.get("offset", -1)),
+                int(edit.get("removed", 0)),
+                str(edit.get("inserted", "")),
+                checkpoint,
+            )
+        except (TypeError, ValueError):
+            return jsonify({"error": "malformed edit"}), 400
+        if patch is None:
+            return jsonify({"resync": True})
+
+    for key in ("spans", "added", "changed"):
+        for span in patch.get(key, []):
+            span["cls"] = prob_class(span["prob"])
+    return jsonify(patch)
+
+def parse_batch_documents(req):
+    """Read documents from a JSON array or NDJSON body as (id, text) pairs."""
+    if req.mimetype in ("application/x-ndjson", "application/jsonl"):
+        items = [json.loads(line) for line in req.get_data(as_text=True).splitlines() if line.strip()]
+    else:
+        items = req.get_json()
+        if isinstance(items, dict):
+            items = items.get("documents", [])
+    if not isinstance(items, list):
+        raise ValueError("expected a list of documents")
+
+    docs = []
+    for i, item in enumerate(items):
+        if isinstance(item, str):
+            docs.append((i, item))
+        elif isinstance(item, dict) and isinstance(item.get("text"), str):
+            docs.append((item.get("id", i), item["text"]))
+        else:
+            raise ValueError(f"document {i} has no text")
+    return docs
+
+@app.route("/analyze/batch", methods=["POST"])
+def analyze_batch():
+    """
+    Score many documents at once. Accepts a JSON array (strings or
+    {"id", "text"} objects) or NDJSON. Add ?html=1 to also render highlights;
+    NDJSON requests get NDJSON responses, one document per line.
+    """
+    try:
+        docs = parse_batch_documents(request)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    with_html = request.args.get("html", "0") in ("1", "true")
+    batch_size = request.args.get("batch_size", BATCH_SIZE, type=int)
+    n_process = request.args.get("n_process", BATCH_PROCESSES, type=int)
+
+    analyzed = analyze_documents([text for _, text in docs], batch_size, n_process)
+
+    out = []
+    for (doc_id, _), results in zip(docs, analyzed):
+        probs = [prob for _, prob, _ in results]
+        doc = {
+            "id": doc_id,
+            "prob": sum(probs) / len(probs) if probs else None,
+            "sentences": [{"id": sid, "text": s, "prob": prob} for s, prob, sid in results],
+        }
+        if with_html:
+            with stage("highlight"):
+                doc["html"] = highlight(results)
+        out.append(doc)
+
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        body = "".join(json.dumps(doc) + "\n" for doc in out)
+        return Response(body, mimetype="application/x-ndjson")
+    return jsonify({"documents": out})
+
+@app.route("/analyze/stream", methods=["POST"])
+def analyze_stream_route():
+    """
+    Stream scores for a large text. Send the text as the raw request body or
+    as a multipart "file" upload. Responds with NDJSON (one sentence per
+    line), or Server-Sent Events when asked for text/event-stream or ?format=sse.
+    """
+    sse = request.args.get("format") == "sse" or request.accept_mimetypes.best == "text/event-stream"
+
+    def generate():
+        # Resolved inside the generator so the upload is still open while streaming
+        upload = request.files.get("file")
+        stream = upload.stream if upload else request.stream
+        count = 0
+        for results in analyze_stream(stream):
+            lines = []
+            for s, prob, sid in results:
+                item = {"id": sid, "text": s, "prob": prob, "cls": prob_class(prob)}
+                lines.append(f"data: {json.dumps(item)}\n\n" if sse else json.dumps(item) + "\n")
+            count += len(results)
+            yield "".join(lines)
+        done = {"done": True, "sentences": count}
+        if hasattr(pipeline, "predict_cascade"):
+            done["escalated"] = g.get("cascade_escalated", 0)
+            if g.get("cascade_scored"):
+                CASCADE_ESCALATION.observe(g.cascade_escalated / g.cascade_scored)
+        summary = json.dumps(done)
+        yield f"event: done\ndata: {summary}\n\n" if sse else summary + "\n"
+
+    mimetype = "text/event-stream" if sse else "application/x-ndjson"
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+@app.route("/cache/stats")
+def cache_stats():
+    return jsonify(score_cache.stats())
+
+@app.route("/batching/stats")
+def batching_stats():
+    return jsonify(batcher.stats())
+
 # ------------------ Run ------------------
 
 if __name__ == "__main__":
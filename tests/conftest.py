@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+for part in ("backend", "frontend", "data"):
+    sys.path.append(str(ROOT_DIR / part))
@@ -0,0 +1,62 @@
+import threading
+import time
+
+import pytest
+
+from batching import MicroBatcher
+
+def lengths(sentences):
+    return [len(s) for s in sentences]
+
+def test_flush_on_max_batch():
+    batcher = MicroBatcher(lengths, max_batch=4, max_wait=10.0)
+    futures = [batcher.submit(["ab", "c"]), batcher.submit(["def", "ghij"])]
+    assert [f.result(timeout=2) for f in futures] == [[2, 1], [3, 4]]
+    assert batcher.stats()["flushes"]["size"] == 1
+
+def test_flush_on_max_wait():
+    batcher = MicroBatcher(lengths, max_batch=100, max_wait=0.05)
+    start = time.perf_counter()
+    assert batcher.score(["abc"]) == [3]
+    assert time.perf_counter() - start >= 0.05
+    assert batcher.stats()["flushes"]["wait"] == 1
+
+def test_flush_when_every_open_caller_is_queued():
+    batcher = MicroBatcher(lengths, max_batch=100, max_wait=10.0)
+    results = {}
+
+    def caller(i):
+        try:
+            results[i] = batcher.score(["x" * i])
+        finally:
+            batcher.leave()
+
+    for _ in range(3):
+        batcher.join()
+    threads = [threading.Thread(target=caller, args=(i,)) for i in (1, 2, 3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=5)
+    assert results == {1: [1], 2: [2], 3: [3]}
+    assert batcher.stats()["flushes"]["wait"] == 0
+
+def test_exception_reaches_every_future_in_the_batch():
+    def fail(sentences):
+        raise RuntimeError("model failed")
+
+    batcher = MicroBatcher(fail, max_batch=3, max_wait=10.0)
+    futures = [batcher.submit(["a"]), batcher.submit(["b", "c"])]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model failed"):
+            future.result(timeout=2)
+
+def test_on_flush_failure_does_not_kill_the_scheduler():
+    def on_flush(*args):
+        raise RuntimeError("metrics broke")
+
+    batcher = MicroBatcher(lengths, max_batch=2, max_wait=10.0, on_flush=on_flush)
+    for _ in range(3):
+        futures = [batcher.submit(["ab"]), batcher.submit(["c"])]
+        assert [f.result(timeout=2) for f in futures] == [[2], [1]]
+    assert batcher._thread.is_alive()
@@ -0,0 +1,89 @@
+import json
+import os
+
+import pytest
+
+import datastore
+from datastore import DatasetStore, import_legacy
+
+def test_round_trip(tmp_path):
+    with DatasetStore(tmp_path, writable=True) as store:
+        assert store.add_many(["One.", "Two.", "One."], label=0, source="a") == 2
+        store.add("Three.", 1, "b")
+
+    store = DatasetStore(tmp_path)
+    assert list(store) == [("One.", 0, "a"), ("Two.", 0, "a"), ("Three.", 1, "b")]
+    assert store.counts() == {"total": 3, "label": {"0": 2, "1": 1}, "source": {"a": 2, "b": 1}}
+    assert store.labels().tolist() == [0, 0, 1]
+
+def test_dedup_across_shards(tmp_path, monkeypatch):
+    monkeypatch.setattr(datastore, "SHARD_BYTES", 16)
+    texts = [f"Sentence number {i}." for i in range(10)]
+    with DatasetStore(tmp_path, writable=True) as store:
+        assert store.add_many(texts, label=1, source="a") == 10
+    assert len(DatasetStore(tmp_path).manifest["shards"]) > 1
+
+    with DatasetStore(tmp_path, writable=True) as store:
+        assert store.add_many(texts[::3] + ["New one."], label=1, source="a") == 1
+    assert [text for text, _, _ in DatasetStore(tmp_path)] == texts + ["New one."]
+
+def test_interrupted_flush_keeps_previous_state(tmp_path, monkeypatch):
+    with DatasetStore(tmp_path, writable=True) as store:
+        store.add_many(["Kept."], label=0, source="a")
+    manifest = (tmp_path / "manifest.json").read_text()
+
+    def crash(*_):
+        raise OSError("crash before the manifest rename")
+
+    store = DatasetStore(tmp_path, writable=True)
+    store.add("Lost.", 0, "a")
+    monkeypatch.setattr(datastore.os, "replace", crash)
+    with pytest.raises(OSError):
+        store.flush()
+    monkeypatch.undo()
+    store._lock_file.close()
+
+    # Shard bytes were written, the manifest was not: readers see the old state
+    assert (tmp_path / "manifest.json").read_text() == manifest
+    assert list(DatasetStore(tmp_path)) == [("Kept.", 0, "a")]
+
+    # The next writer truncates the orphaned bytes and appends cleanly
+    with DatasetStore(tmp_path, writable=True) as store:
+        assert store.add_many(["Lost.", "After."], label=0, source="a") == 2
+    assert [text for text, _, _ in DatasetStore(tmp_path)] == ["Kept.", "Lost.", "After."]
+
+def test_torn_manifest_temp_file_is_ignored(tmp_path):
+    with DatasetStore(tmp_path, writable=True) as store:
+        store.add_many(["Kept."], label=0, source="a")
+    (tmp_path / "manifest.json.tmp").write_text('{"format": 1, "sha')
+    assert list(DatasetStore(tmp_path)) == [("Kept.", 0, "a")]
+
+def test_error_in_context_does_not_commit(tmp_path):
+    with pytest.raises(RuntimeError):
+        with DatasetStore(tmp_path, writable=True) as store:
+            store.add("Never committed.", 0, "a")
+            raise RuntimeError
+    assert not (tmp_path / "manifest.json").exists()
+
+def test_import_legacy_is_idempotent(tmp_path):
+    (tmp_path / "humanData.txt").write_text("Human one.\nHuman two.\nHuman one.\n")
+    (tmp_path / "aiData.txt").write_text("AI one.\nAI partial")
+    root = tmp_path / "store"
+
+    assert import_legacy(root) == 3
+    assert import_legacy(root) == 0
+    store = DatasetStore(root)
+    assert store.counts()["source"] == {"legacy-human": 2, "legacy-ai": 1}
+    assert store.missing_legacy(tmp_path) == {}
+
+    # A partial last line waits until it is complete
+    with (tmp_path / "aiData.txt").open("a") as f:
+        f.write(" line.\nAI two.\n")
+    assert DatasetStore(root).missing_legacy(tmp_path) == {"aiData.txt": 2}
+    assert import_legacy(root) == 2
+    assert import_legacy(root) == 0
+
+    texts = [text for text, _, _ in DatasetStore(root)]
+    assert texts == ["Human one.", "Human two.", "AI one.", "AI partial line.", "AI two."]
+    legacy = json.loads((root / "manifest.json").read_text())["legacy"]
+    assert legacy == {name: os.path.getsize(tmp_path / name) for name in ("humanData.txt", "aiData.txt")}
@@ -0,0 +1,73 @@
+import random
+import re
+import zlib
+
+import pytest
+
+import incremental
+from incremental import IncrementalAnalyzer
+
+def segment(text):
+    return [m.span() for m in re.finditer(r"[^.!?]+[.!?]*", text)]
+
+def score(sentences):
+    sids = [zlib.crc32(s.encode()) for s in sentences]
+    return sids, [sid % 100 / 100 for sid in sids]
+
+def spans(analyzer, doc_id):
+    state = analyzer._state(doc_id)
+    return [(seg.start, seg.end, seg.text) for seg in state.segments]
+
+def full(text):
+    return [(start, end, s) for start, end, s in incremental.trimmed_spans(text, segment(text))]
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    monkeypatch.setattr(incremental, "BLOCK_SIZE", 3)
+
+def replay(block_size, monkeypatch, steps=300):
+    monkeypatch.setattr(incremental, "BLOCK_SIZE", block_size)
+    rng = random.Random(7)
+    analyzer = IncrementalAnalyzer(segment, score)
+    text = " ".join(f"Sentence number {i} is here." for i in range(40))
+    version = analyzer.reset("doc", text)["version"]
+    pieces = ["", "x", " word", ". ", "! New one. ", "Another sentence. Two."]
+    patches, states = [], []
+    for _ in range(steps):
+        offset = rng.randint(0, len(text))
+        removed = rng.randint(0, min(12, len(text) - offset))
+        inserted = rng.choice(pieces)
+        patch = analyzer.edit("doc", version, offset, removed, inserted)
+        version = patch["version"]
+        text = text[:offset] + inserted + text[offset + removed:]
+        assert all(analyzer._state("doc").blocks)
+        patches.append(patch)
+        states.append(spans(analyzer, "doc"))
+    return patches, states
+
+def test_blocks_give_the_same_patches_as_one_list(monkeypatch):
+    # A single block is the flat segment list; small blocks must not change any patch.
+    assert replay(3, monkeypatch) == replay(10**9, monkeypatch)
+
+def test_edit_shifts_only_later_blocks(small_blocks):
+    analyzer = IncrementalAnalyzer(segment, score)
+    text = " ".join(f"Sentence {i}." for i in range(30))
+    analyzer.reset("doc", text)
+    state = analyzer._state("doc")
+    before = [block[0] for block in state.blocks]
+    patch = analyzer.edit("doc", 1, len(text), 0, " Tail.")
+    # An edit at the end leaves every earlier block's segments untouched
+    assert [block[0] for block in state.blocks[:len(before) - 2]] == before[:-2]
+    assert patch["added"][0]["text"] == "Tail."
+    patch = analyzer.edit("doc", 2, 0, 0, "Head. ")
+    assert patch["window"]["after"] is None
+    assert any(state.shifts)
+    assert spans(analyzer, "doc") == full("Head. " + text + " Tail.")
+
+def test_edit_of_empty_document_and_stale_version():
+    analyzer = IncrementalAnalyzer(segment, score)
+    analyzer.reset("doc", "")
+    assert analyzer.edit("doc", 0, 0, 0, "x") is None
+    patch = analyzer.edit("doc", 1, 0, 0, "Hello there. Bye.")
+    assert [span["text"] for span in patch["added"]] == ["Hello there.", "Bye."]
+    assert analyzer.edit("doc", 2, 0, 100, "") is None
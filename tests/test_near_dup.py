@@ -0,0 +1,49 @@
+import numpy as np
+
+import near_dup
+from near_dup import MinHashIndex, group_split, shingles, update_index
+
+def test_wordless_texts_do_not_collide():
+    assert shingles("!!!", 3) != shingles("🙂🙂", 3)
+    index = MinHashIndex()
+    texts = ["...", "?!", "🙂🙂", "—", "A real sentence here.", "..."]
+    index.add(texts, range(len(texts)))
+    clusters = index.clusters()
+    assert clusters[0] == clusters[5]
+    assert len(set(clusters[:5])) == 5
+
+def test_bucket_pairs_are_not_a_star():
+    index = MinHashIndex(num_perm=4, bands=1)
+    index.signatures = np.array([[1, 2, 3, 4], [1, 2, 3, 4], [1, 2, 3, 4]], dtype=np.uint32)
+    i, j = index.candidate_pairs()
+    assert sorted(zip(i.tolist(), j.tolist())) == [(0, 1), (0, 2), (1, 2)]
+
+def test_threshold_change_keeps_signatures(tmp_path, monkeypatch):
+    path = tmp_path / "index.npz"
+    texts = [f"sentence number {i} about things" for i in range(20)]
+    update_index(texts, range(20), path, threshold=0.6)
+
+    def fail(self, texts):
+        raise AssertionError("signatures were recomputed")
+
+    monkeypatch.setattr(MinHashIndex, "signature", fail)
+    index = update_index(texts, range(20), path, threshold=0.8)
+    assert index.threshold == 0.8 and len(index) == 20
+    assert MinHashIndex.load(path).threshold == 0.8
+
+def test_old_signature_version_is_rebuilt(tmp_path, monkeypatch):
+    path = tmp_path / "index.npz"
+    texts = ["one two three four", "!!!"]
+    monkeypatch.setattr(near_dup, "SIGNATURE_VERSION", 1)
+    update_index(texts, range(2), path)
+    monkeypatch.undo()
+    assert MinHashIndex.load(path).version == 1
+    update_index(texts, range(2), path)
+    assert MinHashIndex.load(path).version == near_dup.SIGNATURE_VERSION
+
+def test_group_split_fills_past_large_groups():
+    labels = np.array([1] * 100 + [0] * 10)
+    groups = np.array([0] * 60 + [1] * 40 + list(range(2, 12)))
+    train, test = group_split(labels, groups, test_size=0.2)
+    assert np.bincount(labels[test], minlength=2)[0] >= 1
+    assert not set(groups[train]) & set(groups[test])
@@ -0,0 +1,76 @@
+import json
+import re
+import sys
+
+import pytest
+
+import train_stream
+
+def lines(prefix, n):
+    return [f"{prefix} sentence number {i} about topic {i % 7}." for i in range(n)]
+
+def trained(lines):
+    return sum(not train_stream.is_holdout(line) for line in lines)
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    monkeypatch.setattr(train_stream, "DATA_DIR", tmp_path / "data")
+    monkeypatch.setattr(train_stream, "OUTPUT_DIR", tmp_path / "models")
+    monkeypatch.setattr(train_stream, "MODEL_PATH", tmp_path / "models" / "stream.pkl")
+    monkeypatch.setattr(train_stream, "STATE_PATH", tmp_path / "models" / "state.json")
+    monkeypatch.setattr(sys, "argv", ["train_stream.py", "--no-eval", "--chunk-lines", "7"])
+    (tmp_path / "data").mkdir()
+    return tmp_path / "data"
+
+def write(path, lines, mode="w", tail=""):
+    with path.open(mode, encoding="utf-8") as f:
+        f.write("".join(line + "\n" for line in lines) + tail)
+
+def run(capsys):
+    """Run one training pass; return (lines trained on, whether it warm-started)."""
+    train_stream.main()
+    out = capsys.readouterr().out
+    return int(re.search(r"Trained on ([\d,]+) new lines", out).group(1).replace(",", "")), "Warm-starting" in out
+
+def offsets():
+    return json.loads(train_stream.STATE_PATH.read_text())["offsets"]
+
+def test_appended_lines_only(corpus, capsys):
+    human, ai = lines("human", 40), lines("machine", 40)
+    write(corpus / "humanData.txt", human)
+    write(corpus / "aiData.txt", ai)
+    assert run(capsys) == (trained(human + ai), False)
+
+    more_human, more_ai = lines("later human", 15), lines("later machine", 9)
+    write(corpus / "humanData.txt", more_human, "a")
+    write(corpus / "aiData.txt", more_ai, "a")
+    assert run(capsys) == (trained(more_human + more_ai), True)
+    assert offsets()["humanData.txt"] == (corpus / "humanData.txt").stat().st_size
+
+def test_rewritten_file_retrains_from_scratch(corpus, capsys):
+    human, ai = lines("human", 40), lines("machine", 40)
+    write(corpus / "humanData.txt", human)
+    write(corpus / "aiData.txt", ai)
+    run(capsys)
+
+    # Same length, different bytes before the saved offset
+    rewritten = [line.replace("human", "HUMAN") for line in human]
+    write(corpus / "humanData.txt", rewritten)
+    train_stream.main()
+    out = capsys.readouterr().out
+    assert "humanData.txt changed before the saved offset" in out
+    assert "Training from scratch" in out
+    assert int(re.search(r"Trained on ([\d,]+)", out).group(1)) == trained(rewritten + ai)
+
+def test_partial_trailing_line_waits_for_next_run(corpus, capsys):
+    human, ai = lines("human", 20), lines("machine", 20)
+    write(corpus / "humanData.txt", human, tail="an unfinished human li")
+    write(corpus / "aiData.txt", ai)
+    assert run(capsys) == (trained(human + ai), False)
+    complete = (corpus / "humanData.txt").stat().st_size - len("an unfinished human li")
+    assert offsets()["humanData.txt"] == complete
+
+    with (corpus / "humanData.txt").open("a", encoding="utf-8") as f:
+        f.write("ne, now finished.\n")
+    assert run(capsys) == (trained(["an unfinished human line, now finished."]), True)
+    assert offsets()["humanData.txt"] == (corpus / "humanData.txt").stat().st_size